@@ -0,0 +1,159 @@
+import threading
+import numpy as np
+
+ENCODING_DIM = 128
+
+def _sq_distances(x, centroids, c_norms):
+    """Squared Euclidean distances between rows of x and centroids (float32, chunk-friendly)."""
+    x_norms = np.einsum("ij,ij->i", x, x)[:, None]
+    return np.maximum(x_norms - 2.0 * (x @ centroids.T) + c_norms[None, :], 0.0)
+
+def _assign(x, centroids, chunk=8192):
+    c_norms = np.einsum("ij,ij->i", centroids, centroids)
+    out = np.empty(len(x), dtype=np.intp)
+    for i in range(0, len(x), chunk):
+        out[i:i + chunk] = np.argmin(_sq_distances(x[i:i + chunk], centroids, c_norms), axis=1)
+    return out
+
+def kmeans(x, k, iters=10, sample=None, seed=0):
+    """Plain Lloyd k-means on (a sample of) x. Returns float32 centroids."""
+    rng = np.random.default_rng(seed)
+    sample = sample or max(k * 64, 4096)
+    train = x if len(x) <= sample else x[rng.choice(len(x), sample, replace=False)]
+    centroids = train[rng.choice(len(train), k, replace=False)].copy()
+    for _ in range(iters):
+        labels = _assign(train, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, train)
+        counts = np.bincount(labels, minlength=k)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # Re-seed empty clusters from random points so every list stays useful
+        if empty.any():
+            centroids[empty] = train[rng.choice(len(train), int(empty.sum()), replace=False)]
+    return centroids.astype(np.float32)
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index in pure NumPy.
+
+    Vectors are partitioned by k-means into n_lists cells. A query only
+    scans the nprobe closest cells, so cost is roughly nprobe / n_lists of
+    a brute-force pass. Inserts go straight into the nearest cell without
+    retraining; rebuild after the gallery has grown a lot.
+    """
+
+    def __init__(self, dim=ENCODING_DIM, nprobe=8):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.centroids = None
+        self._lists = []      # cell -> float32 array with spare capacity
+        self._sizes = []      # cell -> used rows
+        self._labels = []     # cell -> [label, ...]
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return sum(self._sizes)
+
+    @property
+    def n_lists(self):
+        return 0 if self.centroids is None else len(self.centroids)
+
+    def build(self, vectors, labels, n_lists=None, iters=10, seed=0):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        labels = list(labels)
+        if n_lists is None:
+            n_lists = max(1, int(round(np.sqrt(len(vectors)))))
+        n_lists = max(1, min(n_lists, len(vectors)))
+
+        centroids = kmeans(vectors, n_lists, iters=iters, seed=seed) if len(vectors) else None
+        with self.lock:
+            self.centroids = centroids
+            self._lists, self._sizes, self._labels = [], [], []
+            if centroids is None:
+                return
+            cells = _assign(vectors, centroids)
+            for cell in range(n_lists):
+                members = np.flatnonzero(cells == cell)
+                self._lists.append(vectors[members].copy())
+                self._sizes.append(len(members))
+                self._labels.append([labels[i] for i in members])
+
+    def add(self, vector, label):
+        vector = np.asarray(vector, dtype=np.float32).reshape(1, self.dim)
+        with self.lock:
+            if self.centroids is None:
+                self.build(vector, [label])
+                return
+            cell = int(_assign(vector, self.centroids)[0])
+            size = self._sizes[cell]
+            store = self._lists[cell]
+            if size == len(store):
+                grown = np.empty((max(8, 2 * len(store)), self.dim), dtype=np.float32)
+                grown[:size] = store[:size]
+                self._lists[cell] = store = grown
+            store[size] = vector[0]
+            self._sizes[cell] = size + 1
+            self._labels[cell].append(label)
+
+    def remove(self, label):
+        """Drops every vector stored under label. Returns how many were removed."""
+        removed = 0
+        with self.lock:
+            for cell, cell_labels in enumerate(self._labels):
+                i = 0
+                while i < len(cell_labels):
+                    if cell_labels[i] != label:
+                        i += 1
+                        continue
+                    last = self._sizes[cell] - 1
+                    self._lists[cell][i] = self._lists[cell][last]
+                    cell_labels[i] = cell_labels[last]
+                    cell_labels.pop()
+                    self._sizes[cell] = last
+                    removed += 1
+        return removed
+
+    def search(self, query, k=1, nprobe=None):
+        """Approximate k nearest neighbours -> [(label, distance)], closest first."""
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        nprobe = nprobe or self.nprobe
+        with self.lock:
+            if self.centroids is None:
+                return []
+            to_centroids = np.einsum("ij,ij->i", self.centroids - query, self.centroids - query)
+            probe = np.argsort(to_centroids)[:min(nprobe, self.n_lists)]
+
+            dists, labels = [], []
+            for cell in probe:
+                size = self._sizes[cell]
+                if not size:
+                    continue
+                diff = self._lists[cell][:size] - query
+                dists.append(np.einsum("ij,ij->i", diff, diff))
+                labels.extend(self._labels[cell])
+        if not labels:
+            return []
+        dists = np.concatenate(dists)
+        k = min(k, len(dists))
+        idx = np.argpartition(dists, k - 1)[:k]
+        idx = idx[np.argsort(dists[idx])]
+        return [(labels[i], float(np.sqrt(dists[i]))) for i in idx]
+
+def brute_force_search(vectors, labels, query, k=1):
+    diff = np.asarray(vectors, dtype=np.float32) - np.asarray(query, dtype=np.float32)
+    dists = np.einsum("ij,ij->i", diff, diff)
+    k = min(k, len(dists))
+    idx = np.argpartition(dists, k - 1)[:k]
+    idx = idx[np.argsort(dists[idx])]
+    return [(labels[i], float(np.sqrt(dists[i]))) for i in idx]
+
+def recall_at_k(index, vectors, labels, queries, k=1, nprobe=None):
+    """Fraction of brute-force top-k labels that the index also returns."""
+    hits = total = 0
+    for q in queries:
+        truth = {label for label, _ in brute_force_search(vectors, labels, q, k)}
+        found = {label for label, _ in index.search(q, k, nprobe)}
+        hits += len(truth & found)
+        total += len(truth)
+    return hits / total if total else 1.0
@@ -5,12 +5,9 @@ import os
 import time
 import json
 import uuid
-import base64
 import socket
 from datetime import datetime
 import cv2
-import numpy as np
-import face_recognition
 from pyngrok import ngrok 
 
 # --- BACKEND MODULES ---
@@ -19,7 +16,15 @@ import state
 import hardware
 import face_auth
 import storage      
+import streaming
+import frame_bus
+import enrollments
 import cloud_sync   
+import events
+import scan_sessions
+import metrics
+import lockprof
+import tracing
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'iot_secret_key_change_this'
@@ -27,13 +32,12 @@ app.config['SECRET_KEY'] = 'iot_secret_key_change_this'
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 
 # --- GLOBAL STATE ---
-camera_lock = threading.Lock()
-face_frame_lock = threading.Lock()
-latest_frame = None
-frame_lock = threading.Lock()
+face_frame_lock = lockprof.lock("face_frame_lock")
+camera_bus = frame_bus.FrameBus(slots=4, lock=lockprof.lock("camera_bus", threading.RLock))   # Ring of captured frames, filled only by camera_capture_loop
+face_frames = streaming.FrameSlot()     # Latest verification/enrollment overlay frame
 camera_instance = None
-current_face_frame = None
 face_verification_active = False
+stream_hub = streaming.StreamHub()      # Per-viewer video sessions
 
 # Admin Configuration
 admin_cards = ['231654949486'] 
@@ -48,6 +52,13 @@ enrollment_pending = False
 # Ngrok URL
 public_url = None
 
+# Metrics (rendered on /metrics together with the ones of the backend modules)
+TAP_TO_DECISION = metrics.histogram(
+    "kiosk_tap_to_decision_seconds", "Card tap until the kiosk shows its decision", ["path", "outcome"])
+SCANS = metrics.counter("kiosk_scans_total", "Closed scan sessions", ["outcome"])
+CAMERA_FRAMES = metrics.counter("camera_frames_total", "Frames captured from the camera")
+CAMERA_FPS = metrics.gauge("camera_capture_fps", "Capture rate, smoothed over the last ~10 frames")
+
 # --- NETWORK HELPER ---
 def start_network_service():
     """Waits for internet and starts Ngrok in the background."""
@@ -108,191 +119,387 @@ def init_camera():
 
 def ws_camera_stream():
     """
-    Sends video frames over WebSocket.
-    NUCLEAR OPTIMIZATION: 5 FPS, Low Quality, Small Size.
+    Sends video frames over WebSocket as binary JPEG, per viewer session.
+    Each frame version is encoded at most once per quality tier; nothing is
+    encoded while no viewer is subscribed.
     """
-    global latest_frame, current_face_frame, face_verification_active
-
     while True:
-        frame_to_send = None
-        
-        # 1. Smart Frame (Verification)
+        if not stream_hub.has_viewers():
+            stream_hub.wait_for_viewers(timeout=1.0)
+            continue
+
+        # 1. Smart Frame (Verification) - falls back to the raw frame until the first overlay exists
+        key, frame_to_send = None, None
         with face_frame_lock:
-            if face_verification_active and current_face_frame is not None:
-                # 🟢 FIX: Check if frame is black (all zeros). If so, ignore it.
-                if np.count_nonzero(current_face_frame) > 0:
-                    try:
-                        frame_to_send = cv2.resize(current_face_frame, (640, 480))
-                    except:
-                        pass
-        
-        # 2. Fallback to Raw Frame (if smart frame is missing or black)
+            overlay_active = face_verification_active
+        if overlay_active:
+            seq, frame = face_frames.get()
+            if frame is not None:
+                key, frame_to_send = ('face', seq), frame
+
+        # 2. Fallback to Raw Frame
         if frame_to_send is None:
-            with frame_lock:
-                if latest_frame is not None:
-                    try:
-                        frame_to_send = cv2.resize(latest_frame, (640, 480))
-                    except:
-                        pass
-        
+            seq, frame = camera_bus.latest()
+            if frame is not None:
+                key, frame_to_send = ('raw', seq), frame
+
         if frame_to_send is None:
             socketio.sleep(0.1)
             continue
 
-        # 3. Compression
+        # 3. Compression + delivery to every viewer that is due (and has acked its last frame)
         try:
-            # ⚡ QUALITY 20: Looks pixelated, but flows FAST.
-            _, buffer = cv2.imencode(
-                '.jpg',
-                frame_to_send,
-                [cv2.IMWRITE_JPEG_QUALITY, 40] 
-            )
-            
-            b64_image = base64.b64encode(buffer).decode()
-            
-            socketio.emit('video_frame', {'image': b64_image})
-            
-            # ⚡ THROTTLE: 0.5s = 5 FPS maximum
-            socketio.sleep(0.5)
+            for sid, jpeg, ticket in stream_hub.collect(key, frame_to_send):
+                # bytes are sent as a binary Socket.IO attachment (no base64 overhead)
+                socketio.emit('video_frame', {'image': jpeg, 'seq': ticket}, room=sid)
+            socketio.sleep(0.05)
             
         except Exception as e:
             print(f"[STREAM ERROR] {e}")
             socketio.sleep(1)
 
 def camera_capture_loop():
-    global latest_frame
+    """Sole reader of the camera: fills the camera_bus ring, every other consumer subscribes to it."""
+    last_frame, interval = None, None
     while True:
-        with camera_lock:
-            if camera_instance and camera_instance.isOpened():
-                ret, frame = camera_instance.read()
-                if ret:
-                    with frame_lock:
-                        latest_frame = frame 
-            else:
-                init_camera()
-        # Capture slightly faster than we send to ensure freshness
-        time.sleep(0.05) 
+        if camera_instance is None or not camera_instance.isOpened():
+            camera_bus.close()
+            if not init_camera():
+                CAMERA_FPS.set(0)
+                time.sleep(1)
+                continue
+        # read() blocks until the camera delivers (hardware-limited to 10 FPS)
+        if not camera_bus.capture(camera_instance):
+            time.sleep(0.05)
+            last_frame = None
+            continue
+        now = time.perf_counter()
+        if last_frame is not None:
+            interval = now - last_frame if interval is None else 0.9 * interval + 0.1 * (now - last_frame)
+            CAMERA_FPS.set(1.0 / max(interval, 1e-6))
+        last_frame = now
+        CAMERA_FRAMES.inc()
 
 # --- 2. MAIN LOGIC LOOP ---
+# Everything that moves the kiosk along arrives as an event on this queue:
+# presence changes, card taps, verification results, user actions and timeouts.
+kiosk_events = events.EventQueue(state.timer_scheduler)
+kiosk_awake = threading.Event()     # Set while awake; the RFID reader thread sleeps on it otherwise
+
+SLEEP_GRACE_PERIOD = 5.0
+HEARTBEAT_SECONDS = 2.0             # Re-send system_status this often to keep the frontend synced
+
+class KioskStateMachine:
+    """
+    Single consumer of kiosk_events.
+
+    SLEEP -> IDLE when someone is present. Every card tap opens a scan
+    session (scan_sessions.ScanScheduler). Checked-in users going on break
+    or leaving take the fast path straight to the Break/Leave prompt; all
+    other taps queue for the camera, where one verification runs at a time
+    (VERIFYING). A result stays on screen until its reset timeout
+    (COOLDOWN) before the next queued person is verified; a Break/Leave
+    prompt frees the camera at once.
+    Timeouts run on state.timer_scheduler; re-arming one cancels the pending one it
+    replaces, and each carries the token of the interaction that scheduled
+    it, so one that already fired never resets a newer interaction.
+    """
+
+    SLEEP, IDLE, VERIFYING, COOLDOWN = "sleep", "idle", "verifying", "cooldown"
+
+    def __init__(self, queue):
+        self.events = queue
+        self.state = self.SLEEP
+        self.active = None          # What the frontend was last told
+        self.token = 0
+        self.sleep_token = 0
+        self.timeouts = {}          # (name, card_id) -> pending timers.Timer
+        self.scheduler = scan_sessions.ScanScheduler(fast_path=is_fast_path)
+
+    def run(self):
+        self._set_active(True)      # Awake during the grace period after boot, like a departure
+        with state.lock:
+            present = state.system_active
+        self.on_presence(present)
+
+        next_heartbeat = time.time() + HEARTBEAT_SECONDS
+        while True:
+            event = self.events.get(timeout=max(0.0, next_heartbeat - time.time()))
+            if event is not None:
+                try:
+                    # Spans recorded while handling a card's event go into that scan's trace
+                    with tracing.activate(tracing.RECORDER.get(event.data.get("card_id"))):
+                        getattr(self, "on_" + event.kind)(**event.data)
+                except Exception as e:
+                    print(f"[ERROR] Error handling {event}: {e}", flush=True)
+            if time.time() >= next_heartbeat:
+                socketio.emit('system_status', {'active': self.active})
+                next_heartbeat = time.time() + HEARTBEAT_SECONDS
+
+    # --- transitions ---
+    def _set_active(self, active):
+        if active:
+            kiosk_awake.set()
+            if self.state == self.SLEEP:
+                self.state = self.IDLE
+        else:
+            kiosk_awake.clear()
+            self.state = self.SLEEP
+        if active != self.active:
+            self.active = active
+            socketio.emit('system_status', {'active': active})
+
+    def _next_on_camera(self):
+        """Starts the oldest queued verification if the camera is free."""
+        if self.state in (self.VERIFYING, self.COOLDOWN):
+            return
+        session = self.scheduler.next_for_camera()
+        if session is not None:
+            trace = tracing.RECORDER.get(session.card_id)
+            if trace is not None:
+                trace.add("queue.camera", session.tapped_at, session.started_at, waiting=self.scheduler.waiting)
+            self.token += 1
+            self.state = self.VERIFYING
+            socketio.emit('interaction', {'msg': 'Verifying Face...'})
+            threading.Thread(target=run_verification, args=(session.card_id, self.events.post), daemon=True).start()
+        elif self.state != self.SLEEP:
+            self.state = self.IDLE
+        socketio.emit('scan_queue', {'waiting': self.scheduler.waiting})
+
+    def _after(self, delay, name, card_id=None, **data):
+        """(Re)arms timeout `name` (per card if card_id is given)."""
+        key = (name, card_id)
+        self.events.timers.cancel(self.timeouts.get(key))
+        if card_id is not None:
+            data["card_id"] = card_id
+        self.timeouts[key] = self.events.post_after(delay, events.TIMEOUT, name=name, **data)
+
+    def _cancel(self, name, card_id=None):
+        self.events.timers.cancel(self.timeouts.pop((name, card_id), None))
+
+    def _decided(self, card_id, outcome):
+        session = self.scheduler.get(card_id)
+        if session is not None:
+            TAP_TO_DECISION.labels(session.path, outcome).observe(time.time() - session.tapped_at)
+
+    def _finish(self, card_id, outcome):
+        self._cancel("action", card_id)
+        if self.scheduler.finish(card_id, outcome) is not None:
+            SCANS.labels(outcome).inc()
+        tracing.RECORDER.finish(card_id, outcome)
+        if self.scheduler.idle:
+            with state.lock: state.interaction_in_progress = False
+
+    def _cooldown(self, seconds):
+        self.state = self.COOLDOWN
+        if self.scheduler.waiting:
+            seconds = min(seconds, config.SCAN_HANDOFF_SECONDS)
+        self._after(seconds, "reset", token=self.token)
+
+    def _prompt(self, card_id):
+        self.token += 1
+        tracing.instant("ui.prompt")
+        if not prompt_user_action(card_id):
+            self._finish(card_id, "gone")
+            return
+        self._after(config.SCAN_ACTION_TIMEOUT, "action", card_id, token=self.token)
+
+    # --- events ---
+    def on_presence(self, active):
+        self.sleep_token += 1
+        if active:
+            self._cancel("sleep")
+            self._set_active(True)
+        else:
+            self._after(SLEEP_GRACE_PERIOD, "sleep", token=self.sleep_token)
+
+    def on_card(self, card_id, tapped_at=None):
+        if admin_auth_pending:
+            handle_admin_card(card_id)
+            return
+        if self.state == self.SLEEP:
+            return
+        print(f"[RFID] Card detected: {card_id}")
+
+        open_session = self.scheduler.get(card_id)
+        if open_session is not None:
+            # Tapped again: show the prompt once more, otherwise it is already queued
+            tracing.instant("rfid.retap")
+            if open_session.state == scan_sessions.AWAITING_ACTION:
+                self._prompt(card_id)
+            return
+
+        trace = tracing.RECORDER.begin(card_id, tapped_at)
+        with tracing.activate(trace):
+            # Reader thread + event queue, from the tap until the state machine sees it
+            trace.add("rfid.read", trace.started, time.time())
+            with tracing.span("enrollment.check"):
+                accepted = accept_card(card_id, camera_free=self.state == self.IDLE)
+            if not accepted:
+                tracing.RECORDER.finish(card_id, "enrollment")
+                return      # New card: enrollment flow takes over
+            session = self.scheduler.submit(card_id, tapped_at)
+            if session.path == scan_sessions.FAST:
+                self._decided(card_id, "prompt")
+                self._prompt(card_id)
+            else:
+                self._next_on_camera()
+
+    def on_verified(self, card_id, ok, result, at):
+        if not ok:
+            socketio.emit('interaction', {'msg': '❌ Access Denied'})
+            tracing.instant("ui.denied", reason=result)
+            self._decided(card_id, "denied")
+            self._finish(card_id, "denied")
+            self._cooldown(2)
+            return
+        with tracing.span("state.update", step="verified"):
+            checked_in = apply_verified_scan(card_id, result, at)
+        if checked_in:
+            self._decided(card_id, "checked_in")
+            self._finish(card_id, "checked_in")
+            self._cooldown(5)
+        else:
+            # Waiting for Break/Leave; the camera is free for the next person
+            self._decided(card_id, "prompt")
+            self.scheduler.awaiting_action(card_id)
+            self._after(config.SCAN_ACTION_TIMEOUT, "action", card_id, token=self.token)
+            self.state = self.IDLE
+            self._next_on_camera()
+
+    def on_user_action(self, action, card_id, at):
+        tracing.instant("ui.action", action=action)
+        with tracing.span("state.update", step=action):
+            applied = apply_user_action(action, card_id, at)
+        if applied:
+            self._finish(card_id, action)
+            if self.state != self.VERIFYING:
+                self.token += 1
+                self._after(5, "reset_ui", token=self.token)
+
+    def on_timeout(self, name, token, card_id=None):
+        timer = self.timeouts.get((name, card_id))
+        if timer is not None and not timer.pending:
+            del self.timeouts[(name, card_id)]
+        if name == "sleep":
+            if token != self.sleep_token:
+                return
+            if self.state in (self.IDLE, self.SLEEP) and self.scheduler.idle:
+                self._set_active(False)
+            else:
+                # Mid-interaction: check again after another grace period
+                self._after(SLEEP_GRACE_PERIOD, "sleep", token=token)
+        elif name == "action":
+            # Prompt left unanswered: close the session so the card can be used again
+            session = self.scheduler.get(card_id)
+            if session is not None and session.state == scan_sessions.AWAITING_ACTION:
+                self._finish(card_id, "abandoned")
+                if token == self.token:
+                    socketio.emit('reset_ui')
+        elif name == "reset":
+            if token == self.token:
+                socketio.emit('reset_ui')
+            self.state = self.IDLE
+            self._next_on_camera()
+        elif token == self.token:
+            socketio.emit('reset_ui')
+
 def background_loop():
-    global admin_auth_pending, admin_auth_socket_id
     print("[SYSTEM] Starting Hardware...", flush=True)
     
-    face_auth.load_known_faces()
     storage.load_active_scans()   
+    cloud_sync.start_sender()
+    lockprof.start_dump()
 
-    # Start hardware threads
+    # Start hardware threads; presence changes and card taps come back as events
+    hardware.activity_listeners.append(lambda active: kiosk_events.post(events.PRESENCE, active=active))
     threading.Thread(target=hardware.ultrasonic_thread, daemon=True).start()
-    threading.Thread(target=hardware.servo_thread, daemon=True).start()
-    
-    last_active = None 
-    sleep_start_time = None
-    SLEEP_GRACE_PERIOD = 5.0
-    
-    # Force an update every 20 loops (~2 seconds) to keep frontend synced
-    heartbeat_counter = 0
+    hardware.door.start()
+    threading.Thread(
+        target=events.rfid_reader_loop,
+        args=(hardware.reader, kiosk_events.post, kiosk_awake, config.RFID_POLL_INTERVAL, config.RFID_DEBOUNCE),
+        daemon=True,
+    ).start()
 
-    while True:
-        try:
-            time.sleep(0.1)
-            heartbeat_counter += 1
-            
-            # 1. Determine State
-            with state.lock:
-                raw_active = state.system_active
-            
-            final_active_state = False
-            if raw_active:
-                final_active_state = True
-                sleep_start_time = None
-            else:
-                if sleep_start_time is None:
-                    sleep_start_time = time.time()
-                
-                # Only sleep if grace period passed
-                if (time.time() - sleep_start_time) > SLEEP_GRACE_PERIOD:
-                    final_active_state = False
-                else:
-                    final_active_state = True
-            
-            # 2. Emit State Change (or Heartbeat)
-            # We re-send status if changed OR if heartbeat is due
-            if final_active_state != last_active or heartbeat_counter >= 20:
-                socketio.emit('system_status', {'active': final_active_state})
-                last_active = final_active_state
-                heartbeat_counter = 0
-            
-            if not final_active_state:
-                continue
+    kiosk.run()
 
-            # 3. Read RFID
-            try:
-                card_id, text = hardware.reader.read_no_block()
-            except:
-                card_id = None
-
-            if card_id:
-                print(f"[RFID] Card detected: {card_id}")
-                card_uid = str(card_id).strip()
-                
-                if admin_auth_pending:
-                    success = card_uid in admin_cards
-                    token = None
-                    if success:
-                        token = str(uuid.uuid4())
-                        valid_login_tokens[token] = time.time()
-                    
-                    if admin_auth_socket_id:
-                        socketio.emit(
-                            'admin_authenticated',
-                            {'success': success, 'token': token},
-                            room=admin_auth_socket_id
-                        )
-                    
-                    time.sleep(0.5)
-                    admin_auth_pending = False
-                else:
-                    handle_scan(card_uid)
-                    
-        except Exception as e:
-            print(f"[ERROR] Error in background_loop: {e}", flush=True)
-            time.sleep(1) # Prevent tight loop on error
+def handle_admin_card(card_uid):
+    global admin_auth_pending
+    success = card_uid in admin_cards
+    token = None
+    if success:
+        token = str(uuid.uuid4())
+        valid_login_tokens[token] = time.time()
+    
+    if admin_auth_socket_id:
+        socketio.emit(
+            'admin_authenticated',
+            {'success': success, 'token': token},
+            room=admin_auth_socket_id
+        )
+    admin_auth_pending = False
 
-def handle_scan(card_text):
-    global face_verification_active, current_face_frame
-    with state.lock: state.interaction_in_progress = True
-    socketio.emit('interaction', {'msg': 'Processing Card...'})
+def is_fast_path(card_text):
+    """Checked-in users (not on break) only choose Break/Leave: no face check needed."""
+    if not config.SCAN_FAST_PATH:
+        return False
+    with state.lock:
+        rec = state.scan1.get(card_text)
+        return rec is not None and not rec.get("on_break", False)
 
-    if not os.path.exists(config.KNOWN_FACES_DIR): os.makedirs(config.KNOWN_FACES_DIR)
-    
-    try:
-        files = [f for f in os.listdir(config.KNOWN_FACES_DIR) if f.startswith(f"{card_text}_")]
-    except: files = []
+def accept_card(card_text, camera_free=True):
+    """First UI feedback for a tap. Returns False when the card still has to be enrolled."""
+    with state.lock: state.interaction_in_progress = True
 
-    if not files:
+    if not enrollments.is_enrolled(card_text):
+        socketio.emit('interaction', {'msg': 'Processing Card...', 'card_id': card_text})
         socketio.emit('enrollment_request', {'card_id': card_text, 'message': 'New card detected!'})
-        return
-
-    socketio.emit('interaction', {'msg': 'Verifying Face...'})
+        return False
+    if camera_free or is_fast_path(card_text):
+        socketio.emit('interaction', {'msg': 'Processing Card...', 'card_id': card_text})
+    else:
+        # Someone is in front of the camera: don't overwrite their screen
+        socketio.emit('scan_queued', {'card_id': card_text})
+    return True
+
+def prompt_user_action(card_text):
+    """Shows the Break/Leave choice. Returns False when the user is no longer checked in."""
+    with state.lock:
+        rec = state.scan1.get(card_text)
+        if rec is None:
+            return False
+        user_name = rec.get("name", "User")
+    socketio.emit('ask_user_action', {'name': user_name, 'card_id': card_text})
+    return True
+
+def run_verification(card_text, post):
+    """Worker thread: runs the face check and posts the VERIFIED event."""
+    global face_verification_active
+    face_frames.clear()
     with face_frame_lock:
         face_verification_active = True
-        current_face_frame = np.zeros((480, 640, 3), dtype=np.uint8)
     
-    verified, name = face_auth.verify_face_for_card(
-        card_text, socketio, camera_instance, face_frame_lock, current_face_frame, camera_lock
-    )
-    
-    with face_frame_lock:
-        face_verification_active = False
-        current_face_frame = None
+    try:
+        with tracing.activate(tracing.RECORDER.get(card_text)), tracing.span("verify"):
+            verified, name = face_auth.verify_face_for_card(
+                card_text, socketio, camera_bus, face_frame_lock, face_frames
+            )
+    except Exception as e:
+        print(f"[ERROR] Verification failed: {e}", flush=True)
+        verified, name = False, "error"
+    finally:
+        with face_frame_lock:
+            face_verification_active = False
+        face_frames.clear()
     
-    if not verified:
-        socketio.emit('interaction', {'msg': '❌ Access Denied'}); time.sleep(2); socketio.emit('reset_ui')
-        with state.lock: state.interaction_in_progress = False
-        return
+    post(events.VERIFIED, card_id=card_text, ok=verified, result=name, at=datetime.now())
 
+def apply_verified_scan(card_text, name, now):
+    """
+    Checks a verified user in, or back from break.
+    Returns True when done, False when the user still has to choose Break/Leave.
+    """
     user_name = name.replace(f"{card_text}_", "")
-    now = datetime.now()
     
     with state.lock:
         if card_text not in state.scan1:
@@ -300,7 +507,7 @@ def handle_scan(card_text):
                 "entry": now, "name": user_name, "on_break": False,
                 "current_break_start": None, "total_break_seconds": 0.0, "breaks": []
             }
-            storage.save_active_scans_file()
+            storage.record_scan_update(card_text)
             socketio.emit('user_checked_in', {'name': user_name, 'action': 'entry', 'msg': f'Welcome {user_name}!'})
         else:
             entry_rec = state.scan1[card_text]
@@ -314,37 +521,31 @@ def handle_scan(card_text):
                     entry_rec["total_break_seconds"] = entry_rec.get("total_break_seconds", 0.0) + duration
                     entry_rec["current_break_start"] = None
                     entry_rec["on_break"] = False
-                    storage.save_active_scans_file()
+                    storage.record_scan_update(card_text)
                     socketio.emit('user_checked_in', {'name': user_name, 'action': 'return', 'msg': f'Welcome back {user_name}!'})
                 else:
                     entry_rec["on_break"] = False
                     socketio.emit('ask_user_action', {'name': user_name, 'card_id': card_text})
             else:
                 socketio.emit('ask_user_action', {'name': user_name, 'card_id': card_text})
-                return 
+                return False
+    return True
 
-    time.sleep(5)
-    socketio.emit('reset_ui')
-    with state.lock: state.interaction_in_progress = False
+USER_ACTIONS = ('break', 'leave')
 
-# --- 3. SOCKET HANDLERS ---
-@socketio.on('user_action')
-def handle_user_action(data):
-    action, card_id = data.get('action'), data.get('card_id')
-    if not card_id: return
-    now = datetime.now()
-    
+def apply_user_action(action, card_id, now):
+    """Break / Leave chosen on the screen. Returns False for an unknown card or action."""
+    if action not in USER_ACTIONS: return False
     with state.lock:
-        if card_id not in state.scan1: return
+        if card_id not in state.scan1: return False
         entry_rec = state.scan1[card_id]
         user_name = entry_rec.get("name", "User")
         
         if action == 'break':
             entry_rec["on_break"] = True
             entry_rec["current_break_start"] = now
-            storage.save_active_scans_file()
+            storage.record_scan_update(card_id)
             socketio.emit('interaction', {'msg': f'Break started for {user_name}'})
-            state.unlock_event.set()
             
         elif action == 'leave':
             entry_data = state.scan1.pop(card_id)
@@ -362,15 +563,44 @@ def handle_user_action(data):
             
             storage.save_to_log(card_id, user_name, entry_time, now, net_duration, raw_breaks, total_break)
             cloud_sync.log_attendance(card_id, user_name, entry_time, now, net_duration, breaks=formatted_breaks, total_break=total_break)
-            storage.save_active_scans_file()
+            storage.record_scan_removed(card_id)
             
             socketio.emit('interaction', {'msg': f'Goodbye {user_name}! Saved.'})
-            state.unlock_event.set()
         
         state.interaction_in_progress = False
-    
-    time.sleep(5)
-    socketio.emit('reset_ui')
+    hardware.door.unlock()      # Outside state.lock: the door takes it to pause presence sampling
+    return True
+
+kiosk = KioskStateMachine(kiosk_events)
+metrics.gauge("kiosk_scan_queue_depth", "Taps waiting for the camera", fn=lambda: kiosk.scheduler.waiting)
+metrics.gauge("kiosk_event_queue_depth", "Events waiting for the kiosk state machine", fn=lambda: len(kiosk_events))
+
+# --- 3. SOCKET HANDLERS ---
+@socketio.on('user_action')
+def handle_user_action(data):
+    action, card_id = data.get('action'), data.get('card_id')
+    # action ends up as a /metrics label: only the two buttons are accepted
+    if not card_id or action not in USER_ACTIONS: return
+    kiosk_events.post(events.USER_ACTION, action=action, card_id=card_id, at=datetime.now())
+
+# --- VIDEO STREAM SESSIONS ---
+@socketio.on('stream_subscribe')
+def handle_stream_subscribe(data):
+    tier = stream_hub.subscribe(flask_request.sid, (data or {}).get('tier'))
+    t = streaming.STREAM_TIERS[tier]
+    emit('stream_config', {'tier': tier, 'width': t['size'][0], 'height': t['size'][1], 'quality': t['quality']})
+
+@socketio.on('stream_unsubscribe')
+def handle_stream_unsubscribe(data=None):
+    stream_hub.unsubscribe(flask_request.sid)
+
+@socketio.on('frame_ack')
+def handle_frame_ack(data):
+    stream_hub.ack(flask_request.sid, (data or {}).get('seq'))
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    stream_hub.unsubscribe(flask_request.sid)
 
 # --- 4. ENROLLMENT & ADMIN ---
 @socketio.on('admin_login_request')
@@ -393,39 +623,32 @@ def handle_enroll_name(data):
         threading.Thread(target=enroll_user_face, args=(card, user, flask_request.sid), daemon=True).start()
 
 def enroll_user_face(card_id, user_name, socket_id):
-    global face_verification_active, current_face_frame, camera_instance
-    fname = f"{card_id}_{user_name}"
-    path = os.path.join(config.KNOWN_FACES_DIR, f"{fname}.jpg")
-    
-    with face_frame_lock: face_verification_active = True; current_face_frame = np.zeros((480,640,3), dtype=np.uint8)
+    global face_verification_active
+    face_frames.clear()
+    with face_frame_lock: face_verification_active = True
     socketio.emit('enrollment_status', {'message': 'Aligning Face...'}, room=socket_id)
     
+    overlays = streaming.OverlayPool()
+    def show(frame, box):
+        disp = overlays.next_copy(frame)
+        cv2.putText(disp, f"Enroll: {user_name}", (10,50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0,255,0), 2)
+        if box:
+            top, right, bottom, left = box
+            cv2.rectangle(disp, (left, top), (right, bottom), (0,255,0), 3)
+        face_frames.publish(disp)
+    
     try:
-        for _ in range(150):
-            time.sleep(0.05)
-            with camera_lock:
-                if not camera_instance or not camera_instance.isOpened(): continue
-                ret, frame = camera_instance.read()
-            if not ret: continue
-            
-            disp = frame.copy()
-            cv2.putText(disp, f"Enroll: {user_name}", (10,50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0,255,0), 2)
-            with face_frame_lock: current_face_frame[:] = disp
-            
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            locs = face_recognition.face_locations(rgb)
-            if locs:
-                encs = face_recognition.face_encodings(rgb, locs)
-                if encs:
-                    cv2.imwrite(path, frame)
-                    face_auth.KNOWN_ENCODINGS.append(encs[0])
-                    face_auth.KNOWN_NAMES.append(fname)
-                    socketio.emit('enrollment_success', {'message': 'Success!', 'card_id': card_id}, room=socket_id)
-                    return
-        socketio.emit('enrollment_error', {'message': 'Timeout'}, room=socket_id)
+        enrolled, reason = face_auth.capture_enrollment(camera_bus, card_id, user_name, on_frame=show)
+        if enrolled:
+            socketio.emit('enrollment_success', {'message': 'Success!', 'card_id': card_id}, room=socket_id)
+        elif reason == 'low_quality':
+            socketio.emit('enrollment_error', {'message': 'Face not clear - hold still and look at the camera'}, room=socket_id)
+        else:
+            socketio.emit('enrollment_error', {'message': 'Timeout'}, room=socket_id)
     except: socketio.emit('enrollment_error', {'message': 'Error'}, room=socket_id)
     finally:
-        with face_frame_lock: face_verification_active = False; current_face_frame = None
+        with face_frame_lock: face_verification_active = False
+        face_frames.clear()
         with state.lock: state.interaction_in_progress = False
 
 @socketio.on('enrollment_cancel')
@@ -472,7 +695,68 @@ def dashboard():
     return render_template('dashboard.html')
 
 @app.route('/api/attendance_logs')
-def get_logs(): return jsonify({'logs': cloud_sync.get_attendance_logs(limit=100)})
+def get_logs():
+    args = flask_request.args
+    try:
+        limit = min(max(int(args.get('limit', 100)), 1), 1000)
+    except ValueError:
+        limit = 100
+    return jsonify(cloud_sync.query_attendance_logs(
+        limit=limit,
+        cursor=args.get('cursor'),
+        date=args.get('date'),
+        name=args.get('name'),
+        card_id=args.get('card_id'),
+        start_time=args.get('start'),
+        end_time=args.get('end'),
+    ))
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/traces')
+def traces_export():
+    """Last N scans (?last=, default 20) as Chrome / Perfetto trace JSON. Admin only."""
+    if not session.get('logged_in'):
+        return jsonify({'error': 'login required'}), 401
+    try:
+        last = min(max(int(flask_request.args.get('last', 20)), 1), config.TRACE_KEEP)
+    except ValueError:
+        last = 20
+    response = jsonify(tracing.chrome_trace(tracing.RECORDER.last(last)))
+    response.headers['Content-Disposition'] = 'attachment; filename=scan_traces.json'
+    return response
+
+@app.route('/api/locks')
+def locks_stats():
+    """Lock wait/hold stats per call site (with source locations). Admin only."""
+    if not session.get('logged_in'):
+        return jsonify({'error': 'login required'}), 401
+    return jsonify(lockprof.summary())
+
+@app.route('/api/scan_sessions')
+def scan_sessions_stats():
+    """Queue wait stats and the open sessions (with card ids). Admin only."""
+    if not session.get('logged_in'):
+        return jsonify({'error': 'login required'}), 401
+    return jsonify(kiosk.scheduler.stats())
+
+@app.route('/api/timers')
+def timers_stats():
+    """Pending timers, firing lag and door cycles. Admin only."""
+    if not session.get('logged_in'):
+        return jsonify({'error': 'login required'}), 401
+    stats = state.timer_scheduler.stats()
+    stats["door"] = {"state": hardware.door.state, "cycles": hardware.door.cycles, "extended": hardware.door.extended}
+    return jsonify(stats)
+
+@app.route('/api/face_workers')
+def face_workers_stats():
+    """Face worker pool size, queue depth and latency. Admin only."""
+    if not session.get('logged_in'):
+        return jsonify({'error': 'login required'}), 401
+    return jsonify(face_auth.worker_stats())
 
 @app.route('/api/settings', methods=['GET', 'POST'])
 def api_settings():
@@ -489,6 +773,11 @@ def api_settings():
     return jsonify({'threshold': val})
 
 if __name__ == '__main__':
+    # 0. Build the gallery and fork the face worker processes before any thread exists
+    #    (both fork: encode_images' pool for new Known_Faces photos, and the worker pool)
+    face_auth.load_known_faces()
+    face_auth.start_workers()
+
     # 1. Start background system loop
     threading.Thread(target=background_loop, daemon=True).start()
 
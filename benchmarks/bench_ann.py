@@ -0,0 +1,73 @@
+"""
+Face-only identification: IVF index vs brute force, gallery 1k -> 100k.
+
+Run from the project root:
+    python -m benchmarks.bench_ann
+    python -m benchmarks.bench_ann --sizes 1000 10000 --nprobe 4 8 16
+
+Gallery vectors are synthetic 128-d "identities" spread like dlib
+encodings (~0.9 apart); queries are gallery members plus ~0.3 of noise,
+roughly a same-person distance. Reports index build time, incremental
+insert cost, query latency and recall@1 against brute force.
+"""
+import time
+import argparse
+import numpy as np
+
+from ann_index import IVFIndex, brute_force_search, recall_at_k
+
+def make_gallery(n, rng, dim=128):
+    return rng.normal(0.0, 0.06, (n, dim)).astype(np.float32)
+
+def make_queries(gallery, count, rng):
+    picks = rng.choice(len(gallery), count, replace=False)
+    noise = rng.normal(0.0, 0.02, (count, gallery.shape[1])).astype(np.float32)
+    return gallery[picks] + noise
+
+def timed_queries(fn, queries):
+    lat = []
+    for q in queries:
+        t = time.perf_counter()
+        fn(q)
+        lat.append((time.perf_counter() - t) * 1000)
+    lat.sort()
+    return float(np.mean(lat)), lat[int(0.95 * (len(lat) - 1))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--inserts", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'gallery':>8} {'lists':>6} {'build s':>8} {'ins us':>7} {'nprobe':>6} "
+          f"{'ann ms':>7} {'p95':>6} {'bf ms':>7} {'p95':>6} {'recall@1':>8}")
+    for n in args.sizes:
+        vectors = make_gallery(n, rng)
+        labels = [f"{i}_synthetic" for i in range(n)]
+
+        index = IVFIndex()
+        t = time.perf_counter()
+        index.build(vectors, labels)
+        build_s = time.perf_counter() - t
+
+        extra = make_gallery(args.inserts, rng)
+        t = time.perf_counter()
+        for i, v in enumerate(extra):
+            index.add(v, f"{n + i}_synthetic")
+        insert_us = (time.perf_counter() - t) / args.inserts * 1e6
+        all_vectors = np.vstack([vectors, extra])
+        all_labels = labels + [f"{n + i}_synthetic" for i in range(args.inserts)]
+
+        queries = make_queries(all_vectors, min(args.queries, len(all_vectors)), rng)
+        bf_mean, bf_p95 = timed_queries(lambda q: brute_force_search(all_vectors, all_labels, q), queries)
+        for nprobe in args.nprobe:
+            ann_mean, ann_p95 = timed_queries(lambda q: index.search(q, 1, nprobe), queries)
+            recall = recall_at_k(index, all_vectors, all_labels, queries, 1, nprobe)
+            print(f"{n:>8} {index.n_lists:>6} {build_s:>8.2f} {insert_us:>7.1f} {nprobe:>6} "
+                  f"{ann_mean:>7.3f} {ann_p95:>6.3f} {bf_mean:>7.3f} {bf_p95:>6.3f} {recall:>8.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Face detection cost: full-frame HOG vs ROI-first with downscaled fallback.
+
+Run from the project root (needs face_recognition):
+    python -m benchmarks.bench_detect --clip walkup.mp4
+    python -m benchmarks.bench_detect --clip walkup.mp4 --width 640 --roi-pad 0.4
+
+Every clip frame is resized to --width (320 = verification, 640 =
+enrollment) and run through face_tracker.FaceDetector in "full" and "roi"
+mode, each mode keeping its own last-known box as the hint the way the
+capture loops do. The full-frame result is the reference: a miss is a
+frame where the reference found a face and the mode did not. Reports
+latency (mean/p95), miss rate and which path (roi/fallback/full) answered.
+"""
+import time
+import argparse
+import cv2
+import face_recognition
+
+import config
+from face_tracker import FaceDetector
+
+def clip_frames(path, width, limit):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        height = int(frame.shape[0] * width / frame.shape[1])
+        frames.append(cv2.cvtColor(cv2.resize(frame, (width, height)), cv2.COLOR_BGR2RGB))
+    cap.release()
+    return frames
+
+def run(mode, frames, args):
+    detector = FaceDetector(face_recognition.face_locations, mode, args.roi_pad, args.fallback_width)
+    hint = None
+    latencies, found = [], []
+    for rgb in frames:
+        t = time.perf_counter()
+        boxes = detector.detect(rgb, hint)
+        latencies.append((time.perf_counter() - t) * 1000)
+        hint = boxes[0] if boxes else None
+        found.append(bool(boxes))
+    return latencies, found, detector.counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clip", required=True)
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--roi-pad", type=float, default=config.FACE_ROI_PAD)
+    parser.add_argument("--fallback-width", type=int, default=config.FACE_DETECT_FALLBACK_WIDTH)
+    args = parser.parse_args()
+
+    frames = clip_frames(args.clip, args.width, args.frames)
+    if not frames:
+        raise SystemExit(f"No frames read from {args.clip}")
+
+    results = {mode: run(mode, frames, args) for mode in FaceDetector.MODES}
+    reference = results["full"][1]
+    with_face = sum(reference) or 1
+
+    print(f"{len(frames)} frames at {args.width}px, face in {sum(reference)} (full-frame reference)")
+    print(f"{'mode':<6} {'mean ms':>8} {'p95 ms':>8} {'miss %':>7}  paths")
+    for mode, (latencies, found, counts) in results.items():
+        latencies.sort()
+        misses = sum(1 for ref, hit in zip(reference, found) if ref and not hit)
+        print(f"{mode:<6} {sum(latencies) / len(latencies):>8.2f} {latencies[int(0.95 * (len(latencies) - 1))]:>8.2f} "
+              f"{misses / with_face * 100:>7.1f}  {counts}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Main loop responsiveness: legacy 100 ms polling vs event queue + reader thread.
+
+Run from the project root (no GPIO needed):
+    python -m benchmarks.bench_event_loop
+    python -m benchmarks.bench_event_loop --taps 100 --idle-seconds 20
+
+Both loops run against hardware_sim.RFIDReader. The legacy loop is the
+skeleton of the old app.background_loop: sleep 0.1 s, read
+state.system_active under state.lock, count heartbeats, poll the reader.
+The new path is events.rfid_reader_loop posting CARD events to an
+events.EventQueue consumed with the heartbeat as get() timeout, like
+app.KioskStateMachine.run(). "UI event" = the first emit after a tap.
+
+Reports tap-to-first-UI-event latency (taps at random moments) and idle
+CPU of the whole process while awake and while asleep.
+"""
+import time
+import random
+import argparse
+import threading
+
+import state
+import events
+import hardware_sim
+
+def legacy_loop(reader, emit, stop):
+    heartbeat_counter = 0
+    while not stop.is_set():
+        time.sleep(0.1)
+        heartbeat_counter += 1
+        with state.lock:
+            active = state.system_active
+        if heartbeat_counter >= 20:
+            emit('system_status')
+            heartbeat_counter = 0
+        if not active:
+            continue
+        try:
+            card_id, _ = reader.read_no_block()
+        except Exception:
+            card_id = None
+        if card_id:
+            emit('interaction')
+
+def event_loop(reader, emit, stop, poll_interval, queue):
+    awake = threading.Event()
+    threading.Thread(target=events.rfid_reader_loop, args=(reader, queue.post, awake, poll_interval, 0.0),
+                     daemon=True).start()
+    next_heartbeat = time.time() + 2.0
+    while not stop.is_set():
+        event = queue.get(timeout=max(0.0, next_heartbeat - time.time()))
+        if event is not None:
+            if event.kind == events.PRESENCE:
+                (awake.set if event.data["active"] else awake.clear)()
+            elif event.kind == events.CARD:
+                emit('interaction')
+            elif event.kind == "stop":
+                break
+        if time.time() >= next_heartbeat:
+            emit('system_status')
+            next_heartbeat = time.time() + 2.0
+    awake.set()
+
+def measure(name, args):
+    reader = hardware_sim.RFIDReader()
+    ui = []
+    emit = lambda event: ui.append((event, time.perf_counter()))
+    stop = threading.Event()
+    queue = events.EventQueue()
+    # What hardware.activity_listeners does for the real kiosk
+    set_active = lambda active: (setattr(state, "system_active", active), queue.post(events.PRESENCE, active=active))
+    set_active(True)
+    body = (lambda: legacy_loop(reader, emit, stop)) if name == "legacy" else \
+        (lambda: event_loop(reader, emit, stop, args.poll_interval, queue))
+    loop = threading.Thread(target=body, daemon=True)
+    loop.start()
+    time.sleep(0.5)
+
+    latencies = []
+    for i in range(args.taps):
+        time.sleep(random.uniform(0.05, 0.3))
+        seen = len(ui)
+        tapped = time.perf_counter()
+        reader.tap(1000 + i)
+        while not any(e == 'interaction' for e, _ in ui[seen:]):
+            time.sleep(0.001)
+        latencies.append(next(t for e, t in ui[seen:] if e == 'interaction') - tapped)
+
+    cpu = {}
+    for awake in (True, False):
+        set_active(awake)
+        time.sleep(0.3)
+        c, w = time.process_time(), time.time()
+        time.sleep(args.idle_seconds)
+        cpu["awake" if awake else "asleep"] = (time.process_time() - c) / (time.time() - w) * 100
+    stop.set()
+    queue.post("stop")
+    loop.join()
+    latencies.sort()
+    return latencies, cpu
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--taps", type=int, default=50)
+    parser.add_argument("--idle-seconds", type=float, default=10.0)
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="Reader thread poll interval")
+    args = parser.parse_args()
+    random.seed(0)
+
+    print(f"{'loop':<8} {'tap p50 ms':>11} {'tap p95 ms':>11} {'tap max ms':>11} {'idle cpu awake %':>17} {'asleep %':>9}")
+    for name in ("legacy", "events"):
+        lat, cpu = measure(name, args)
+        pick = lambda q: lat[int(q * (len(lat) - 1))] * 1000
+        print(f"{name:<8} {pick(0.5):>11.1f} {pick(0.95):>11.1f} {lat[-1] * 1000:>11.1f} "
+              f"{cpu['awake']:>17.3f} {cpu['asleep']:>9.3f}")
+
+if __name__ == "__main__":
+    main()
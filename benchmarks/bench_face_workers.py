@@ -0,0 +1,87 @@
+"""
+Event-loop stalls with dlib in-process vs in the face worker pool.
+
+Run from the project root (needs face_recognition):
+    python -m benchmarks.bench_face_workers --clip walkup.mp4
+    python -m benchmarks.bench_face_workers --workers 1 2 4 --seconds 10
+
+A "heartbeat" thread stands in for Socket.IO handlers / the RFID loop:
+it wakes every 10 ms and records how late it ran. Meanwhile a
+verification-like thread runs face_locations on 320x240 frames as fast as
+it can, either in-process (--workers 0) or through face_auth's worker
+pool. Reports detections/s, heartbeat lag p50/p99/max and pool stats.
+"""
+import time
+import argparse
+import threading
+import cv2
+import numpy as np
+
+import face_auth
+
+def load_frames(path, limit=200):
+    frames = []
+    if path:
+        cap = cv2.VideoCapture(path)
+        while len(frames) < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(cv2.cvtColor(cv2.resize(frame, (320, 240)), cv2.COLOR_BGR2RGB))
+        cap.release()
+    if not frames:
+        rng = np.random.default_rng(0)
+        frames = [cv2.GaussianBlur(rng.integers(0, 256, (240, 320, 3), dtype=np.uint8), (9, 9), 0)]
+    return frames
+
+def heartbeat(stop, lags, period=0.01):
+    due = time.perf_counter() + period
+    while not stop.is_set():
+        time.sleep(max(0.0, due - time.perf_counter()))
+        now = time.perf_counter()
+        lags.append((now - due) * 1000)
+        due = now + period
+
+def run(workers, frames, seconds):
+    face_auth.WORKERS = None
+    if workers:
+        face_auth.start_workers(workers)
+
+    stop = threading.Event()
+    lags = []
+    beat = threading.Thread(target=heartbeat, args=(stop, lags), daemon=True)
+    beat.start()
+
+    done = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        face_auth.face_locations(frames[done % len(frames)])
+        done += 1
+    elapsed = time.perf_counter() - started
+    stop.set()
+    beat.join()
+
+    stats = face_auth.worker_stats()
+    if face_auth.WORKERS:
+        face_auth.WORKERS.close()
+        face_auth.WORKERS = None
+    lags.sort()
+    pick = lambda q: lags[int(q * (len(lags) - 1))] if lags else 0.0
+    return done / elapsed, pick(0.5), pick(0.99), lags[-1] if lags else 0.0, stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clip", default=None, help="Video to take frames from (default: synthetic frame)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    frames = load_frames(args.clip)
+    print(f"{'workers':>7} {'det/s':>7} {'lag p50':>8} {'lag p99':>8} {'lag max':>8}  pool")
+    for workers in args.workers:
+        rate, p50, p99, worst, stats = run(workers, frames, args.seconds)
+        print(f"{workers:>7} {rate:>7.1f} {p50:>8.2f} {p99:>8.2f} {worst:>8.2f}  {stats}")
+    print("lag = ms a 10 ms heartbeat thread ran late (GIL contention)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Gallery build throughput: images/second for 1, 2 and 4 encoder processes.
+
+Run from the project root:
+    python -m benchmarks.bench_gallery_build --images 64
+    python -m benchmarks.bench_gallery_build --source Known_Faces/123_Alice.jpg
+
+Without --source the images are synthetic noise (decode + HOG cost only,
+no encodings). With --source every image is a jittered copy of a real
+face photo, so the full detect + encode path is exercised.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import cv2
+import numpy as np
+
+import face_auth
+
+def make_image_set(directory, count, source=None, size=(640, 480)):
+    rng = np.random.default_rng(0)
+    base = None
+    if source:
+        base = cv2.imread(source)
+        if base is None:
+            sys.exit(f"Cannot read {source}")
+    paths = []
+    for i in range(count):
+        if base is not None:
+            noise = rng.integers(-6, 7, base.shape, dtype=np.int16)
+            img = np.clip(base.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+        else:
+            img = rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+        path = os.path.join(directory, f"{i:06d}_synthetic.jpg")
+        cv2.imwrite(path, img)
+        paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=32)
+    parser.add_argument("--source", help="Face photo to replicate instead of random noise")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_image_set(tmp, args.images, args.source)
+        print(f"{'workers':>8} {'seconds':>9} {'img/s':>8} {'faces':>6}")
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            results = face_auth.encode_images(paths, workers=workers, progress=lambda done, total: None)
+            elapsed = time.perf_counter() - start
+            faces = sum(1 for enc, err in results if enc is not None)
+            rate = len(paths) / elapsed
+            baseline = baseline or rate
+            print(f"{workers:>8} {elapsed:>9.2f} {rate:>8.2f} {faces:>6}   x{rate / baseline:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Cost of the /metrics instrumentation.
+
+Run from the project root:
+    python -m benchmarks.bench_metrics
+    python -m benchmarks.bench_metrics --iterations 200000 --frames 300
+
+1. Per-update cost of counters / histograms (plain, labelled, time()
+   context manager) with metrics.ENABLED on and off.
+2. Instrumented stages run with metrics on and off: live-stream JPEG
+   encode (streaming.encode_jpeg on a 640x480 frame) and active-scan
+   journal writes (storage.record_scan_update, text backend in a temporary
+   directory).
+3. Estimated (not measured) per-frame overhead of a verification: the
+   face_auth call wrappers add one histogram update per dlib call, so
+   3 x the prebound observe() cost is compared against an assumed
+   --frame-ms frame time.
+4. Time to render a /metrics scrape.
+"""
+import os
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+import config
+import metrics
+
+def per_op_ns(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e9
+
+def timed_loop(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return time.perf_counter() - started
+
+def on_off(fn, iterations, rounds=5):
+    """Best-of-rounds seconds for the loop with metrics on and off (interleaved to share drift)."""
+    best = {True: float("inf"), False: float("inf")}
+    for _ in range(rounds):
+        for enabled in (False, True):
+            metrics.ENABLED = enabled
+            best[enabled] = min(best[enabled], timed_loop(fn, iterations))
+    metrics.ENABLED = True
+    return best[False], best[True]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100000, help="Updates per micro-benchmark")
+    parser.add_argument("--frames", type=int, default=200, help="Frames per JPEG encode round")
+    parser.add_argument("--writes", type=int, default=2000, help="Journal writes per storage round")
+    parser.add_argument("--frame-ms", type=float, default=60.0,
+                        help="Assumed verification frame time for the estimated overhead row")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_metrics_")
+    config.ACTIVE_FILE = os.path.join(tmp, "active_scans.txt")
+    config.ACTIVE_JOURNAL_FILE = os.path.join(tmp, "active_scans.journal")
+    config.LOG_FILE = os.path.join(tmp, "attendance_log.txt")
+    config.STORAGE_BACKEND = "text"
+    import state
+    import storage
+    import streaming
+
+    counter = metrics.counter("bench_total", "bench")
+    hist = metrics.histogram("bench_seconds", "bench")
+    labelled = metrics.histogram("bench_labelled_seconds", "bench", ["op"])
+    child = labelled.labels("encodings")
+
+    def timed():
+        with child.time():
+            pass
+
+    print(f"{'update':<34} {'on ns':>8} {'off ns':>8}")
+    per_update = {}
+    for name, fn in (("counter.inc()", counter.inc),
+                     ("histogram.observe()", lambda: hist.observe(0.012)),
+                     ("child.observe() (prebound label)", lambda: child.observe(0.012)),
+                     ("labels('x').observe()", lambda: labelled.labels("encodings").observe(0.012)),
+                     ("with child.time()", timed)):
+        metrics.ENABLED = True
+        on = per_op_ns(fn, args.iterations)
+        metrics.ENABLED = False
+        off = per_op_ns(fn, args.iterations)
+        metrics.ENABLED = True
+        per_update[name] = on
+        print(f"{name:<34} {on:>8.0f} {off:>8.0f}")
+
+    print(f"\n{'stage':<34} {'off ms':>8} {'on ms':>8} {'overhead':>9}")
+    frame = np.random.randint(0, 255, (480, 640, 3), np.uint8)
+    off, on = on_off(lambda: streaming.encode_jpeg(frame, (480, 360), 40), args.frames)
+    print(f"{'encode_jpeg 640x480 -> 480x360':<34} {off / args.frames * 1000:>8.3f} {on / args.frames * 1000:>8.3f} "
+          f"{(on - off) / off * 100:>8.2f}%")
+
+    state.scan1["bench"] = {"name": "Bench", "entry": datetime.now(), "on_break": False,
+                            "total_break_seconds": 0.0, "breaks": []}
+    off, on = on_off(lambda: storage.record_scan_update("bench"), args.writes)
+    print(f"{'record_scan_update (journal)':<34} {off / args.writes * 1000:>8.3f} {on / args.writes * 1000:>8.3f} "
+          f"{(on - off) / off * 100:>8.2f}%")
+    storage.flush_journal()
+
+    # Estimate, not a measurement: a verification frame makes ~3 dlib calls (detect or track,
+    # encode, landmarks), each adding one prebound observe(), on top of an assumed --frame-ms
+    per_frame_us = 3 * per_update["child.observe() (prebound label)"] / 1000
+    print(f"{'verification frame (estimate)*':<34} {args.frame_ms:>8.3f} {args.frame_ms + per_frame_us / 1000:>8.3f} "
+          f"{per_frame_us / 1000 / args.frame_ms * 100:>8.4f}%")
+    print(f"* assumed {args.frame_ms:g} ms frame (--frame-ms) + 3 x the observe() cost above; not timed")
+
+    started = time.perf_counter()
+    text = metrics.render()
+    print(f"\n/metrics render: {(time.perf_counter() - started) * 1000:.2f} ms, "
+          f"{len(text.splitlines())} lines, {len(text)} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Cloud outbox throughput with local stand-ins for Firebase.
+
+Run from the project root:
+    python -m benchmarks.bench_outbox --records 2000
+    python -m benchmarks.bench_outbox --transport http --latency-ms 50 --fail-every 7
+
+Measures put() latency (what handle_user_action pays while holding
+state.lock) and end-to-end delivered records/second for several batch
+sizes. The HTTP stand-in can add per-request latency and inject failures
+to exercise retry/backoff and ordering.
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import outbox
+
+class StandInServer:
+    """Tiny Firebase stand-in: accepts POSTed {key: record} batches."""
+
+    def __init__(self, latency_ms=0, fail_every=0):
+        self.keys = []
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                server.requests += 1
+                time.sleep(latency_ms / 1000.0)
+                if fail_every and server.requests % fail_every == 0:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                server.keys.extend(sorted(json.loads(body)))
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/attendance_logs"
+
+def sample_record(i):
+    now = datetime.now().isoformat()
+    return {"card_id": str(100000 + i), "name": f"user{i}", "entry": now, "exit": now,
+            "duration_seconds": 3600.0, "total_break_seconds": 0.0, "breaks": []}
+
+def run(transport_name, records, batch_size, latency_ms, fail_every, tmp):
+    server = None
+    if transport_name == "http":
+        server = StandInServer(latency_ms, fail_every)
+        transport = outbox.HTTPTransport(server.url)
+    else:
+        transport = outbox.FileTransport(os.path.join(tmp, f"delivered_{batch_size}.jsonl"))
+
+    box = outbox.Outbox(os.path.join(tmp, f"outbox_{transport_name}_{batch_size}.db"), transport,
+                        batch_size=batch_size, base_backoff=0.05, max_backoff=0.2)
+    box.start()
+
+    put_lat = []
+    start = time.perf_counter()
+    for i in range(records):
+        t = time.perf_counter()
+        box.put(sample_record(i))
+        put_lat.append((time.perf_counter() - t) * 1000)
+    box.flush()
+    elapsed = time.perf_counter() - start
+
+    put_lat.sort()
+    ordered = server is None or server.keys == sorted(server.keys)
+    return records / elapsed, sum(put_lat) / len(put_lat), put_lat[int(0.99 * (len(put_lat) - 1))], box.failures, ordered
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", choices=["file", "http"], default="file")
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 10, 25, 100])
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="HTTP stand-in latency per request")
+    parser.add_argument("--fail-every", type=int, default=0, help="HTTP stand-in fails every Nth request")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'batch':>6} {'rec/s':>9} {'put ms':>8} {'put p99':>8} {'retries':>8} {'ordered':>8}")
+        for batch in args.batch:
+            rate, put_mean, put_p99, failures, ordered = run(
+                args.transport, args.records, batch, args.latency_ms, args.fail_every, tmp)
+            print(f"{batch:>6} {rate:>9.1f} {put_mean:>8.3f} {put_p99:>8.3f} {failures:>8} {str(ordered):>8}")
+
+if __name__ == "__main__":
+    main()
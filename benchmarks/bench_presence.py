@@ -0,0 +1,138 @@
+"""
+Presence sensing cost: legacy busy-wait ultrasonic loop vs PresenceMonitor.
+
+Run from the project root (no GPIO needed):
+    python -m benchmarks.bench_presence
+    python -m benchmarks.bench_presence --seconds 20 --distance 120 --door-every 4
+    python -m benchmarks.bench_presence --distance 0      # nothing in front of the sensor
+
+The echo line is emulated from the clock: after a trigger it goes high
+for distance / 17150 seconds, like an HC-SR04. The legacy loop polls it
+exactly like the old hardware.ultrasonic_thread (busy-waiting on both
+edges, sleeping 0.5 s under state.lock while the door moves). The new
+path is presence.PresenceMonitor over a sensor that sleeps until the
+echo, which is what the edge-callback measure() does on the Pi.
+
+Reports CPU used by the sensing thread (thread_time / wall time) and
+how long another thread waited for state.lock while the door was moving.
+"""
+import time
+import argparse
+import threading
+
+import state
+import presence
+
+class EmulatedEcho:
+    def __init__(self, distance):
+        self.distance = distance
+        self.rise = self.fall = 0.0
+
+    def trigger(self):
+        if self.distance <= 0:                      # nothing in range: the echo never comes
+            self.rise = self.fall = float("inf")
+            return
+        self.rise = time.time() + 0.0004            # sensor burst before the echo goes high
+        self.fall = self.rise + self.distance / 17150
+
+    def input(self):
+        now = time.time()
+        return 1 if self.rise <= now < self.fall else 0
+
+class EdgeSensor:
+    """What hardware_gpio.Ultrasonic.measure() amounts to: trigger, then sleep until the falling edge."""
+
+    def __init__(self, echo):
+        self.echo = echo
+
+    def measure(self):
+        self.echo.trigger()
+        if self.echo.fall == float("inf"):
+            time.sleep(0.05)                        # hardware_gpio.Ultrasonic.ECHO_TIMEOUT
+            return None
+        time.sleep(max(0.0, self.echo.fall - time.time()))
+        return round((self.echo.fall - self.echo.rise) * 17150, 1)
+
+def legacy_loop(echo, stop, cpu):
+    started = time.thread_time()
+    while not stop.is_set():
+        with state.lock:
+            if state.door_operation_active:
+                time.sleep(0.5)
+                continue
+        time.sleep(0.02)
+        echo.trigger()
+        pulse_start = pulse_end = None
+        start_wait = time.time()
+        while echo.input() == 0:
+            pulse_start = time.time()
+            if time.time() - start_wait > 0.5: break
+        start_wait = time.time()
+        while echo.input() == 1:
+            pulse_end = time.time()
+            if time.time() - start_wait > 0.5: break
+        time.sleep(0.2)
+    cpu.append(time.thread_time() - started)
+
+def door_cycles(stop, every, waits):
+    """Moves the door every `every` seconds for 1 s while probing state.lock from another thread."""
+    while not stop.wait(every):
+        with state.lock:
+            state.door_operation_active = True
+        state.door_idle.clear()
+        end = time.time() + 1.0
+        while time.time() < end:
+            t = time.perf_counter()
+            with state.lock:
+                pass
+            waits.append(time.perf_counter() - t)
+            time.sleep(0.01)
+        with state.lock:
+            state.door_operation_active = False
+        state.door_idle.set()
+
+def run(name, args):
+    echo = EmulatedEcho(args.distance)
+    stop = threading.Event()
+    cpu, waits = [], []
+    door = threading.Thread(target=door_cycles, args=(stop, args.door_every, waits), daemon=True)
+
+    if name == "legacy":
+        worker = threading.Thread(target=legacy_loop, args=(echo, stop, cpu), daemon=True)
+    else:
+        def worker_body():
+            monitor = presence.PresenceMonitor(EdgeSensor(echo), rate_hz=args.rate, gate=state.door_idle)
+            waker = threading.Thread(target=lambda: (stop.wait(), monitor.stop(), state.door_idle.set()), daemon=True)
+            waker.start()
+            started = time.thread_time()
+            monitor.run()
+            cpu.append(time.thread_time() - started)
+        worker = threading.Thread(target=worker_body, daemon=True)
+
+    wall = time.time()
+    worker.start()
+    door.start()
+    time.sleep(args.seconds)
+    stop.set()
+    worker.join()
+    door.join()
+    wall = time.time() - wall
+    waits.sort()
+    return cpu[0] / wall * 100, (waits[-1] * 1000 if waits else 0.0), (waits[len(waits) // 2] * 1000 if waits else 0.0)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--distance", type=float, default=120.0, help="Emulated distance in cm (0 = no echo)")
+    parser.add_argument("--rate", type=float, default=5.0, help="PresenceMonitor samples per second")
+    parser.add_argument("--door-every", type=float, default=3.0, help="Seconds between 1 s door movements")
+    args = parser.parse_args()
+
+    print(f"{'path':<8} {'cpu %':>7} {'lock wait p50 ms':>17} {'lock wait max ms':>17}")
+    for name in ("legacy", "monitor"):
+        cpu, worst, median = run(name, args)
+        print(f"{name:<8} {cpu:>7.2f} {median:>17.2f} {worst:>17.2f}")
+    print("cpu % = CPU time of the sensing thread / wall time (100 = one full core)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Live stream cost: legacy base64 loop vs encode-once binary broadcaster.
+
+Run from the project root:
+    python -m benchmarks.bench_stream
+    python -m benchmarks.bench_stream --ticks 400 --change-every 3
+
+Replays the ws_camera_stream loop body without Socket.IO. A synthetic
+640x480 camera produces a new frame every --change-every loop ticks, so
+some ticks see an unchanged frame. Reports CPU time per delivered frame
+and bytes on the wire (legacy = base64 text, new = binary JPEG).
+"""
+import time
+import base64
+import argparse
+import cv2
+import numpy as np
+
+from streaming import FrameSlot, FrameBroadcaster
+
+def synthetic_frames(count, rng):
+    base = rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    base = cv2.GaussianBlur(base, (21, 21), 0)    # camera-like, compressible content
+    frames = []
+    for i in range(count):
+        frame = np.roll(base, i * 7, axis=1)
+        cv2.rectangle(frame, (100 + i % 200, 80), (300 + i % 200, 320), (0, 255, 0), 3)
+        frames.append(frame)
+    return frames
+
+def legacy_loop(frames, ticks, change_every):
+    latest = None
+    delivered = wire = 0
+    cpu = time.process_time()
+    for tick in range(ticks):
+        if tick % change_every == 0:
+            latest = frames[(tick // change_every) % len(frames)]
+        # Old ws_camera_stream body: every tick, changed or not
+        if np.count_nonzero(latest) > 0:
+            frame = cv2.resize(latest, (640, 480))
+            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 40])
+            payload = base64.b64encode(buffer).decode()
+            delivered += 1
+            wire += len(payload)
+    cpu = time.process_time() - cpu
+    return cpu, delivered, wire
+
+def broadcaster_loop(frames, ticks, change_every):
+    slot = FrameSlot()
+    broadcaster = FrameBroadcaster(size=(640, 480), quality=40)
+    delivered = wire = 0
+    last_key = None
+    cpu = time.process_time()
+    for tick in range(ticks):
+        if tick % change_every == 0:
+            slot.publish(frames[(tick // change_every) % len(frames)])
+        seq, frame = slot.get()
+        key = ('raw', seq)
+        if key == last_key:
+            continue        # Unchanged since the last delivery (StreamSession.wants() in the app)
+        last_key = key
+        payload = broadcaster.encode(key, frame)
+        if payload is None:
+            continue
+        delivered += 1
+        wire += len(payload)
+    cpu = time.process_time() - cpu
+    return cpu, delivered, wire
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--change-every", type=int, default=2, help="Stream ticks per new camera frame")
+    args = parser.parse_args()
+
+    frames = synthetic_frames(32, np.random.default_rng(0))
+    print(f"{'path':<12} {'delivered':>9} {'unique':>7} {'cpu s':>7} {'ms/deliv':>9} {'ms/unique':>9} {'KB/frame':>9}")
+    for name, loop in (("legacy", legacy_loop), ("broadcast", broadcaster_loop)):
+        cpu, delivered, wire = loop(frames, args.ticks, args.change_every)
+        unique = -(-args.ticks // args.change_every)
+        print(f"{name:<12} {delivered:>9} {unique:>7} {cpu:>7.2f} {cpu / max(delivered, 1) * 1000:>9.2f} "
+              f"{cpu / unique * 1000:>9.2f} {wire / max(delivered, 1) / 1024:>9.1f}")
+    print("ms/unique = CPU spent per distinct camera frame shown to viewers")
+
+if __name__ == "__main__":
+    main()
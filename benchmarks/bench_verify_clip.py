@@ -0,0 +1,46 @@
+"""
+Verification pipeline on a recorded clip: detect-every-frame vs detect-then-track.
+
+Run from the project root (needs face_recognition and an enrolled card):
+    python -m benchmarks.bench_verify_clip --clip walkup.mp4 --card 123456789
+    python -m benchmarks.bench_verify_clip --clip walkup.mp4 --card 123456789 --redetect 1 5 10 20
+
+Plays the clip through face_auth.verify_face_for_card as if it were the
+camera (one frame per read(), as fast as the pipeline consumes them) once
+per FACE_REDETECT_EVERY value (HOG on every Nth frame, N - 1 tracked
+frames in between). --redetect 1 runs HOG on every frame and never starts
+the tracker, which is the pre-tracker behaviour and the default baseline. Reports processed fps, per-stage calls and
+average ms, and time-to-identity / time-to-decision.
+"""
+import argparse
+
+import config
+import face_auth
+from benchmarks.replay import ReplayCamera
+
+def fmt(value):
+    return "-" if value is None else f"{value:.2f}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clip", required=True, help="Video file with a face walking up and blinking")
+    parser.add_argument("--card", default=None, help="Enrolled card id (omit for 1:N identification)")
+    parser.add_argument("--redetect", type=int, nargs="+", default=[1, config.FACE_REDETECT_EVERY])
+    parser.add_argument("--loop", action="store_true", help="Replay the clip until the verification timeout")
+    args = parser.parse_args()
+
+    face_auth.load_known_faces()
+
+    print(f"{'redetect':>8} {'outcome':>13} {'frames':>7} {'fps':>7} {'detect':>13} {'track':>13} "
+          f"{'encode':>13} {'landmarks':>13} {'t_id s':>7} {'t_dec s':>7}")
+    for every in args.redetect:
+        config.FACE_REDETECT_EVERY = every
+        face_auth.verify_face_for_card(args.card, None, ReplayCamera(args.clip, loop=args.loop))
+        stats = face_auth.LAST_VERIFY_STATS.as_dict()
+        stages = [f"{s['calls']}x{fmt(s['ms_avg'])}ms" for s in stats["stages"].values()]
+        print(f"{every:>8} {stats['outcome']:>13} {stats['frames']:>7} {stats['fps']:>7.1f} "
+              + " ".join(f"{s:>13}" for s in stages)
+              + f" {fmt(stats['time_to_identity']):>7} {fmt(stats['time_to_decision']):>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Scan-throughput load generator on simulated hardware.
+
+Run from the project root (no GPIO needed; the app's Python deps are):
+    python -m benchmarks.loadgen --taps-per-min 6 --minutes 3
+    python -m benchmarks.loadgen --taps-per-min 20 --users 8 --verify-ms 800 --out results/load.json
+
+Imports app with config.HARDWARE_BACKEND = "sim" and all data files in a
+temporary directory, then runs the real background_loop (kiosk state
+machine, scan sessions, RFID reader thread, presence events) and
+handle_user_action flow. The simulated ultrasonic sensor always sees a
+person, card taps go into the simulated RFID reader at a fixed rate, and a
+scripted client answers 'ask_user_action' prompts. Each user cycles
+entry -> break -> return -> leave. Face verification is replaced by a fixed
+delay (--verify-ms); the face pipeline has its own benchmarks.
+
+Reports offered vs completed taps/min, tap-to-first-UI-event latency
+('Processing Card...' or 'scan_queued'), camera queue wait, tap-to-decision latency for
+entry/return (until 'user_checked_in') and tap-to-door latency for
+break/leave (until the door unlocks, or stays open longer), plus taps that never got
+an answer or a door.
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import collections
+
+import cv2
+import numpy as np
+
+import config
+
+SCRIPT = ("entry", "break", "return", "leave")
+
+def prepare_sandbox(tmp, users, door_seconds):
+    config.HARDWARE_BACKEND = "sim"
+    config.KNOWN_FACES_DIR = os.path.join(tmp, "known_faces")
+    config.FACE_CACHE_DIR = os.path.join(tmp, "face_cache")
+    config.ACTIVE_FILE = os.path.join(tmp, "active_scans.txt")
+    config.ACTIVE_JOURNAL_FILE = os.path.join(tmp, "active_scans.journal")
+    config.LOG_FILE = os.path.join(tmp, "attendance_log.txt")
+    config.SQLITE_DB_FILE = os.path.join(tmp, "attendance.db")
+    config.OUTBOX_FILE = os.path.join(tmp, "cloud_outbox.db")
+    config.CLOUD_TRANSPORT = "file:" + os.path.join(tmp, "cloud.jsonl")
+    config.DOOR_OPEN_SECONDS = door_seconds
+    config.FACE_WORKERS = 0
+    os.makedirs(config.KNOWN_FACES_DIR, exist_ok=True)
+
+    # Enrollment is keyed by file name; the pictures themselves are never matched
+    blank = np.zeros((120, 120, 3), np.uint8)
+    cards = {}
+    for i in range(users):
+        card, name = str(900000000000 + i), f"load{i:03d}"
+        cv2.imwrite(os.path.join(config.KNOWN_FACES_DIR, f"{card}_{name}.jpg"), blank)
+        cards[card] = name
+    return cards
+
+class LoadClient:
+    """Plays the kiosk browser and the people tapping cards."""
+
+    def __init__(self, app, hardware, cards, think_ms):
+        self.app = app
+        self.hardware = hardware
+        self.cards = cards
+        self.by_name = {name: card for card, name in cards.items()}
+        self.think = think_ms / 1000.0
+        self.step = {card: 0 for card in cards}
+        self.pending = {}                   # card -> (kind, tap time)
+        self.door_waiting = collections.deque()
+        self.awaiting_ui = {}               # card -> tap time, until the first UI event
+        self.latency = collections.defaultdict(list)
+        self.denied = 0
+        self.unexpected = collections.Counter()
+        self.lock = threading.Lock()
+        self.offered = 0
+
+    # --- app -> client ---
+    def on_emit(self, event, data=None, *args, **kwargs):
+        data = data or {}
+        now = time.time()
+        if event == 'user_checked_in':
+            card = self.by_name.get(data.get('name'))
+            with self.lock:
+                tap = self.pending.pop(card, None)
+            if tap:
+                self.latency["decision_" + tap[0]].append(now - tap[1])
+        elif event == 'ask_user_action':
+            card = data.get('card_id')
+            with self.lock:
+                tap = self.pending.get(card)
+            if tap and tap[0] in ("break", "leave"):
+                threading.Thread(target=self._answer, args=(card, tap), daemon=True).start()
+            else:
+                self.unexpected['ask_user_action'] += 1
+        elif event == 'scan_queued' or (event == 'interaction' and data.get('msg') == 'Processing Card...'):
+            with self.lock:
+                tapped = self.awaiting_ui.pop(data.get('card_id'), None)
+            if tapped:
+                self.latency["first_ui"].append(now - tapped)
+        elif event == 'interaction' and 'Denied' in str(data.get('msg', '')):
+            self.denied += 1
+        elif event == 'enrollment_request':
+            self.unexpected['enrollment_request'] += 1
+
+    def _answer(self, card, tap):
+        time.sleep(self.think)
+        with self.lock:
+            self.pending.pop(card, None)
+            self.door_waiting.append((card, tap))
+        self.app.handle_user_action({'action': tap[0], 'card_id': card})
+
+    def on_door(self, what, now):
+        if what not in ("open", "extended"):
+            return
+        with self.lock:
+            if not self.door_waiting:
+                return
+            _, (kind, tapped) = self.door_waiting.popleft()
+        self.latency["door_" + kind].append(now - tapped)
+
+    # --- client -> app ---
+    def tap_next(self):
+        """Taps the next card whose owner is not mid-interaction."""
+        with self.lock:
+            busy = set(self.pending) | {card for card, _ in self.door_waiting}
+            idle = [card for card in self.cards if card not in busy]
+            if not idle:
+                return False
+            card = random.choice(idle)
+            kind = SCRIPT[self.step[card] % len(SCRIPT)]
+            self.step[card] += 1
+            self.pending[card] = (kind, time.time())
+            self.awaiting_ui[card] = self.pending[card][1]
+            self.offered += 1
+        self.hardware.reader.tap(card)
+        return True
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--taps-per-min", type=float, default=6.0)
+    parser.add_argument("--minutes", type=float, default=2.0)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--verify-ms", type=float, default=1500.0, help="Simulated face verification time")
+    parser.add_argument("--think-ms", type=float, default=500.0, help="User time to press Break/Leave")
+    parser.add_argument("--door-seconds", type=float, default=3.0)
+    parser.add_argument("--drain", type=float, default=30.0, help="Seconds to wait for answers after the last tap")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Write the report as JSON to this file")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    tmp = tempfile.mkdtemp(prefix="loadgen_")
+    cards = prepare_sandbox(tmp, args.users, args.door_seconds)
+
+    import app
+    import hardware
+    import face_auth
+    import enrollments
+
+    def simulated_verify(card_id, *a, **kw):
+        time.sleep(args.verify_ms / 1000.0)
+        rec = enrollments.get(card_id)
+        return (True, f"{card_id}_{rec['name']}") if rec else (False, "not_enrolled")
+    face_auth.verify_face_for_card = simulated_verify
+
+    client = LoadClient(app, hardware, cards, args.think_ms)
+    app.socketio.emit = client.on_emit
+    hardware.door.listeners.append(client.on_door)
+    hardware.ultrasonic.distance = 20.0
+
+    threading.Thread(target=app.background_loop, daemon=True).start()
+    time.sleep(2.0)     # known faces, active scans, sender, hardware threads
+
+    interval = 60.0 / args.taps_per_min
+    started = time.time()
+    deadline = started + args.minutes * 60
+    next_tap = started
+    while time.time() < deadline:
+        time.sleep(max(0.0, next_tap - time.time()))
+        client.tap_next()
+        next_tap += interval
+    taps_end = time.time()
+
+    drain_until = taps_end + args.drain
+    while time.time() < drain_until and (client.pending or client.door_waiting):
+        time.sleep(0.2)
+    elapsed = time.time() - started
+
+    completed = sum(len(v) for k, v in client.latency.items() if k != "first_ui")
+    report = {
+        "taps_per_min_offered": round(client.offered / ((taps_end - started) / 60), 2),
+        "taps_per_min_completed": round(completed / (elapsed / 60), 2),
+        "offered": client.offered,
+        "completed": completed,
+        "unanswered": len(client.pending),
+        "doors_missing": len(client.door_waiting),
+        "denied": client.denied,
+        "unexpected": dict(client.unexpected),
+        "scan_sessions": {k: v for k, v in app.kiosk.scheduler.stats().items() if k != "open"},
+        "params": vars(args),
+        "latency_s": {
+            kind: {"n": len(v), "p50": percentile(v, 0.5), "p95": percentile(v, 0.95),
+                   "p99": percentile(v, 0.99), "max": max(v)}
+            for kind, v in sorted(client.latency.items())
+        },
+    }
+
+    print(f"offered {report['taps_per_min_offered']} taps/min, completed {report['taps_per_min_completed']}/min "
+          f"({completed}/{client.offered}); unanswered {report['unanswered']}, doors missing {report['doors_missing']}")
+    sessions = report["scan_sessions"]
+    print(f"camera queue wait p50 {sessions['queue_wait_p50']} s, p95 {sessions['queue_wait_p95']} s; "
+          f"sessions {sessions['counts']}")
+    print(f"{'latency':<16} {'n':>5} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'max s':>7}")
+    for kind, s in report["latency_s"].items():
+        print(f"{kind:<16} {s['n']:>5} {s['p50']:>7.2f} {s['p95']:>7.2f} {s['p99']:>7.2f} {s['max']:>7.2f}")
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {args.out}")
+
+if __name__ == "__main__":
+    main()
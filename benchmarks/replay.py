@@ -0,0 +1,206 @@
+"""
+Offline replay of the face pipeline: recorded clips instead of a camera.
+
+Run from the project root (headless, no GPIO needed; needs face_recognition):
+    python -m benchmarks.replay verify --source walkup.mp4 --card 123456789
+    python -m benchmarks.replay verify --source frames/ --card 123456789 --fps 15 --repeat 3
+    python -m benchmarks.replay enroll --source enroll.mp4 --card 42 --name Test
+    python -m benchmarks.replay verify --source walkup.mp4 --card 123456789 --out results/verify.json
+
+--source is a video file, a directory of images (played in name order) or
+a glob. ReplayCamera feeds it to face_auth.verify_face_for_card or
+face_auth.capture_enrollment as if it were the camera. Without --fps
+frames are served as fast as the pipeline asks for them; with --fps they
+are paced like a live camera and frames the pipeline was too slow for are
+skipped.
+
+Each run reports frames processed, per-stage calls and ms, time-to-identity,
+time-to-blink, time-to-decision and CPU seconds. --out writes the runs plus
+the git commit and the relevant config values as JSON, for comparing
+commits. Enrollment runs into a temporary Known_Faces/face_cache unless
+--keep is given.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+import cv2
+
+import config
+import face_auth
+import face_store
+
+class ReplayCamera:
+    """Camera stand-in (read()/isOpened()/release()) over a video file or image sequence."""
+
+    def __init__(self, source, fps=None, loop=False):
+        self.source = source
+        self.fps = fps
+        self.loop = loop
+        self.opened = True
+        self.served = 0
+        self.skipped = 0
+        self._index = 0
+        self._started = None
+        self._cap = None
+        self._images = None
+        if os.path.isdir(source):
+            self._images = sorted(p for p in glob.glob(os.path.join(source, "*"))
+                                  if p.lower().endswith(face_store.IMAGE_EXTENSIONS))
+        elif any(c in source for c in "*?["):
+            self._images = sorted(glob.glob(source))
+        else:
+            self._cap = cv2.VideoCapture(source)
+            self.opened = self._cap.isOpened()
+        if self._images is not None and not self._images:
+            self.opened = False
+
+    def isOpened(self):
+        return self.opened
+
+    def _next_raw(self):
+        if self._images is not None:
+            if self._index >= len(self._images):
+                if not self.loop:
+                    return None
+                self._index = 0
+            frame = cv2.imread(self._images[self._index])
+            self._index += 1
+            return frame
+        ret, frame = self._cap.read()
+        if not ret and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._cap.read()
+        return frame if ret else None
+
+    def read(self):
+        if not self.opened:
+            return False, None
+        if self.fps:
+            # Live pacing: wait for the frame's slot, drop frames we are late for
+            now = time.perf_counter()
+            if self._started is None:
+                self._started = now
+            due = int((now - self._started) * self.fps)
+            while self.served + self.skipped < due:
+                if self._next_raw() is None:
+                    break
+                self.skipped += 1
+            wait = self._started + (self.served + self.skipped) / self.fps - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        frame = self._next_raw()
+        if frame is None:
+            self.release()
+            return False, None
+        self.served += 1
+        return True, frame
+
+    def release(self):
+        self.opened = False
+        if self._cap is not None:
+            self._cap.release()
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+def config_snapshot():
+    keys = ("FACE_DETECTION_MODE", "FACE_ROI_PAD", "FACE_DETECT_FALLBACK_WIDTH", "FACE_REDETECT_EVERY",
+            "FACE_WORKERS", "FACE_WORKER_SLOTS")
+    return {k: getattr(config, k, None) for k in keys}
+
+def run_verify(args):
+    face_auth.load_known_faces()
+    card = None if args.card in (None, "", "none") else args.card
+    cam = ReplayCamera(args.source, args.fps, args.loop)
+    ok, detail = face_auth.verify_face_for_card(card, None, cam)
+    result = face_auth.LAST_VERIFY_STATS.as_dict()
+    result.update({"result": detail, "verified": ok, "frames_served": cam.served, "frames_skipped": cam.skipped})
+    return result
+
+def run_enroll(args):
+    tmp = None
+    if not args.keep:
+        tmp = tempfile.mkdtemp(prefix="replay_enroll_")
+        config.KNOWN_FACES_DIR = os.path.join(tmp, "known_faces")
+        os.makedirs(config.KNOWN_FACES_DIR)
+        face_auth.STORE = face_store.EncodingStore(os.path.join(tmp, "face_cache"))
+    try:
+        face_auth.load_known_faces()
+        cam = ReplayCamera(args.source, args.fps, args.loop)
+        ok, detail = face_auth.capture_enrollment(cam, args.card, args.name)
+        result = face_auth.LAST_ENROLL_STATS.as_dict()
+        result.update({"result": detail, "enrolled": ok, "frames_served": cam.served, "frames_skipped": cam.skipped})
+        return result
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+def print_run(i, run):
+    stages = "  ".join(f"{name}={s['calls']}x{s['ms_avg']}ms" for name, s in run["stages"].items() if s["calls"])
+    fmt = lambda v: "-" if v is None else f"{v:.2f}s"
+    print(f"#{i} {run['outcome']:<13} frames={run['frames']} fps={run['fps']} cpu={fmt(run['cpu_seconds'])} "
+          f"identity={fmt(run['time_to_identity'])} blink={fmt(run['time_to_blink'])} "
+          f"decision={fmt(run['time_to_decision'])}\n    {stages}")
+    if run.get("samples"):
+        scores = ", ".join(f"{s['score']:.2f}" for s in run["samples"])
+        print(f"    templates={len(run['samples'])} scores=[{scores}] rejected={run['rejected']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=["verify", "enroll"])
+    parser.add_argument("--source", required=True, help="Video file, image directory or glob")
+    parser.add_argument("--card", default=None, help="Card id (verify: omit for 1:N identification)")
+    parser.add_argument("--name", default="Replay", help="User name for enroll")
+    parser.add_argument("--fps", type=float, default=None, help="Pace frames like a live camera")
+    parser.add_argument("--loop", action="store_true", help="Replay the source until the pipeline gives up")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=0, help="Face worker processes (0 = in-process)")
+    parser.add_argument("--keep", action="store_true", help="enroll: write into the real Known_Faces")
+    parser.add_argument("--out", default=None, help="Write runs as JSON to this file")
+    args = parser.parse_args()
+    if args.mode == "enroll" and not args.card:
+        parser.error("enroll needs --card")
+
+    config.FACE_WORKERS = args.workers
+    face_auth.start_workers()
+
+    runner = run_verify if args.mode == "verify" else run_enroll
+    runs = []
+    for i in range(args.repeat):
+        runs.append(runner(args))
+        print_run(i + 1, runs[-1])
+
+    if args.out:
+        report = {
+            "mode": args.mode,
+            "source": args.source,
+            "card": args.card,
+            "fps": args.fps,
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(),
+            "host": {"python": sys.version.split()[0], "machine": platform.machine(), "cpus": os.cpu_count()},
+            "config": config_snapshot(),
+            "workers": face_auth.worker_stats(),
+            "runs": runs,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {args.out}")
+
+    if face_auth.WORKERS:
+        face_auth.WORKERS.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,75 @@
 import firebase_admin
 from firebase_admin import credentials, db
 import os
+import time
+import bisect
+import threading
 import config
+import outbox
+import metrics
+import tracing
 
-# Initialize Connection
-# Make sure serviceAccountKey.json is in the same folder
-if not firebase_admin._apps:
-    cred = credentials.Certificate("serviceAccountKey.json")
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': 'https://iot-attendance-42581-default-rtdb.firebaseio.com/'
-    })
+def _init_firebase():
+    # Make sure serviceAccountKey.json is in the same folder
+    if not firebase_admin._apps:
+        cred = credentials.Certificate("serviceAccountKey.json")
+        firebase_admin.initialize_app(cred, {
+            'databaseURL': 'https://iot-attendance-42581-default-rtdb.firebaseio.com/'
+        })
+
+class FirebaseTransport:
+    """Writes a whole outbox batch as one multi-path update under attendance_logs."""
+
+    def send_batch(self, items):
+        _init_firebase()
+        db.reference('attendance_logs').update({key: record for key, record in items})
+
+PUT_SECONDS = metrics.histogram("cloud_outbox_put_seconds", "Queueing one attendance record in the outbox")
+SEND_SECONDS = metrics.histogram("cloud_send_batch_seconds", "One outbox batch sent to the cloud (including failures)")
+SENT = metrics.counter("cloud_records_sent_total", "Records the transport accepted")
+SEND_FAILURES = metrics.counter("cloud_send_failures_total", "Batches the transport rejected (retried later)")
+
+class MeteredTransport:
+    """Times every batch the outbox sender ships."""
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    def send_batch(self, items):
+        try:
+            with SEND_SECONDS.time():
+                self.transport.send_batch(items)
+        except Exception:
+            SEND_FAILURES.inc()
+            raise
+        SENT.inc(len(items))
+
+def _make_transport():
+    target = config.CLOUD_TRANSPORT
+    if target.startswith("file:"):
+        return outbox.FileTransport(target[len("file:"):])
+    if target.startswith(("http://", "https://")):
+        return outbox.HTTPTransport(target)
+    return FirebaseTransport()
+
+OUTBOX = outbox.Outbox(
+    config.OUTBOX_FILE, MeteredTransport(_make_transport()),
+    batch_size=config.OUTBOX_BATCH_SIZE, max_backoff=config.OUTBOX_MAX_BACKOFF, terminal_id=config.TERMINAL_ID,
+)
+metrics.gauge("cloud_outbox_depth", "Records waiting in the outbox", fn=OUTBOX.pending)
+
+def start_sender():
+    """Starts the background thread that drains the outbox to the cloud."""
+    pending = OUTBOX.pending()
+    if pending:
+        print(f"☁️ [CLOUD] {pending} record(s) waiting in outbox.")
+    OUTBOX.start()
 
 def log_attendance(card_id, name, entry_time, exit_time, duration, breaks=None, total_break=0.0):
-    """Sends attendance record to Cloud Database with Break Details"""
+    """Queues attendance record (with Break Details) for the Cloud Database. Never blocks on the network."""
     try:
-        ref = db.reference('attendance_logs')
-        
-        # Push a new record
-        ref.push({
+        started = time.perf_counter()
+        key = OUTBOX.put({
             'card_id': card_id,
             'name': name,
             'entry': entry_time.isoformat(),
@@ -27,37 +79,104 @@ def log_attendance(card_id, name, entry_time, exit_time, duration, breaks=None,
             'breaks': breaks if breaks else [], # NEW: List of break details
             'timestamp': {'.sv': 'timestamp'}   # Server time
         })
-        print(f"☁️ [CLOUD] Logged {name} to Firebase.")
+        PUT_SECONDS.observe(time.perf_counter() - started)
+        tracing.instant("cloud.queued", key=key, put_ms=round((time.perf_counter() - started) * 1000, 3))
+        print(f"☁️ [CLOUD] Queued {name} for Firebase.")
     except Exception as e:
-        print(f"⚠️ Cloud Log Failed: {e}")
-        
-def get_attendance_logs(limit=100):
-    """Fetch attendance logs from Firebase including break details"""
-    try:
-        ref = db.reference('attendance_logs')
-        
-        # Get logs, ordered by timestamp (most recent first)
-        snapshot = ref.order_by_child('timestamp').limit_to_last(limit).get()
-        
-        if not snapshot:
-            return []
+        print(f"⚠️ Cloud Queue Failed: {e}")
         
+# --- READ CACHE ---
+# Local ordered copy of attendance_logs. The first refresh downloads the
+# node once; later refreshes (at most every LOG_CACHE_TTL seconds) only ask
+# Firebase for records with a server timestamp >= the newest one we hold.
+_log_lock = threading.Lock()
+_log_records = {}       # id -> record
+_log_keys = []          # sorted ascending (entry, id)
+_log_last_ts = None
+_log_refreshed_at = 0.0
+
+def _merge_logs(snapshot):
+    global _log_last_ts
+    added = 0
+    for key, val in snapshot.items():
+        # FIX: We now append the WHOLE object 'val'
+        # This ensures 'breaks' and 'total_break_seconds' are passed to the dashboard
+        val['id'] = key
+        if key not in _log_records:
+            added += 1
+            bisect.insort(_log_keys, (val.get('entry', ''), key))
+        _log_records[key] = val
+        ts = val.get('timestamp')
+        if isinstance(ts, (int, float)) and (_log_last_ts is None or ts > _log_last_ts):
+            _log_last_ts = ts
+    return added
+
+def refresh_attendance_logs(force=False):
+    """Pulls new records into the local cache if the TTL expired. Returns records added."""
+    global _log_refreshed_at
+    with _log_lock:
+        if not force and time.time() - _log_refreshed_at < config.LOG_CACHE_TTL:
+            return 0
+        try:
+            _init_firebase()
+            ref = db.reference('attendance_logs').order_by_child('timestamp')
+            if _log_last_ts is None:
+                snapshot = ref.get()
+            else:
+                # start_at is inclusive; records already held are merged by id
+                snapshot = ref.start_at(_log_last_ts).get()
+            _log_refreshed_at = time.time()
+            return _merge_logs(snapshot or {})
+        except Exception as e:
+            error_str = str(e)
+            if '404' in error_str or 'Not Found' in error_str:
+                print(f"⚠️ Firebase database path not found. Check URL/Rules.")
+            else:
+                print(f"⚠️ Error fetching logs from Firebase: {e}")
+            return 0
+
+def _log_matches(rec, date, name, card_id, start_time, end_time):
+    entry = rec.get('entry', '')
+    if date and not entry.startswith(date):
+        return False
+    if name and name.lower() not in str(rec.get('name', '')).lower():
+        return False
+    if card_id and str(rec.get('card_id', '')) != card_id:
+        return False
+    if start_time and end_time:
+        # entry is ISO "YYYY-MM-DDTHH:MM:SS", compare the HH:MM part
+        if not start_time <= entry[11:16] <= end_time:
+            return False
+    return True
+
+def query_attendance_logs(limit=100, cursor=None, date=None, name=None, card_id=None, start_time=None, end_time=None):
+    """
+    Newest-first page of cached logs matching the filters.
+    Returns {'logs': [...], 'next_cursor': str or None}; pass next_cursor
+    back to get the following page.
+    """
+    refresh_attendance_logs()
+    with _log_lock:
+        pos = len(_log_keys)
+        if cursor:
+            entry, _, key = cursor.partition('|')
+            pos = bisect.bisect_left(_log_keys, (entry, key))
+
         logs = []
-        for key, val in snapshot.items():
-            # FIX: We now append the WHOLE object 'val'
-            # This ensures 'breaks' and 'total_break_seconds' are passed to the dashboard
-            val['id'] = key 
-            logs.append(val)
-        
-        # Explicit sort by Entry time (Descending - Newest First)
-        logs.sort(key=lambda x: x.get('entry', ''), reverse=True)
-        
-        return logs
+        next_cursor = None
+        while pos > 0:
+            pos -= 1
+            entry_key = _log_keys[pos]
+            rec = _log_records[entry_key[1]]
+            if not _log_matches(rec, date, name, card_id, start_time, end_time):
+                continue
+            if len(logs) == limit:
+                last = logs[-1]
+                next_cursor = f"{last.get('entry', '')}|{last['id']}"
+                break
+            logs.append(dict(rec))
+    return {'logs': logs, 'next_cursor': next_cursor}
 
-    except Exception as e:
-        error_str = str(e)
-        if '404' in error_str or 'Not Found' in error_str:
-            print(f"⚠️ Firebase database path not found. Check URL/Rules.")
-        else:
-            print(f"⚠️ Error fetching logs from Firebase: {e}")
-        return []
\ No newline at end of file
+def get_attendance_logs(limit=100):
+    """Latest attendance logs (newest first) including break details."""
+    return query_attendance_logs(limit=limit)['logs']
@@ -7,11 +7,73 @@ BREAK_SWITCH_PIN = 18        # BCM pin for the break/confirm switch
 SERVO_PIN = 17               # Servo Signal Pin
 BREAK_CONFIRM_SECONDS = 10   # Seconds to wait for switch press
 DOOR_OPEN_SECONDS = 10       # Duration to keep door open
+PRESENCE_SAMPLE_HZ = 5       # Ultrasonic readings per second
+PRESENCE_WINDOW = 5          # Median filter over this many readings
+PRESENCE_NEAR_CM = 30        # Median below this -> person arrived
+PRESENCE_FAR_CM = 45         # Median above this -> person left (hysteresis band in between)
+PRESENCE_STAY_AWAKE = 10     # Minimum seconds the kiosk stays active after someone arrives
+RFID_POLL_INTERVAL = 0.05    # Seconds between reader polls while awake (reader thread)
+RFID_DEBOUNCE = 1.0          # A card must be gone this long before the same card counts as a new tap
+SCAN_FAST_PATH = True        # Checked-in users tapping for Break/Leave skip the face check
+SCAN_HANDOFF_SECONDS = 2     # Result screen time when others are queued for the camera
+SCAN_ACTION_TIMEOUT = 60     # Unanswered Break/Leave prompt closes its scan session
+HARDWARE_BACKEND = os.environ.get("HARDWARE_BACKEND", "gpio")   # "gpio" = RPi pins + MFRC522, "sim" = hardware_sim stand-ins
 
 # File Paths
-ACTIVE_FILE = "active_scans.txt"
+ACTIVE_FILE = "active_scans.txt"              # Snapshot of who is checked in
+ACTIVE_JOURNAL_FILE = "active_scans.journal"  # Append-only events since the snapshot
 LOG_FILE = "attendance_log.txt"
+SQLITE_DB_FILE = "attendance.db"
 KNOWN_FACES_DIR = "Known_Faces"
+FACE_CACHE_DIR = "face_cache"   # Persistent encoding cache (encodings-<generation>.npy + manifest.json)
+
+# Storage
+STORAGE_BACKEND = "text"     # "text" (attendance_log.txt + active_scans) or "sqlite" (SQLITE_DB_FILE)
+
+# Cloud Sync
+OUTBOX_FILE = "cloud_outbox.db"   # Durable queue of records not yet in Firebase
+CLOUD_TRANSPORT = "firebase"      # "firebase", "file:<path>" or "http(s)://..." stand-in
+OUTBOX_BATCH_SIZE = 25            # Records per multi-path update
+OUTBOX_MAX_BACKOFF = 300          # Seconds, cap for retry backoff
+TERMINAL_ID = None                # Kiosk id in attendance record keys (None = random, kept in OUTBOX_FILE)
+LOG_CACHE_TTL = 30                # Seconds before the dashboard log cache asks Firebase for new records
+
+# Active Scans Journal
+JOURNAL_COMPACT_EVERY = 500  # Records before the journal is folded into a new snapshot
+JOURNAL_FSYNC_INTERVAL = 1.0 # Seconds between batched fsyncs of the journal
+
+# Face Recognition
+FACE_BUILD_WORKERS = os.cpu_count() or 1   # Processes used to encode Known_Faces at boot
+FACE_ONLY_MODE = False       # Allow card-less 1:N identification (face_auth.identify_face)
+ANN_MIN_GALLERY = 2000       # Below this many faces 1:N search stays brute force
+ANN_NPROBE = 8               # IVF cells scanned per query (recall vs speed)
+FACE_DETECTION_MODE = "roi"  # "roi" = search around the last face first, downscaled full frame on a miss; "full" = whole frame
+FACE_ROI_PAD = 0.6           # ROI padding around the last face box (fraction of its size)
+FACE_DETECT_FALLBACK_WIDTH = 320  # Full-frame fallback runs on a copy at most this wide (HOG needs ~80 px faces)
+FACE_WORKERS = 2             # dlib processes for live detection/encoding (0 = run in the Flask process)
+FACE_WORKER_SLOTS = 4        # Shared-memory frame buffers = max jobs in flight
+FACE_WORKER_TIMEOUT = 10.0   # Seconds before a job falls back to running in-process
+FACE_REDETECT_EVERY = 10     # HOG on every Nth frame, tracked in between to correct drift (1 = detect every frame, no tracking)
+ENROLL_SAMPLES = 5           # Good face samples to collect before enrollment stops
+ENROLL_TEMPLATES = 3         # Templates kept per card (best quality first)
+ENROLL_STORE = "topk"        # "topk" = one gallery template per kept sample, "centroid" = their mean as one template
+ENROLL_MIN_SHARPNESS = 40.0  # Laplacian variance of the face crop (scaled to 128 px high); lower = blurred
+ENROLL_MIN_FACE_PX = 80      # Face box height in the camera frame
+ENROLL_MAX_YAW = 0.25        # Nose offset from the eye midpoint, in eye distances (0 = frontal)
+ENROLL_MAX_ROLL = 15.0       # Eye-line tilt in degrees
+
+# Metrics
+METRICS_ENABLED = True       # Counters/histograms behind /metrics (False = every update is a no-op)
+LOCK_PROFILING = os.environ.get("LOCK_PROFILING", "0") == "1"   # Time waits/holds of the shared locks (lockprof)
+LOCK_LONG_HOLD_MS = 200      # Holds longer than this are logged with the holder's stack
+LOCK_LONG_HOLD_KEEP = 50     # Long-hold records kept for /api/locks
+LOCK_DUMP_INTERVAL = 60      # Seconds between lock summaries in the log (0 = off)
+
+# Scan Tracing
+TRACE_KEEP = 50              # Finished scan traces kept in memory (/api/traces)
+TRACE_SLOW_SECONDS = 20      # Scans slower than this are saved to TRACE_DIR automatically (0 = never)
+TRACE_DIR = "traces"         # Chrome trace JSON files of slow scans
+TRACE_MAX_SPANS = 2000       # Spans per scan before further ones are dropped
 
 # Ensure directory exists immediately
 os.makedirs(KNOWN_FACES_DIR, exist_ok=True)
\ No newline at end of file
@@ -0,0 +1,94 @@
+import os
+import threading
+import config
+import face_store
+
+# card_id -> {"name": user_name, "files": [filename, ...]}
+# Built once from Known_Faces, updated by enrollment, and rebuilt only when
+# the directory mtime shows someone changed it behind our back.
+_records = {}
+_dir_mtime = None
+_lock = threading.Lock()
+
+def _dir_stamp():
+    try:
+        return os.stat(config.KNOWN_FACES_DIR).st_mtime_ns
+    except OSError:
+        return None
+
+# A card can have several template images: "<card>_<name>.jpg", "<card>_<name>~2.jpg", ...
+TEMPLATE_SEP = "~"
+
+def template_name(filename):
+    """Gallery name of an image: '<card_id>_<user name>', without extension or template suffix."""
+    base = os.path.splitext(filename)[0]
+    stem, sep, index = base.rpartition(TEMPLATE_SEP)
+    return stem if sep and index.isdigit() else base
+
+def template_filename(name, index):
+    """Image file for the index-th (0-based) template of gallery name."""
+    return f"{name}.jpg" if index == 0 else f"{name}{TEMPLATE_SEP}{index + 1}.jpg"
+
+def pinned_filename(filename):
+    """
+    Side-car '<image base>.npy' holding a template that must not be
+    re-derived from the image (an enrollment centroid).
+    """
+    return os.path.splitext(filename)[0] + ".npy"
+
+def _split(filename):
+    card_id, _, user_name = template_name(filename).partition("_")
+    return card_id, user_name
+
+def rebuild():
+    global _records, _dir_mtime
+    with _lock:
+        stamp = _dir_stamp()
+        records = {}
+        try:
+            files = sorted(os.listdir(config.KNOWN_FACES_DIR))
+        except OSError:
+            files = []
+        for fn in files:
+            if not fn.lower().endswith(face_store.IMAGE_EXTENSIONS):
+                continue
+            card_id, user_name = _split(fn)
+            if not card_id or not user_name:
+                continue
+            rec = records.setdefault(card_id, {"name": user_name, "files": []})
+            rec["files"].append(fn)
+        _records = records
+        _dir_mtime = stamp
+    return len(records)
+
+def _revalidate():
+    if _dir_stamp() != _dir_mtime:
+        print("[ENROLLMENT] Known_Faces changed on disk, re-indexing.")
+        rebuild()
+
+def is_enrolled(card_id):
+    """O(1) check (plus one stat of Known_Faces) used on every card tap."""
+    _revalidate()
+    return str(card_id) in _records
+
+def get(card_id):
+    _revalidate()
+    rec = _records.get(str(card_id))
+    return None if rec is None else {"name": rec["name"], "files": list(rec["files"])}
+
+def add(card_id, user_name, filename):
+    """Called by the enrollment path after the image has been written."""
+    global _dir_mtime
+    with _lock:
+        rec = _records.setdefault(str(card_id), {"name": user_name, "files": []})
+        rec["name"] = user_name
+        if filename not in rec["files"]:
+            rec["files"].append(filename)
+        # Our own write bumped the directory mtime - no need to re-index for it
+        _dir_mtime = _dir_stamp()
+
+def remove(card_id):
+    global _dir_mtime
+    with _lock:
+        _records.pop(str(card_id), None)
+        _dir_mtime = _dir_stamp()
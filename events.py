@@ -0,0 +1,74 @@
+import time
+import queue
+
+from timers import TimerScheduler
+
+# Event kinds handled by app's kiosk state machine
+PRESENCE = "presence"           # active=bool (from hardware.activity_listeners)
+CARD = "card"                   # card_id=str, tapped_at (from the RFID reader thread)
+VERIFIED = "verified"           # card_id, ok, name/reason (from the verification worker)
+USER_ACTION = "user_action"     # action, card_id (from the Socket.IO handler)
+TIMEOUT = "timeout"             # name, token[, card_id] (from post_after, on the timer thread)
+
+class Event:
+    __slots__ = ("kind", "data", "time")
+
+    def __init__(self, kind, data, when):
+        self.kind = kind
+        self.data = data
+        self.time = when
+
+    def __repr__(self):
+        return f"Event({self.kind}, {self.data})"
+
+class EventQueue:
+    """Thread-safe inbox of the main loop: any thread posts, only the loop consumes."""
+
+    def __init__(self, timers=None):
+        self._queue = queue.Queue()
+        self.timers = timers or TimerScheduler()
+        self.posted = 0
+
+    def post(self, kind, **data):
+        self.posted += 1
+        self._queue.put(Event(kind, data, time.time()))
+
+    def post_after(self, delay, kind, **data):
+        """Posts the event after delay seconds; returns the cancellable timers.Timer."""
+        return self.timers.call_later(delay, lambda: self.post(kind, **data))
+
+    def get(self, timeout=None):
+        """Next event, or None when timeout passes without one."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def __len__(self):
+        return self._queue.qsize()
+
+def rfid_reader_loop(reader, post, awake, poll_interval=0.05, debounce=1.0):
+    """
+    RFID reader thread: polls reader.read_no_block() while `awake` is set
+    and posts one CARD event per tap. The MFRC522 keeps returning a card
+    while it lies on the reader, so the same card is only reported again
+    after it was gone for `debounce` seconds. Sleeps on `awake` otherwise.
+    """
+    last_card = None
+    last_seen = 0.0
+    while True:
+        if not awake.is_set():
+            awake.wait()
+            last_card = None
+        try:
+            card_id, _ = reader.read_no_block()
+        except Exception:
+            card_id = None
+
+        now = time.time()
+        if card_id:
+            card = str(card_id).strip()
+            if card != last_card or now - last_seen > debounce:
+                post(CARD, card_id=card, tapped_at=now)
+            last_card, last_seen = card, now
+        time.sleep(poll_interval)
@@ -4,40 +4,235 @@ import face_recognition
 import numpy as np
 import math
 import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import config
+import face_store
+import gallery
+import ann_index
+import enrollments
+import streaming
+import face_tracker
+import face_workers
+import metrics
+import tracing
+import face_quality
 
-# Module-level cache
-KNOWN_ENCODINGS = []
-KNOWN_NAMES = []
+# Module-level cache: card-indexed float32 template matrix
+GALLERY = gallery.FaceGallery()
 
-def load_known_faces():
-    global KNOWN_ENCODINGS, KNOWN_NAMES
-    KNOWN_ENCODINGS = []
-    KNOWN_NAMES = []
-    
-    print("[KNOWN_FACES] Loading faces from images...")
-    for fn in os.listdir(config.KNOWN_FACES_DIR):
-        if fn.lower().endswith((".jpg", ".jpeg", ".png")):
-            path = os.path.join(config.KNOWN_FACES_DIR, fn)
+# Approximate 1:N index for card-less (face-only) identification
+ANN_INDEX = None
+
+# Persistent encoding cache (Known_Faces/*.jpg -> 128-d vectors)
+STORE = face_store.EncodingStore()
+
+# Out-of-process dlib workers (None = run in the calling thread)
+WORKERS = None
+
+def start_workers(size=None):
+    """Starts the face worker pool. Call before other threads are started (workers are forked)."""
+    global WORKERS
+    size = config.FACE_WORKERS if size is None else size
+    if size > 0 and WORKERS is None:
+        WORKERS = face_workers.FaceWorkerPool(size, config.FACE_WORKER_SLOTS, timeout=config.FACE_WORKER_TIMEOUT).start()
+        print(f"[FACE] {size} face worker process(es) started")
+    return WORKERS
+
+def worker_stats():
+    return WORKERS.stats() if WORKERS else {"size": 0}
+
+FACE_CALL_SECONDS = metrics.histogram(
+    "face_call_seconds", "dlib calls of the live loops, including the worker pool round trip", ["op"])
+PIPELINE_SECONDS = metrics.histogram(
+    "face_pipeline_seconds", "Verification / enrollment run until its outcome", ["kind", "outcome"])
+PIPELINE_FPS = metrics.histogram(
+    "face_pipeline_fps", "Frames processed per second by one verification / enrollment run", ["kind"],
+    buckets=(1, 2, 3, 5, 7.5, 10, 15, 20, 30))
+TEMPLATE_SCORE = metrics.histogram(
+    "face_enroll_template_score", "Quality score (0..1) of stored enrollment templates",
+    buckets=(0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0))
+ENCODES_TO_IDENTITY = metrics.histogram(
+    "face_verify_encodes_to_identity", "Encodings computed before the card's templates matched",
+    buckets=(1, 2, 3, 5, 8, 13, 20, 40))
+MATCH_DISTANCE = metrics.histogram(
+    "face_verify_match_distance", "Distance between the live face and the best template of the card",
+    buckets=(0.2, 0.3, 0.35, 0.4, 0.45, 0.5, 0.55, 0.6, 0.65))
+_CALL_TIMES = {op: FACE_CALL_SECONDS.labels(op) for op in ("locations", "encodings", "landmarks")}
+
+def _face_call(op, fn, rgb, *args):
+    started = time.perf_counter()
+    try:
+        return WORKERS.call(op, rgb, *args) if WORKERS else fn(rgb, *args)
+    finally:
+        _CALL_TIMES[op].observe(time.perf_counter() - started)
+
+# dlib entry points used by the live loops: in the worker pool when it runs
+def face_locations(rgb):
+    return _face_call("locations", face_recognition.face_locations, rgb)
+
+def face_encodings(rgb, locations):
+    return _face_call("encodings", face_recognition.face_encodings, rgb, locations)
+
+def face_landmarks(rgb, locations):
+    return _face_call("landmarks", face_recognition.face_landmarks, rgb, locations)
+
+def _encode_image_file(path):
+    """Returns the first face encoding found in the image, or None."""
+    image = face_recognition.load_image_file(path)
+    locations = face_recognition.face_locations(image)
+    encodings = face_recognition.face_encodings(image, locations)
+    return encodings[0] if encodings else None
+
+def _encode_job(path):
+    """Process-pool entry point: (encoding or None, error string or None)."""
+    try:
+        return _encode_image_file(path), None
+    except Exception as e:
+        return None, str(e)
+
+def _print_progress(done, total, started):
+    step = max(1, total // 10)
+    if done == total or done % step == 0:
+        rate = done / max(time.time() - started, 1e-6)
+        print(f"[KNOWN_FACES] Encoded {done}/{total} ({rate:.1f} img/s)")
+
+def encode_images(paths, workers=None, progress=None):
+    """
+    Decodes, detects and encodes the given image files.
+    With workers > 1 the work is spread over a process pool; results are
+    always returned in the same order as paths. The pool forks, so call
+    this before other threads are started; with threads running it encodes
+    in this process instead.
+    """
+    workers = config.FACE_BUILD_WORKERS if workers is None else workers
+    if workers > 1 and threading.active_count() > 1:
+        print("[KNOWN_FACES] Other threads are running, encoding in-process (forking now could deadlock)")
+        workers = 1
+    total = len(paths)
+    results = [None] * total
+    started = time.time()
+    if progress is None:
+        progress = lambda done, total: _print_progress(done, total, started)
+
+    if workers <= 1 or total < 2:
+        for i, path in enumerate(paths):
+            results[i] = _encode_job(path)
+            progress(i + 1, total)
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(workers, total)) as pool:
+        futures = {pool.submit(_encode_job, path): i for i, path in enumerate(paths)}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            progress(done, total)
+    return results
+
+def load_known_faces(workers=None, progress=None):
+    print("[KNOWN_FACES] Loading faces from cache...")
+    enrollments.rebuild()
+    STORE.load()
+    stale = STORE.scan(config.KNOWN_FACES_DIR)
+    if stale:
+        print(f"[KNOWN_FACES] Encoding {len(stale)} new/changed image(s)...")
+
+    # Images with a pinned template (enrollment centroid) take it instead of being re-encoded
+    results = {fn: (vec, None) for fn, vec in ((fn, load_pinned(fn)) for fn in stale) if vec is not None}
+    stale = [fn for fn in stale if fn not in results]
+    paths = [os.path.join(config.KNOWN_FACES_DIR, fn) for fn in stale]
+    results.update(zip(stale, encode_images(paths, workers, progress)))
+    for fn, (encoding, error) in sorted(results.items()):
+        if error:
+            print(f"Skipped {fn}: {error}")
+            continue
+        try:
+            STORE.put(fn, encoding, os.path.join(config.KNOWN_FACES_DIR, fn))
+        except OSError as e:
+            print(f"Skipped {fn}: {e}")
+    STORE.save()
+
+    GALLERY.load((enrollments.template_name(fn), encoding) for fn, encoding in STORE.items())
+    print(f"[KNOWN_FACES] Loaded {len(GALLERY)} faces.")
+
+    if config.FACE_ONLY_MODE:
+        build_identification_index()
+
+def add_known_face(name, encoding, image_path):
+    """Registers a freshly enrolled face in memory and writes it through to the cache."""
+    GALLERY.add(name, encoding)
+    card_id, _, user_name = name.partition("_")
+    enrollments.add(card_id, user_name, os.path.basename(image_path))
+    if ANN_INDEX is not None:
+        ANN_INDEX.add(encoding, name)
+    try:
+        STORE.put(os.path.basename(image_path), encoding, image_path)
+        STORE.save()
+    except Exception as e:
+        print(f"[FACE_CACHE] Could not persist {name}: {e}")
+
+def load_pinned(filename):
+    """Pinned template of a Known_Faces image (see enrollments.pinned_filename), or None."""
+    path = os.path.join(config.KNOWN_FACES_DIR, enrollments.pinned_filename(filename))
+    if not os.path.exists(path):
+        return None
+    try:
+        return np.asarray(np.load(path), dtype=np.float32).reshape(face_store.ENCODING_DIM)
+    except (OSError, ValueError) as e:
+        print(f"[KNOWN_FACES] Ignoring unreadable {path}: {e}")
+        return None
+
+def save_pinned(filename, encoding):
+    path = os.path.join(config.KNOWN_FACES_DIR, enrollments.pinned_filename(filename))
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, np.asarray(encoding, dtype=np.float32))
+    os.replace(tmp, path)
+
+def remove_card_faces(card_id):
+    """Drops every template of a card: Known_Faces images (+ pinned side-cars), cache rows, gallery and index."""
+    rec = enrollments.get(card_id)
+    if rec is None:
+        return 0
+    for fn in rec["files"]:
+        for path in (os.path.join(config.KNOWN_FACES_DIR, fn),
+                     os.path.join(config.KNOWN_FACES_DIR, enrollments.pinned_filename(fn))):
             try:
-                image = face_recognition.load_image_file(path)
-                locations = face_recognition.face_locations(image)
-                encodings = face_recognition.face_encodings(image, locations)
-                
-                if not encodings:
-                    continue
-                    
-                base = os.path.splitext(fn)[0]
-                KNOWN_ENCODINGS.append(encodings[0])
-                KNOWN_NAMES.append(base)
-            except Exception as e:
-                print(f"Skipped {fn}: {e}")
-                continue
-    print(f"[KNOWN_FACES] Loaded {len(KNOWN_ENCODINGS)} faces.")
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        STORE.remove(fn)
+        if ANN_INDEX is not None:
+            ANN_INDEX.remove(enrollments.template_name(fn))
+    GALLERY.remove_card(card_id)
+    enrollments.remove(card_id)
+    STORE.save()
+    return len(rec["files"])
+
+def build_identification_index():
+    """(Re)builds the IVF index over the gallery. Small galleries stay on brute force."""
+    global ANN_INDEX
+    if len(GALLERY) < config.ANN_MIN_GALLERY:
+        ANN_INDEX = None
+        return
+    started = time.time()
+    with GALLERY.lock:
+        vectors, names = GALLERY.matrix.copy(), GALLERY.names
+    index = ann_index.IVFIndex(nprobe=config.ANN_NPROBE)
+    index.build(vectors, names)
+    ANN_INDEX = index
+    print(f"[ANN] Indexed {len(index)} faces in {index.n_lists} lists ({time.time() - started:.1f}s).")
+
+def identify_encoding(encoding, tolerance):
+    """1:N lookup -> (name, distance); name is None when nobody is within tolerance."""
+    index = ANN_INDEX
+    hits = index.search(encoding, k=1) if index is not None else GALLERY.search(encoding, k=1)
+    if not hits:
+        return None, None
+    name, distance = hits[0]
+    return (name if distance <= tolerance else None), distance
 
 def enroll_face_for_card(card_id, user_name):
-    global KNOWN_ENCODINGS, KNOWN_NAMES
-    
     filename_base = f"{card_id}_{user_name}"
     image_path = os.path.join(config.KNOWN_FACES_DIR, f"{filename_base}.jpg")
 
@@ -67,8 +262,8 @@ def enroll_face_for_card(card_id, user_name):
                 print(f"✔ Image captured. Processing...")
                 
                 rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                locations = face_recognition.face_locations(rgb)
-                encodings = face_recognition.face_encodings(rgb, locations)
+                locations = face_locations(rgb)
+                encodings = face_encodings(rgb, locations)
                 
                 if not encodings:
                     print("❌ No face detected. Try again.")
@@ -77,8 +272,7 @@ def enroll_face_for_card(card_id, user_name):
                     saved = False
                     break
                 
-                KNOWN_ENCODINGS.append(encodings[0])
-                KNOWN_NAMES.append(filename_base)
+                add_known_face(filename_base, encodings[0], image_path)
                 print(f"✔ Enrollment Successful for {user_name}")
                 saved = True
                 break
@@ -93,6 +287,84 @@ def enroll_face_for_card(card_id, user_name):
         
     return saved
 
+class PipelineStats:
+    """Per-stage call counts and timings for one verification or enrollment run."""
+
+    STAGES = ("detect", "track", "encode", "landmarks")
+
+    def __init__(self, kind="verify"):
+        self.kind = kind
+        self.started = time.time()
+        self.cpu_started = time.process_time()
+        self.cpu_seconds = None
+        self.frames = 0
+        self.calls = {s: 0 for s in self.STAGES}
+        self.seconds = {s: 0.0 for s in self.STAGES}
+        self.time_to_identity = None
+        self.time_to_blink = None
+        self.time_to_decision = None
+        self.outcome = None
+        self.detect_paths = {}      # FaceDetector.counts: roi / fallback / full / miss
+        self.rejected = 0           # Enrollment: faces that failed the quality gate
+        self.samples = []           # Enrollment: quality of the stored templates
+
+    @contextmanager
+    def stage(self, name):
+        t = time.perf_counter()
+        try:
+            with tracing.span("face." + name, frame=self.frames):
+                yield
+        finally:
+            self.calls[name] += 1
+            self.seconds[name] += time.perf_counter() - t
+
+    def mark_identity(self, distance=None):
+        self.time_to_identity = time.time() - self.started
+        tracing.instant("face.identity", distance=distance)
+        if self.kind == "verify":
+            ENCODES_TO_IDENTITY.observe(self.calls["encode"])
+            if distance is not None:
+                MATCH_DISTANCE.observe(distance)
+
+    def mark_blink(self):
+        self.time_to_blink = time.time() - self.started
+        tracing.instant("face.blink")
+
+    def finish(self, outcome):
+        self.outcome = outcome
+        self.time_to_decision = time.time() - self.started
+        self.cpu_seconds = time.process_time() - self.cpu_started
+        PIPELINE_SECONDS.labels(self.kind, outcome).observe(self.time_to_decision)
+        if self.time_to_decision > 0:
+            PIPELINE_FPS.labels(self.kind).observe(self.frames / self.time_to_decision)
+
+    def as_dict(self):
+        elapsed = (self.time_to_decision or (time.time() - self.started)) or 1e-9
+        return {
+            "outcome": self.outcome,
+            "frames": self.frames,
+            "fps": round(self.frames / elapsed, 2),
+            "time_to_identity": self.time_to_identity,
+            "time_to_blink": self.time_to_blink,
+            "time_to_decision": self.time_to_decision,
+            "cpu_seconds": self.cpu_seconds,
+            "detect_paths": dict(self.detect_paths),
+            "rejected": self.rejected,
+            "samples": self.samples,
+            "stages": {s: {"calls": self.calls[s], "ms_total": round(self.seconds[s] * 1000, 2),
+                           "ms_avg": round(self.seconds[s] * 1000 / self.calls[s], 2) if self.calls[s] else None}
+                       for s in self.STAGES},
+        }
+
+# Stats of the most recent verify_face_for_card / capture_enrollment run (for benchmarks / diagnostics)
+LAST_VERIFY_STATS = None
+LAST_ENROLL_STATS = None
+
+def new_face_detector():
+    """FaceDetector configured by config.FACE_DETECTION_MODE (one per capture loop)."""
+    return face_tracker.FaceDetector(face_locations, config.FACE_DETECTION_MODE,
+                                     config.FACE_ROI_PAD, config.FACE_DETECT_FALLBACK_WIDTH)
+
 def get_eye_aspect_ratio(eye_points):
     def dist(p1, p2):
         return math.hypot(p1[0] - p2[0], p1[1] - p2[1])
@@ -107,15 +379,23 @@ def get_eye_aspect_ratio(eye_points):
 def verify_face_for_card(card_id, socketio=None, camera_instance=None, face_frame_lock=None, current_face_frame=None, camera_lock=None):
     """
     Verify face for card - Web-based version without cv2.imshow
-    Uses shared camera instance and updates current_face_frame for video stream overlay
+    Uses shared camera instance and publishes annotated frames to current_face_frame
+    (a streaming.FrameSlot) for the video stream overlay
+    card_id=None runs a card-less 1:N identification instead (see identify_face)
     """
-    if not KNOWN_ENCODINGS:
+    if card_id is not None and not enrollments.is_enrolled(card_id):
+        if socketio:
+            socketio.emit('interaction', {'msg': 'Card not enrolled'})
+        return False, "not_enrolled"
+
+    if not (GALLERY.has_card(card_id) if card_id is not None else len(GALLERY)):
         if socketio:
             socketio.emit('interaction', {'msg': 'No faces registered'})
         return False, "no_known_faces"
 
     # Use provided camera instance or create a temporary one
-    use_shared_camera = camera_instance is not None and camera_lock is not None
+    # Shared camera = app's FrameBus (or any object with read()/isOpened()); camera_lock is optional
+    use_shared_camera = camera_instance is not None
     if not use_shared_camera:
         cam = cv2.VideoCapture(0)
         cam.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
@@ -135,24 +415,38 @@ def verify_face_for_card(card_id, socketio=None, camera_instance=None, face_fram
     CONSEC_FRAMES = 1           # Reduced from 2 to 1 - only need 1 frame with eyes closed
     MAX_MISSES = 15             # Increased from 8 to 15 - more forgiving for alignment
     MAX_VERIFICATION_TIME = 45  # Increased from 30 to 45 seconds
+    MATCH_TOLERANCE = 0.65      # Increased from 0.6 to 0.65 for more lenient matching
+    IDENTIFY_TOLERANCE = 0.55   # Stricter for 1:N - there is no card to back the match up
     
+    global LAST_VERIFY_STATS
+    stats = LAST_VERIFY_STATS = PipelineStats()
+
     blink_counter = 0
     blink_detected = False
     
     identity_verified = False
     matched_name = None
     
-    frame_count = 0
     miss_count = 0              # Tracks how many frames we lost the face
+    since_detect = 0            # Tracked frames since the last HOG detection
+    camera_closed = False
     start_time = time.time()
     
-    last_locations = []
+    tracker = face_tracker.FaceTracker()
+    detector = new_face_detector()
+    stats.detect_paths = detector.counts
+    face_box = None             # (top, right, bottom, left) in 320x240 coordinates
+    last_box = None             # Last known location, where ROI detection looks first
     status_text = "Align Face"
     color = (0, 255, 255)
 
+    # Reused buffers: FrameBus.read() reuses its buffer on the next read, so published overlays are copies
+    overlays = streaming.OverlayPool()
+    small = rgb = gray = None
+
     try:
         while time.time() - start_time < MAX_VERIFICATION_TIME:
-            # Read frame (with lock if shared camera)
+            # Read frame (FrameBus.read() blocks until the next captured frame)
             if use_shared_camera and camera_lock:
                 with camera_lock:
                     ret, frame = cam.read()
@@ -160,51 +454,70 @@ def verify_face_for_card(card_id, socketio=None, camera_instance=None, face_fram
                 ret, frame = cam.read()
             
             if not ret: 
+                if not cam.isOpened():
+                    camera_closed = True
+                    break
                 time.sleep(0.033)
                 continue
+            stats.frames += 1
             
-            # Resize for processing if needed
-            frame_resized = cv2.resize(frame, (320, 240))
-            frame_count += 1
-            # Process every other frame for performance
-            process_this_frame = (frame_count % 2 == 0)
-
-            if process_this_frame:
-                rgb = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)
-                
-                new_locations = face_recognition.face_locations(rgb)
-                
-                # --- STABILIZATION LOGIC ---
-                if new_locations:
-                    # Face Found! Update cache and reset miss counter
-                    last_locations = new_locations
-                    miss_count = 0
-                    
-                    landmarks = face_recognition.face_landmarks(rgb, new_locations)
-                    encodings = face_recognition.face_encodings(rgb, new_locations)
-
-                    # 1. Verify Identity (only if not yet verified)
-                    if not identity_verified:
-                        face_encoding = encodings[0]
-                        distances = face_recognition.face_distance(KNOWN_ENCODINGS, face_encoding)
-                        best_idx = np.argmin(distances)
-                        # Increased threshold from 0.6 to 0.65 for more lenient matching
-                        if distances[best_idx] <= 0.65:
-                            name = KNOWN_NAMES[best_idx]
-                            if name.startswith(f"{card_id}_"):
-                                identity_verified = True
-                                matched_name = name
-                                if socketio:
-                                    socketio.emit('interaction', {'msg': 'Identity verified. Please blink once.'})
-                            else:
-                                status_text = "Wrong Card!"
-                                color = (0, 0, 255)
+            # All stages work on a 320x240 copy
+            small = cv2.resize(frame, (320, 240), dst=small)
+            rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=rgb)
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=gray)
+
+            # --- STAGE 1+2: DETECT only when tracking is lost (or to correct drift), else TRACK ---
+            # FACE_REDETECT_EVERY = N: HOG on every Nth frame, N - 1 tracked frames in between
+            face_box = None
+            if tracker.active and since_detect < config.FACE_REDETECT_EVERY - 1:
+                with stats.stage("track"):
+                    face_box = tracker.update(gray)
+                since_detect += 1
+            if face_box is None:
+                with stats.stage("detect"):
+                    locations = detector.detect(rgb, last_box)
+                since_detect = 0
+                if locations:
+                    face_box = locations[0]
+                    if config.FACE_REDETECT_EVERY > 1:
+                        tracker.start(gray, face_box)
+                else:
+                    tracker.reset()
+            if face_box is not None:
+                last_box = face_box
+            
+            # --- STABILIZATION LOGIC ---
+            if face_box is not None:
+                miss_count = 0
+
+                # --- STAGE 3: ENCODE + MATCH, only until identity is confirmed ---
+                # With a card only its templates are compared: O(templates per card).
+                # Without one (face-only mode) it is a 1:N identification.
+                if not identity_verified:
+                    with stats.stage("encode"):
+                        encodings = face_encodings(rgb, [face_box])
+                    if encodings:
+                        if card_id is None:
+                            name, distance = identify_encoding(encodings[0], IDENTIFY_TOLERANCE)
+                        else:
+                            name, distance = GALLERY.match_card(card_id, encodings[0], MATCH_TOLERANCE)
+                        if name:
+                            identity_verified = True
+                            matched_name = name
+                            stats.mark_identity(distance)
+                            status_text = "Identity OK. Please blink once."
+                            color = (0, 255, 0)
+                            if socketio:
+                                socketio.emit('interaction', {'msg': 'Identity verified. Please blink once.'})
                         else:
                             status_text = "Align Face Better"
                             color = (0, 165, 255)  # Orange instead of red for less alarming
 
-                    # 2. Check Blink (only if verified)
-                    if identity_verified:
+                # --- STAGE 4: LIVENESS, landmarks only (no encoding once verified) ---
+                elif identity_verified:
+                    with stats.stage("landmarks"):
+                        landmarks = face_landmarks(rgb, [face_box])
+                    if landmarks:
                         face_marks = landmarks[0]
                         leftEAR = get_eye_aspect_ratio(face_marks['left_eye'])
                         rightEAR = get_eye_aspect_ratio(face_marks['right_eye'])
@@ -217,65 +530,61 @@ def verify_face_for_card(card_id, socketio=None, camera_instance=None, face_fram
                         else:
                             if blink_counter >= CONSEC_FRAMES:
                                 blink_detected = True
+                                stats.mark_blink()
                             if blink_counter > 0:
                                 status_text = "Good! Blink detected. Processing..."
                             else:
                                 status_text = "Identity OK. Please blink once."
                             blink_counter = 0
                             color = (0, 255, 0)
-                
+            
+            else:
+                # No Face Found in this frame
+                miss_count += 1
+                if miss_count >= MAX_MISSES:
+                    # Only reset if we haven't seen a face for a long time
+                    identity_verified = False
+                    last_box = None
+                    status_text = "Align Face"
+                    color = (0, 255, 255)
+                    blink_counter = 0
                 else:
-                    # No Face Found in this frame
-                    miss_count += 1
-                    if miss_count >= MAX_MISSES:
-                        # Only reset if we haven't seen a face for a long time
-                        identity_verified = False
-                        status_text = "Align Face"
-                        color = (0, 255, 255)
-                        blink_counter = 0
-                    else:
-                        # Keep the old status text to prevent flickering
-                        pass
+                    # Keep the old status text to prevent flickering
+                    pass
 
             # Draw UI on full resolution frame
+            if use_shared_camera:
+                frame = overlays.next_copy(frame)
+
             # Scale locations back to original frame size
             scale_x = frame.shape[1] / 320
             scale_y = frame.shape[0] / 240
             
-            # Use last known locations to draw the box so it doesn't disappear immediately
-            if miss_count < MAX_MISSES and last_locations:
-                for (top, right, bottom, left) in last_locations:
-                    # Scale coordinates
-                    left = int(left * scale_x)
-                    top = int(top * scale_y)
-                    right = int(right * scale_x)
-                    bottom = int(bottom * scale_y)
-                    cv2.rectangle(frame, (left, top), (right, bottom), color, 3)
+            # Use the current (detected or tracked) box
+            if face_box is not None:
+                top, right, bottom, left = face_box
+                # Scale coordinates
+                left = int(left * scale_x)
+                top = int(top * scale_y)
+                right = int(right * scale_x)
+                bottom = int(bottom * scale_y)
+                cv2.rectangle(frame, (left, top), (right, bottom), color, 3)
             
             # Add status text (larger font for web display)
             cv2.putText(frame, status_text, (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
             
-            # Update shared frame for video stream overlay
-            if use_shared_camera and face_frame_lock is not None and current_face_frame is not None:
-                try:
-                    with face_frame_lock:
-                        # Update the frame array in-place
-                        if current_face_frame.shape == frame.shape:
-                            current_face_frame[:] = frame
-                        else:
-                            # If shape mismatch, create new array
-                            current_face_frame = frame.copy()
-                except Exception as e:
-                    print(f"Warning: Could not update face frame: {e}")
+            # Publish the annotated frame for the video stream overlay (ownership passes to the slot)
+            if use_shared_camera and current_face_frame is not None:
+                current_face_frame.publish(frame)
             
             if blink_detected:
                 print("✔ Liveness Confirmed (Blink Detected)")
+                stats.finish("verified")
                 return True, matched_name
 
-            time.sleep(0.033)  # ~30 FPS
-
     except Exception as e:
         print(f"Face verification error: {e}")
+        stats.finish("error")
         if socketio:
             socketio.emit('interaction', {'msg': f'Verification error: {str(e)}'})
         return False, "error"
@@ -285,7 +594,121 @@ def verify_face_for_card(card_id, socketio=None, camera_instance=None, face_fram
         
         # Note: Clearing the overlay flag is handled by app.py
     
+    if camera_closed:
+        stats.finish("camera_closed")
+        if socketio:
+            socketio.emit('interaction', {'msg': 'Camera unavailable'})
+        return False, "camera_closed"
+
     # Timeout
+    stats.finish("timeout")
     if socketio:
         socketio.emit('interaction', {'msg': 'Verification timeout'})
-    return False, "timeout"
\ No newline at end of file
+    return False, "timeout"
+
+def identify_face(socketio=None, camera_instance=None, face_frame_lock=None, current_face_frame=None, camera_lock=None):
+    """
+    Face-only entry for badge-forgotten days: identify against the whole
+    gallery (ANN index when built), then require a blink like verification.
+    Returns (True, matched_name) or (False, reason).
+    """
+    return verify_face_for_card(None, socketio, camera_instance, face_frame_lock, current_face_frame, camera_lock)
+
+def capture_enrollment(cam, card_id, user_name, on_frame=None, max_frames=150):
+    """
+    Camera enrollment loop (web enrollment and the replay benchmark).
+
+    Collects face samples from the detector's (downscaled / ROI) detections,
+    keeps those that pass the quality gate (sharpness, size, pose; see
+    face_quality) and stops as soon as config.ENROLL_SAMPLES good ones exist.
+    The best config.ENROLL_TEMPLATES are stored as Known_Faces images
+    "<card>_<name>.jpg", "<card>_<name>~2.jpg", ... and gallery templates,
+    or as their centroid when config.ENROLL_STORE == "centroid" (pinned in
+    "<card>_<name>.npy"). Templates of an earlier enrollment of the card
+    are removed first.
+    cam is the app's FrameBus or any object with read()/isOpened().
+    on_frame(frame, box) is called for every frame so the caller can publish
+    an overlay; box is the detected face in frame coordinates or None.
+    Returns (True, name) or (False, reason); stats go to LAST_ENROLL_STATS.
+    """
+    global LAST_ENROLL_STATS
+    stats = LAST_ENROLL_STATS = PipelineStats("enroll")
+    name = f"{card_id}_{user_name}"
+    gate = face_quality.QualityGate(config.ENROLL_MIN_SHARPNESS, config.ENROLL_MIN_FACE_PX,
+                                    config.ENROLL_MAX_YAW, config.ENROLL_MAX_ROLL)
+
+    detector = new_face_detector()
+    stats.detect_paths = detector.counts
+    samples = []
+    seen_face = False
+    last_box = None
+    for _ in range(max_frames):
+        ret, frame = cam.read()
+        if not ret:
+            if not cam.isOpened():
+                stats.finish("camera_closed")
+                return False, "camera_closed"
+            continue
+        stats.frames += 1
+
+        # One private copy per frame: detection, the quality gate, the encoding
+        # and the saved template image all come from it
+        frame = frame.copy()
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        with stats.stage("detect"):
+            locs = detector.detect(rgb, last_box)
+        last_box = locs[0] if locs else None
+        if on_frame:
+            on_frame(frame, last_box)
+        if len(locs) != 1:
+            continue        # Nobody, or someone else in the picture
+        seen_face = True
+
+        with stats.stage("landmarks"):
+            landmarks = face_landmarks(rgb, locs)
+        sample = gate.measure(frame, gray, locs[0], landmarks[0] if landmarks else None)
+        if sample is None:
+            stats.rejected += 1
+            continue
+
+        with stats.stage("encode"):
+            encs = face_encodings(rgb, locs)
+        if not encs:
+            stats.rejected += 1
+            continue
+        sample.encoding = np.asarray(encs[0], dtype=np.float32)
+        samples.append(sample)
+        if len(samples) == 1:
+            stats.mark_identity()
+        if len(samples) >= config.ENROLL_SAMPLES:
+            break
+
+    if not samples:
+        reason = "low_quality" if seen_face else "timeout"
+        stats.finish(reason)
+        return False, reason
+
+    chosen = face_quality.select_templates(samples, config.ENROLL_TEMPLATES)
+    stats.samples = [s.as_dict() for s in chosen]
+    # Re-enrollment replaces the card's templates instead of adding to them
+    removed = remove_card_faces(card_id)
+    if removed:
+        print(f"[ENROLLMENT] Replaced {removed} old template(s) of card {card_id}")
+    if config.ENROLL_STORE == "centroid":
+        # The centroid is pinned next to the image: re-encoding the image would lose it
+        filename = enrollments.template_filename(name, 0)
+        path = os.path.join(config.KNOWN_FACES_DIR, filename)
+        encoding = face_quality.centroid(chosen)
+        cv2.imwrite(path, chosen[0].frame)
+        save_pinned(filename, encoding)
+        add_known_face(name, encoding, path)
+    else:
+        for i, sample in enumerate(chosen):
+            path = os.path.join(config.KNOWN_FACES_DIR, enrollments.template_filename(name, i))
+            cv2.imwrite(path, sample.frame)
+            add_known_face(name, sample.encoding, path)
+    for sample in chosen:
+        TEMPLATE_SCORE.observe(sample.score)
+    stats.finish("enrolled")
+    return True, name
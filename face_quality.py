@@ -0,0 +1,108 @@
+import math
+import cv2
+import numpy as np
+
+from face_tracker import clamp_box
+
+class Sample:
+    """One enrollment candidate: a face box in a frame, its quality and (once encoded) its encoding."""
+    __slots__ = ("frame", "box", "sharpness", "size", "yaw", "roll", "score", "encoding")
+
+    def __init__(self, frame, box, sharpness, size, yaw, roll, score):
+        self.frame = frame
+        self.box = box
+        self.sharpness = sharpness
+        self.size = size
+        self.yaw = yaw
+        self.roll = roll
+        self.score = score
+        self.encoding = None
+
+    def as_dict(self):
+        return {"score": round(self.score, 3), "sharpness": round(self.sharpness, 1), "size": self.size,
+                "yaw": None if self.yaw is None else round(self.yaw, 3),
+                "roll": None if self.roll is None else round(self.roll, 1)}
+
+class QualityGate:
+    """
+    Scores face crops for enrollment on sharpness, size and pose.
+
+    sharpness: variance of the Laplacian of the face crop scaled to a fixed
+        height (so near and far faces are comparable); motion blur and
+        defocus drive it towards 0.
+    size: face box height in pixels of the full frame.
+    pose: from the 68-point landmarks; yaw is the nose tip's offset from
+        the eye midpoint in eye distances (0 = frontal), roll the eye-line
+        angle in degrees.
+    A sample passes when all three clear their minimums; score ranks the
+    ones that pass (0..1, higher is better).
+    """
+
+    CROP_HEIGHT = 128
+
+    def __init__(self, min_sharpness=40.0, min_face_px=80, max_yaw=0.25, max_roll=15.0):
+        self.min_sharpness = min_sharpness
+        self.min_face_px = min_face_px
+        self.max_yaw = max_yaw
+        self.max_roll = max_roll
+
+    def sharpness(self, gray, box):
+        top, right, bottom, left = clamp_box(box, gray.shape)
+        crop = gray[top:bottom, left:right]
+        if crop.size == 0:
+            return 0.0
+        scale = self.CROP_HEIGHT / crop.shape[0]
+        crop = cv2.resize(crop, (max(1, int(crop.shape[1] * scale)), self.CROP_HEIGHT))
+        return float(cv2.Laplacian(crop, cv2.CV_64F).var())
+
+    @staticmethod
+    def pose(landmarks):
+        """(yaw, roll) from face_recognition landmarks, or (None, None) when points are missing."""
+        try:
+            left_eye = np.mean(landmarks["left_eye"], axis=0)
+            right_eye = np.mean(landmarks["right_eye"], axis=0)
+            nose = np.mean(landmarks["nose_tip"], axis=0)
+        except (KeyError, TypeError, ValueError):
+            return None, None
+        dx, dy = right_eye - left_eye
+        eye_distance = math.hypot(dx, dy)
+        if eye_distance < 1:
+            return None, None
+        mid = (left_eye + right_eye) / 2
+        yaw = float((nose[0] - mid[0]) / eye_distance)
+        roll = math.degrees(math.atan2(dy, dx))
+        return yaw, roll
+
+    def measure(self, frame, gray, box, landmarks):
+        """Sample for this face, or None when it fails a minimum."""
+        top, right, bottom, left = box
+        size = bottom - top
+        if size < self.min_face_px:
+            return None
+        sharpness = self.sharpness(gray, box)
+        if sharpness < self.min_sharpness:
+            return None
+        yaw, roll = self.pose(landmarks)
+        if yaw is None or abs(yaw) > self.max_yaw or abs(roll) > self.max_roll:
+            return None
+
+        score = (0.5 * min(sharpness / (2 * self.min_sharpness), 1.0)
+                 + 0.3 * min(size / (2 * self.min_face_px), 1.0)
+                 + 0.2 * (1.0 - abs(yaw) / self.max_yaw) * (1.0 - abs(roll) / self.max_roll))
+        return Sample(frame, box, sharpness, size, yaw, roll, score)
+
+def select_templates(samples, k=3, outlier_distance=0.4):
+    """
+    Best k encoded samples by score. Samples farther than outlier_distance
+    from the centroid of the encoded ones (a second person, a bad
+    detection) are dropped first.
+    """
+    encoded = [s for s in samples if s.encoding is not None]
+    if len(encoded) >= 3:
+        centroid = np.mean([s.encoding for s in encoded], axis=0)
+        kept = [s for s in encoded if np.linalg.norm(s.encoding - centroid) <= outlier_distance]
+        encoded = kept or encoded
+    return sorted(encoded, key=lambda s: s.score, reverse=True)[:k]
+
+def centroid(samples):
+    return np.mean([s.encoding for s in samples], axis=0)
@@ -0,0 +1,205 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+import config
+
+# On-disk layout inside config.FACE_CACHE_DIR:
+#   encodings-<generation>.npy -> float32 matrix (rows x 128), memory-mapped on load
+#   manifest.json              -> matrix filename + filename -> {size, mtime_ns, sha1, row}
+# Every save writes a new matrix file and then the manifest naming it, so a
+# crash in between leaves the old manifest paired with its own matrix.
+ENCODING_DIM = 128
+MANIFEST_VERSION = 2
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+def _file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _fsync_replace(tmp_path, final_path):
+    os.replace(tmp_path, final_path)
+    try:
+        dir_fd = os.open(os.path.dirname(final_path) or ".", os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
+
+class EncodingStore:
+    """
+    Persistent cache of face encodings for the images in Known_Faces.
+    Each image is keyed by filename, size, mtime and content hash so that
+    only new or changed files need to go through HOG + encoding at boot.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or config.FACE_CACHE_DIR
+        self.manifest_path = os.path.join(self.cache_dir, "manifest.json")
+        self.generation = 0
+        self.matrix_path = None     # matrix named by the loaded/saved manifest
+        # filename -> {"size", "mtime_ns", "sha1"}
+        self.entries = {}
+        # filename -> float32 vector, or None if the image has no usable face
+        self.vectors = {}
+        self.dirty = False
+        self.lock = threading.RLock()
+
+    def load(self):
+        """Loads manifest + memory-mapped matrix. A broken cache is simply discarded."""
+        with self.lock:
+            self.entries, self.vectors, self.dirty = {}, {}, False
+            self.generation, self.matrix_path = 0, None
+            if not os.path.exists(self.manifest_path):
+                return
+            try:
+                with open(self.manifest_path, "r") as f:
+                    manifest = json.load(f)
+                if manifest.get("version") != MANIFEST_VERSION:
+                    raise ValueError("manifest version mismatch")
+
+                rows = int(manifest.get("rows", 0))
+                self.generation = int(manifest["generation"])
+                self.matrix_path = os.path.join(self.cache_dir, manifest["matrix"])
+                matrix = None
+                if rows:
+                    matrix = np.load(self.matrix_path, mmap_mode="r")
+                    if matrix.shape != (rows, ENCODING_DIM):
+                        raise ValueError(f"matrix shape {matrix.shape} != ({rows}, {ENCODING_DIM})")
+
+                for fn, rec in manifest.get("files", {}).items():
+                    row = rec.get("row")
+                    self.entries[fn] = {
+                        "size": int(rec["size"]),
+                        "mtime_ns": int(rec["mtime_ns"]),
+                        "sha1": rec["sha1"],
+                    }
+                    self.vectors[fn] = matrix[row] if row is not None else None
+            except Exception as e:
+                print(f"[FACE_CACHE] Discarding unreadable cache: {e}")
+                self.entries, self.vectors = {}, {}
+                self.matrix_path = None
+                self.dirty = True
+
+    def scan(self, directory):
+        """
+        Compares the cache against the image files in directory.
+        Drops entries for deleted files and returns the sorted list of
+        filenames that are new or whose content changed.
+        """
+        with self.lock:
+            try:
+                present = sorted(fn for fn in os.listdir(directory) if fn.lower().endswith(IMAGE_EXTENSIONS))
+            except FileNotFoundError:
+                present = []
+
+            for fn in set(self.entries) - set(present):
+                del self.entries[fn]
+                self.vectors.pop(fn, None)
+                self.dirty = True
+
+            stale = []
+            for fn in present:
+                path = os.path.join(directory, fn)
+                rec = self.entries.get(fn)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if rec is None:
+                    stale.append(fn)
+                    continue
+                if rec["size"] == st.st_size and rec["mtime_ns"] == st.st_mtime_ns:
+                    continue
+
+                # Size/mtime changed (copied back, touched...) - only re-encode if the bytes did too
+                if rec["size"] == st.st_size and rec["sha1"] == _file_sha1(path):
+                    rec["mtime_ns"] = st.st_mtime_ns
+                    self.dirty = True
+                else:
+                    stale.append(fn)
+            return stale
+
+    def put(self, filename, encoding, path):
+        """Records the encoding (or None for 'no face') for the image at path."""
+        st = os.stat(path)
+        with self.lock:
+            self.entries[filename] = {
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "sha1": _file_sha1(path),
+            }
+            self.vectors[filename] = None if encoding is None else np.asarray(encoding, dtype=np.float32)
+            self.dirty = True
+
+    def remove(self, filename):
+        with self.lock:
+            if self.entries.pop(filename, None) is not None:
+                self.vectors.pop(filename, None)
+                self.dirty = True
+
+    def items(self):
+        """Returns [(filename, encoding)] in filename order, skipping images without a face."""
+        with self.lock:
+            return [(fn, self.vectors[fn]) for fn in sorted(self.entries) if self.vectors.get(fn) is not None]
+
+    def save(self):
+        """Writes a new matrix file, then the manifest that names it (the commit point), then drops old matrices."""
+        with self.lock:
+            if not self.dirty:
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+            files = {}
+            rows = []
+            for fn in sorted(self.entries):
+                rec = dict(self.entries[fn])
+                vec = self.vectors.get(fn)
+                rec["row"] = None
+                if vec is not None:
+                    rec["row"] = len(rows)
+                    rows.append(vec)
+                files[fn] = rec
+
+            matrix = np.vstack(rows).astype(np.float32) if rows else np.zeros((0, ENCODING_DIM), dtype=np.float32)
+
+            generation = self.generation + 1
+            matrix_name = f"encodings-{generation}.npy"
+            matrix_path = os.path.join(self.cache_dir, matrix_name)
+            tmp = matrix_path + ".tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, matrix)
+                f.flush()
+                os.fsync(f.fileno())
+            _fsync_replace(tmp, matrix_path)
+
+            tmp = self.manifest_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"version": MANIFEST_VERSION, "generation": generation, "matrix": matrix_name,
+                           "rows": len(rows), "files": files}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            _fsync_replace(tmp, self.manifest_path)
+            self.generation, self.matrix_path = generation, matrix_path
+
+            # Older matrices (and leftovers of a crashed save) are no longer referenced
+            for fn in os.listdir(self.cache_dir):
+                if fn.startswith("encodings") and fn.endswith((".npy", ".npy.tmp")) and fn != matrix_name:
+                    try:
+                        os.remove(os.path.join(self.cache_dir, fn))
+                    except OSError:
+                        pass
+
+            # Re-point vectors at the new file so memory stays mmap-backed
+            if rows:
+                mapped = np.load(self.matrix_path, mmap_mode="r")
+                for fn, rec in files.items():
+                    if rec["row"] is not None:
+                        self.vectors[fn] = mapped[rec["row"]]
+            self.dirty = False
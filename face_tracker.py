@@ -0,0 +1,118 @@
+import cv2
+import numpy as np
+
+class FaceTracker:
+    """
+    Cheap box tracker between HOG detections.
+
+    Keeps a grayscale template of the last detected face and finds it again
+    with normalized cross-correlation inside a padded search window. Boxes
+    use face_recognition's (top, right, bottom, left) order.
+    """
+
+    def __init__(self, search_pad=0.5, min_score=0.55):
+        self.search_pad = search_pad
+        self.min_score = min_score
+        self.template = None
+        self.box = None
+        self.score = 0.0
+
+    @property
+    def active(self):
+        return self.box is not None
+
+    def reset(self):
+        self.template = None
+        self.box = None
+
+    def start(self, gray, box):
+        top, right, bottom, left = clamp_box(box, gray.shape)
+        if bottom - top < 8 or right - left < 8:
+            self.reset()
+            return
+        self.template = gray[top:bottom, left:right].copy()
+        self.box = (top, right, bottom, left)
+        self.score = 1.0
+
+    def update(self, gray):
+        """Returns the new box, or None (and resets) when the face is lost."""
+        if self.box is None:
+            return None
+        top, right, bottom, left = self.box
+        h, w = bottom - top, right - left
+        pad_y, pad_x = int(h * self.search_pad), int(w * self.search_pad)
+        s_top, s_right, s_bottom, s_left = clamp_box((top - pad_y, right + pad_x, bottom + pad_y, left - pad_x), gray.shape)
+        window = gray[s_top:s_bottom, s_left:s_right]
+        if window.shape[0] < h or window.shape[1] < w:
+            self.reset()
+            return None
+
+        result = cv2.matchTemplate(window, self.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (x, y) = cv2.minMaxLoc(result)
+        self.score = score
+        if score < self.min_score:
+            self.reset()
+            return None
+        self.box = (s_top + y, s_left + x + w, s_top + y + h, s_left + x)
+        return self.box
+
+def clamp_box(box, shape):
+    top, right, bottom, left = box
+    height, width = shape[:2]
+    return max(0, int(top)), min(width, int(right)), min(height, int(bottom)), max(0, int(left))
+
+def pad_box(box, pad, shape):
+    top, right, bottom, left = box
+    pad_y, pad_x = int((bottom - top) * pad), int((right - left) * pad)
+    return clamp_box((top - pad_y, right + pad_x, bottom + pad_y, left - pad_x), shape)
+
+class FaceDetector:
+    """
+    HOG detection that avoids scanning the whole frame.
+
+    mode "full" is the plain full-frame search. mode "roi" first searches a
+    padded region around the last known face (hint) at full resolution, and
+    only on a miss falls back to a full-frame search on a copy downscaled to
+    at most fallback_width pixels wide. Returned boxes are always in the
+    coordinates of the frame passed in, so callers scale them for the
+    overlay exactly as before.
+    """
+
+    MODES = ("full", "roi")
+
+    def __init__(self, locate, mode="roi", roi_pad=0.6, fallback_width=320):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown face detection mode: {mode}")
+        self.locate = locate
+        self.mode = mode
+        self.roi_pad = roi_pad
+        self.fallback_width = fallback_width
+        self.counts = {"roi": 0, "fallback": 0, "full": 0, "miss": 0}
+
+    def detect(self, rgb, hint=None):
+        """[(top, right, bottom, left), ...] in rgb's coordinates, like face_locations()."""
+        if self.mode == "full":
+            return self._found("full", self.locate(rgb))
+
+        if hint is not None:
+            top, right, bottom, left = pad_box(hint, self.roi_pad, rgb.shape)
+            if bottom - top >= 40 and right - left >= 40:
+                # dlib wants a contiguous buffer
+                found = self.locate(np.ascontiguousarray(rgb[top:bottom, left:right]))
+                if found:
+                    return self._found("roi", [clamp_box((t + top, r + left, b + top, l + left), rgb.shape)
+                                               for t, r, b, l in found])
+
+        scale = self.fallback_width / rgb.shape[1]
+        if scale >= 1.0:
+            return self._found("full", self.locate(rgb))
+        size = (self.fallback_width, max(1, int(rgb.shape[0] * scale)))
+        found = self.locate(cv2.resize(rgb, size, interpolation=cv2.INTER_AREA))
+        return self._found("fallback", [clamp_box((t / scale, r / scale, b / scale, l / scale), rgb.shape) for t, r, b, l in found])
+
+    def _found(self, path, boxes):
+        if not boxes:
+            self.counts["miss"] += 1
+            return []
+        self.counts[path] += 1
+        return boxes
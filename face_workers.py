@@ -0,0 +1,307 @@
+import os
+import time
+import atexit
+import queue
+import threading
+import itertools
+import collections
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait as wait_connections
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import numpy as np
+
+# Operations a worker can run on a frame (all take an RGB uint8 image)
+def _run_op(op, image, args):
+    import face_recognition
+    if op == "locations":
+        return face_recognition.face_locations(image)
+    if op == "encodings":
+        return face_recognition.face_encodings(image, *args)
+    if op == "landmarks":
+        return face_recognition.face_landmarks(image, *args)
+    raise ValueError(f"Unknown face op: {op}")
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+class WorkerDied(RuntimeError):
+    """The worker process running the job exited (dlib crash, OOM kill)."""
+
+def _worker_main(index, slot_names, slot_jobs, worker_jobs, tasks, results, worker_pids):
+    worker_pids[index] = os.getpid()
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    try:
+        while True:
+            job = tasks.get()
+            if job is None:
+                break
+            job_id, op, slot, shape, args = job
+            if slot_jobs[slot] != job_id:
+                continue        # Given up on while it was queued; the slot may already hold another frame
+            worker_jobs[index] = job_id       # Shared memory: still readable if this process dies mid-job
+            started = time.perf_counter()
+            try:
+                image = np.ndarray(shape, dtype=np.uint8, buffer=slots[slot].buf)
+                results.put((job_id, True, _run_op(op, image, args), time.perf_counter() - started))
+            except Exception as e:
+                results.put((job_id, False, repr(e), time.perf_counter() - started))
+            worker_jobs[index] = 0
+    finally:
+        for shm in slots:
+            shm.close()
+
+def _supervise(ctx, size, worker_args, worker_jobs, control, deaths, parent_ends):
+    """
+    Supervisor process: owns the workers and restarts the ones that die.
+
+    It is forked before the app starts any thread and never starts one
+    itself, so its forks are safe at any time; the threaded app process
+    never forks after start. A death is reported over the `deaths` pipe as
+    (worker index, job id it was running or 0, exit code). Stops on a
+    message on `control`, or when the app process is gone and it hits EOF.
+    """
+    for conn in parent_ends:
+        conn.close()
+
+    def spawn(index):
+        worker_jobs[index] = 0
+        proc = ctx.Process(target=_worker_main, args=(index,) + worker_args, daemon=True)
+        proc.start()
+        return proc
+
+    procs = [spawn(i) for i in range(size)]
+    while True:
+        by_sentinel = {proc.sentinel: i for i, proc in enumerate(procs)}
+        ready = wait_connections(list(by_sentinel) + [control])
+        if control in ready:
+            break
+        for sentinel in ready:
+            index = by_sentinel[sentinel]
+            proc = procs[index]
+            proc.join()
+            deaths.send((index, worker_jobs[index], proc.exitcode))
+            procs[index] = spawn(index)
+
+    tasks = worker_args[3]
+    for _ in procs:
+        tasks.put(None)
+    for proc in procs:
+        proc.join(timeout=2)
+
+class FaceWorkerPool:
+    """
+    dlib work (HOG, encodings, landmarks) in separate processes, off the
+    Flask process' GIL.
+
+    Frames are copied into one of `slots` preallocated shared-memory
+    buffers and only (job id, op, slot, shape) goes over the task queue;
+    results come back on a result queue and are matched to futures by a
+    collector thread. A slot is busy until its job's result arrives, so at
+    most `slots` jobs are in flight and submit() blocks when all are taken.
+
+    The workers belong to a supervisor process (see _supervise) that is
+    forked in start(), before the app starts its threads, and restarts a
+    worker that dies. Each worker publishes the job it is running in shared
+    memory, which survives the process, so the collector can fail that
+    job with WorkerDied and free its slot (checked every reap_interval
+    seconds). call() keeps waiting for a job a live worker is running and
+    only takes back (and runs inline) one that is still queued after
+    `timeout`.
+    """
+
+    def __init__(self, size=2, slots=4, frame_bytes=640 * 480 * 3, timeout=10.0, reap_interval=0.5):
+        self.size = size
+        self.frame_bytes = frame_bytes
+        self.timeout = timeout
+        self.reap_interval = reap_interval
+        self._shm = [shared_memory.SharedMemory(create=True, size=frame_bytes) for _ in range(slots)]
+        self._slot_jobs = mp.Array("q", slots, lock=False)     # slot -> id of the job owning it (0 = none)
+        self._worker_jobs = mp.Array("q", size, lock=False)    # worker index -> id of the job it runs (0 = idle)
+        self._worker_pids = mp.Array("q", size, lock=False)    # worker index -> pid, for stats
+        self._free = queue.Queue()
+        for i in range(slots):
+            self._free.put(i)
+        self._ctx = mp.get_context("fork")
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._supervisor = None
+        self._pending = {}          # job_id -> (future, slot, submitted_at)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._latency = collections.deque(maxlen=512)   # submit -> result, seconds
+        self._service = collections.deque(maxlen=512)   # time spent inside the worker
+        self.completed = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.inline = 0
+        self.restarts = 0
+
+    def start(self):
+        """Forks the supervisor (and through it the workers). Call before other threads are started."""
+        names = [shm.name for shm in self._shm]
+        worker_args = (names, self._slot_jobs, self._worker_jobs, self._tasks, self._results, self._worker_pids)
+        self._control, control = self._ctx.Pipe()
+        self._deaths, deaths = self._ctx.Pipe(duplex=False)
+        self._supervisor = self._ctx.Process(
+            target=_supervise,
+            args=(self._ctx, self.size, worker_args, self._worker_jobs, control, deaths, (self._control, self._deaths)),
+            daemon=False)     # daemonic processes cannot have children
+        self._supervisor.start()
+        control.close()
+        deaths.close()
+        atexit.register(self.close)
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+        return self
+
+    def close(self):
+        if self._supervisor is None:
+            return
+        atexit.unregister(self.close)
+        try:
+            self._control.send(None)
+        except OSError:
+            pass
+        self._supervisor.join(timeout=5)
+        self._supervisor = None
+        self._results.put(None)
+        self._collector.join(timeout=2)
+        for shm in self._shm:
+            shm.close()
+            shm.unlink()
+
+    def submit(self, op, image, *args):
+        """Future for op(image, *args), computed in a worker process."""
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        if image.nbytes > self.frame_bytes:
+            raise ValueError(f"Frame of {image.nbytes} bytes does not fit a {self.frame_bytes} byte slot")
+        slot = self._free.get(timeout=self.timeout)
+        np.ndarray(image.shape, dtype=np.uint8, buffer=self._shm[slot].buf)[...] = image
+
+        future = Future()
+        future.job_id = job_id = next(self._ids)
+        self._slot_jobs[slot] = job_id
+        with self._lock:
+            self._pending[job_id] = (future, slot, time.perf_counter())
+        self._tasks.put((job_id, op, slot, image.shape, args))
+        return future
+
+    def call(self, op, image, *args):
+        """
+        Runs op in the pool. Falls back to this process when no slot frees up,
+        the frame is too big, the job's worker died or the job is still
+        queued after timeout; a job a live worker is running is waited for.
+        """
+        try:
+            future = self.submit(op, image, *args)
+            while True:
+                try:
+                    return future.result(timeout=self.timeout)
+                except FutureTimeout:
+                    if self._abandon(future.job_id):
+                        self.timeouts += 1
+                        break
+        except queue.Empty:
+            self.timeouts += 1
+        except (ValueError, WorkerDied):
+            pass
+        self.inline += 1
+        return _run_op(op, image, args)
+
+    def _abandon(self, job_id):
+        """Takes back a job no worker has started. False when it is running (or just finished)."""
+        with self._lock:
+            if job_id in self._worker_jobs[:]:
+                return False
+            entry = self._pending.pop(job_id, None)
+        if entry is None:
+            return False
+        future, slot, _ = entry
+        self._release(slot, job_id)
+        future.cancel()
+        return True
+
+    def _release(self, slot, job_id):
+        if self._slot_jobs[slot] == job_id:
+            self._slot_jobs[slot] = 0
+            self._free.put(slot)
+
+    def _reap(self):
+        """Fails the job of each worker the supervisor reported dead (it has restarted them)."""
+        while self._deaths.poll():
+            try:
+                index, job_id, exitcode = self._deaths.recv()
+            except EOFError:
+                return
+            self.restarts += 1
+            print(f"[FACE] Worker {index} exited with code {exitcode}, restarted")
+            with self._lock:
+                entry = self._pending.pop(job_id, None)
+            if entry is not None:
+                future, slot, _ = entry
+                self._release(slot, job_id)
+                future.set_exception(WorkerDied(f"face worker exited with code {exitcode}"))
+
+    def _collect(self):
+        next_reap = time.monotonic() + self.reap_interval
+        while True:
+            try:
+                item = self._results.get(timeout=self.reap_interval)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                return
+            if time.monotonic() >= next_reap:
+                self._reap()
+                next_reap = time.monotonic() + self.reap_interval
+            if not item:
+                continue
+
+            job_id, ok, value, service = item
+            with self._lock:
+                entry = self._pending.pop(job_id, None)
+                if entry is None:
+                    continue
+                future, slot, submitted = entry
+                self._latency.append(time.perf_counter() - submitted)
+                self._service.append(service)
+                self.completed += 1
+                if not ok:
+                    self.errors += 1
+            self._release(slot, job_id)
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(value))
+
+    def stats(self):
+        with self._lock:
+            inflight = len(self._pending)
+            latency = sorted(self._latency)
+            service = list(self._service)
+
+        def ms(values, q):
+            return round(values[int(q * (len(values) - 1))] * 1000, 2) if values else None
+
+        return {
+            "size": self.size,
+            "alive": sum(_pid_alive(pid) for pid in self._worker_pids[:]),
+            "slots": len(self._shm),
+            "inflight": inflight,
+            "queue_depth": max(0, inflight - self.size),
+            "completed": self.completed,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "inline": self.inline,
+            "restarts": self.restarts,
+            "latency_ms_p50": ms(latency, 0.5),
+            "latency_ms_p95": ms(latency, 0.95),
+            "service_ms_mean": round(sum(service) / len(service) * 1000, 2) if service else None,
+        }
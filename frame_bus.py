@@ -0,0 +1,106 @@
+import time
+import threading
+import numpy as np
+
+class FrameBus:
+    """
+    Single-producer ring of preallocated frame buffers.
+
+    The capture thread is the only code that touches the camera: it reads
+    straight into the next ring slot and bumps a sequence number. Consumers
+    wait for "next frame after seq N" and get a read-only view of the slot,
+    without copying. A view stays valid until the producer wraps around the
+    ring (slots - 1 more frames); use is_current(seq) to check after slow work.
+
+    FrameBus also looks like a camera (read()/isOpened()), so it can be passed
+    as camera_instance to face_auth.verify_face_for_card. read() does not
+    hand out views: it copies the frame into a buffer owned by the calling
+    thread, so it stays intact through detection and encoding however long
+    they take.
+    """
+
+    def __init__(self, slots=4, lock=None):
+        self.slots = slots
+        self._buffers = [None] * slots
+        self._cond = threading.Condition(lock)
+        self._local = threading.local()
+        self.seq = 0
+        self.opened = False
+        self.dropped_reads = 0
+        self.stale_reads = 0
+
+    # --- producer ---
+    def capture(self, camera):
+        """Reads one frame from camera into the ring. Returns False on a failed read."""
+        idx = (self.seq + 1) % self.slots
+        buf = self._buffers[idx]
+        ret, out = camera.read(buf) if buf is not None else camera.read()
+        if not ret or out is None:
+            self.dropped_reads += 1
+            return False
+        if out is not buf:
+            # First frame, or the camera changed resolution: adopt the new array as this slot
+            self._buffers[idx] = out
+        with self._cond:
+            self.seq += 1
+            self.opened = True
+            self._cond.notify_all()
+        return True
+
+    def close(self):
+        with self._cond:
+            self.opened = False
+            self._cond.notify_all()
+
+    # --- consumers ---
+    def _view(self, seq):
+        view = self._buffers[seq % self.slots].view()
+        view.flags.writeable = False
+        return view
+
+    def latest(self):
+        """(seq, read-only frame) of the newest frame, or (0, None) before the first one."""
+        with self._cond:
+            if self.seq == 0:
+                return 0, None
+            return self.seq, self._view(self.seq)
+
+    def wait_next(self, after_seq, timeout=None):
+        """Blocks until a frame newer than after_seq exists -> (seq, frame) or (after_seq, None) on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.seq > after_seq, timeout):
+                return after_seq, None
+            return self.seq, self._view(self.seq)
+
+    def is_current(self, seq):
+        """True while the slot holding seq has not been reused by the producer."""
+        return seq > 0 and seq > self.seq + 1 - self.slots
+
+    # --- camera-compatible interface ---
+    def isOpened(self):
+        return self.opened
+
+    def read(self, timeout=1.0):
+        """
+        Next frame this thread has not seen yet, copied into this thread's
+        buffer. Like cv2's read(image), the buffer is reused by the thread's
+        next read(): copy the frame to keep it longer than that.
+        """
+        deadline = time.monotonic() + timeout
+        last = getattr(self._local, 'seq', 0)
+        while True:
+            seq, view = self.wait_next(last, max(0.0, deadline - time.monotonic()))
+            if view is None:
+                return False, None
+            buf = getattr(self._local, 'buf', None)
+            if buf is None or buf.shape != view.shape or buf.dtype != view.dtype:
+                buf = self._local.buf = np.empty_like(view)
+            np.copyto(buf, view)
+            self._local.seq = last = seq
+            if self.is_current(seq):
+                return True, buf
+            # The producer lapped us while copying: the buffer may be torn, take the next frame
+            self.stale_reads += 1
+
+    def release(self):
+        pass
@@ -0,0 +1,141 @@
+import threading
+import numpy as np
+
+ENCODING_DIM = 128
+
+def card_of(name):
+    """Gallery names are '<card_id>_<user name>'."""
+    return name.split("_", 1)[0]
+
+class FaceGallery:
+    """
+    Known face templates in one contiguous float32 matrix.
+
+    Rows are indexed by card_id so a card scan only compares against that
+    card's templates; search() is the full vectorized 1:N pass. Removing a
+    row moves the last row into the hole, so neither add nor remove has to
+    rebuild the matrix.
+    """
+
+    def __init__(self, dim=ENCODING_DIM, capacity=64):
+        self.dim = dim
+        self._matrix = np.empty((capacity, dim), dtype=np.float32)
+        self._names = []      # row -> name
+        self._cards = {}      # card_id -> [row, ...]
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._names)
+
+    @property
+    def matrix(self):
+        """View of the live rows (do not mutate)."""
+        return self._matrix[:len(self._names)]
+
+    @property
+    def names(self):
+        with self.lock:
+            return list(self._names)
+
+    def card_ids(self):
+        with self.lock:
+            return list(self._cards)
+
+    def has_card(self, card_id):
+        return str(card_id) in self._cards
+
+    def _reserve(self, rows):
+        if rows <= self._matrix.shape[0]:
+            return
+        capacity = max(rows, self._matrix.shape[0] * 2)
+        grown = np.empty((capacity, self.dim), dtype=np.float32)
+        grown[:len(self._names)] = self._matrix[:len(self._names)]
+        self._matrix = grown
+
+    def clear(self):
+        with self.lock:
+            self._names = []
+            self._cards = {}
+
+    def load(self, items):
+        """Replaces the gallery with [(name, encoding)] in one copy."""
+        items = list(items)
+        with self.lock:
+            self.clear()
+            self._reserve(len(items))
+            for row, (name, encoding) in enumerate(items):
+                self._matrix[row] = encoding
+                self._names.append(name)
+                self._cards.setdefault(card_of(name), []).append(row)
+
+    def add(self, name, encoding):
+        with self.lock:
+            row = len(self._names)
+            self._reserve(row + 1)
+            self._matrix[row] = encoding
+            self._names.append(name)
+            self._cards.setdefault(card_of(name), []).append(row)
+            return row
+
+    def _remove_row(self, row):
+        last = len(self._names) - 1
+        name = self._names[row]
+        rows = self._cards[card_of(name)]
+        rows.remove(row)
+        if not rows:
+            del self._cards[card_of(name)]
+
+        if row != last:
+            moved = self._names[last]
+            self._matrix[row] = self._matrix[last]
+            self._names[row] = moved
+            moved_rows = self._cards[card_of(moved)]
+            moved_rows[moved_rows.index(last)] = row
+        self._names.pop()
+
+    def remove(self, name):
+        """Removes every template registered under name. Returns how many were removed."""
+        with self.lock:
+            rows = [r for r in self._cards.get(card_of(name), []) if self._names[r] == name]
+            for row in sorted(rows, reverse=True):
+                self._remove_row(row)
+            return len(rows)
+
+    def remove_card(self, card_id):
+        with self.lock:
+            rows = sorted(self._cards.get(str(card_id), []), reverse=True)
+            for row in rows:
+                self._remove_row(row)
+            return len(rows)
+
+    def card_distances(self, card_id, encoding):
+        """Euclidean distances to the templates of one card -> (distances, names)."""
+        with self.lock:
+            rows = self._cards.get(str(card_id))
+            if not rows:
+                return np.empty(0, dtype=np.float32), []
+            templates = self._matrix[rows]
+            names = [self._names[r] for r in rows]
+        return np.linalg.norm(templates - np.asarray(encoding, dtype=np.float32), axis=1), names
+
+    def match_card(self, card_id, encoding, tolerance):
+        """Returns (name, distance) of the card's best template; name is None above tolerance."""
+        distances, names = self.card_distances(card_id, encoding)
+        if not names:
+            return None, None
+        best = int(np.argmin(distances))
+        distance = float(distances[best])
+        return (names[best] if distance <= tolerance else None), distance
+
+    def search(self, encoding, k=1):
+        """Brute-force 1:N search over the whole gallery -> [(name, distance)], closest first."""
+        with self.lock:
+            n = len(self._names)
+            if n == 0:
+                return []
+            distances = np.linalg.norm(self._matrix[:n] - np.asarray(encoding, dtype=np.float32), axis=1)
+            names = self._names
+            k = min(k, n)
+            idx = np.argpartition(distances, k - 1)[:k]
+            idx = idx[np.argsort(distances[idx])]
+            return [(names[i], float(distances[i])) for i in idx]
@@ -1,43 +1,34 @@
 import time
 import sys
 import select
+import queue
 import threading
-import RPi.GPIO as GPIO
-from mfrc522 import SimpleMFRC522
 
 import config
 import state
+import presence
+import tracing
 
-# Setup GPIO
-GPIO.setwarnings(False)
-GPIO.cleanup()
-GPIO.setmode(GPIO.BCM)
+# Device backend: real GPIO/SPI on the Pi, or in-memory stand-ins (hardware_sim)
+# for running and load-testing the app anywhere. Chosen once at import.
+if config.HARDWARE_BACKEND == "sim":
+    import hardware_sim as backend
+else:
+    import hardware_gpio as backend
 
-# Ultrasonic pins
-GPIO.setup(config.TRIG, GPIO.OUT)
-GPIO.setup(config.ECHO, GPIO.IN)
-
-# Break switch
-GPIO.setup(config.BREAK_SWITCH_PIN, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
-
-# Servo Setup
-GPIO.setup(config.SERVO_PIN, GPIO.OUT)
-# Set PWM to 50Hz (Standard for Servos)
-servo_pwm = GPIO.PWM(config.SERVO_PIN, 50) 
-servo_pwm.start(0) # Start with 0 duty cycle (motor off)
-
-# Initialize Reader
-reader = SimpleMFRC522()
+ultrasonic, reader, break_switch, servo = backend.create()
 
 def cleanup():
-    servo_pwm.stop()
-    GPIO.cleanup()
+    servo.stop()
+    backend.cleanup()
 
 def wait_for_break_switch(timeout_seconds):
     """Waits for user input (simulated via keyboard 'B') or switch."""
     print(f"(Press 'B' and ENTER to indicate BREAK)")
     deadline = time.time() + timeout_seconds
     while time.time() < deadline:
+        if break_switch.is_pressed():
+            return True
         dr, _, _ = select.select([sys.stdin], [], [], 0.1)  
         if dr:
             key = sys.stdin.readline().strip()
@@ -46,104 +37,164 @@ def wait_for_break_switch(timeout_seconds):
         time.sleep(0.1)
     return False
 
-def ultrasonic_thread():
-    """Background thread to handle system wake-up based on distance."""
-    while True:
-        # [NEW] Check if Door is operating. If so, PAUSE scanning to save CPU for Servo.
-        with state.lock:
-            if state.door_operation_active:
-                time.sleep(0.5) 
-                continue
-
-        # 1. Measure Distance
-        GPIO.output(config.TRIG, False)
-        time.sleep(0.02)
-
-        GPIO.output(config.TRIG, True)
-        time.sleep(0.00001)
-        GPIO.output(config.TRIG, False)
-
-        pulse_start = pulse_end = None
-        start_wait = time.time()
-        while GPIO.input(config.ECHO) == 0:
-            pulse_start = time.time()
-            if time.time() - start_wait > 0.5: break
-        start_wait = time.time()
-        while GPIO.input(config.ECHO) == 1:
-            pulse_end = time.time()
-            if time.time() - start_wait > 0.5: break
-
-        if pulse_start is None or pulse_end is None:
-            time.sleep(0.2)
-            continue
-
-        distance = round((pulse_end - pulse_start) * 17150, 1)
-
-        # 2. Logic to wake up or stay awake
-        if distance < 30:
-            with state.lock:
-                if not state.system_active:
-                    state.system_active = True
-                    print(f"[ULTRASONIC] Person detected ({distance} cm). System ACTIVE.")
-            
-            # Initial sleep to keep it on
-            time.sleep(10)
-
-            # 3. STAY AWAKE if interaction is happening
-            while True:
-                with state.lock:
-                    busy = state.interaction_in_progress
-                
-                if busy:
-                    time.sleep(1) # Wait and check again
-                else:
-                    break # Interaction done, proceed to turn off
-
-            with state.lock:
-                state.system_active = False
-            print("[ULTRASONIC] System DEACTIVATED.")
+# Presence subsystem (set by ultrasonic_thread)
+presence_monitor = None
 
-        time.sleep(0.2)
+# callback(active) for every change of state.system_active made here
+activity_listeners = []
 
-def servo_thread():
-    """ Dedicated thread to handle door locking/unlocking """
-    
-    # Ensure locked at start
-    servo_pwm.ChangeDutyCycle(4.3) 
-    time.sleep(0.5)
-    servo_pwm.ChangeDutyCycle(0) # Stop signal
+def _notify_activity(active):
+    for callback in activity_listeners:
+        try:
+            callback(active)
+        except Exception as e:
+            print(f"[ULTRASONIC] Activity listener failed: {e}")
 
+def ultrasonic_thread():
+    """
+    Wakes the system when someone is in front of the kiosk.
+    A PresenceMonitor samples the sensor in its own thread and publishes
+    arrive/leave events; this thread only reacts to them.
+    """
+    global presence_monitor
+    monitor = presence.PresenceMonitor(
+        ultrasonic, rate_hz=config.PRESENCE_SAMPLE_HZ, window=config.PRESENCE_WINDOW,
+        near_cm=config.PRESENCE_NEAR_CM, far_cm=config.PRESENCE_FAR_CM, gate=state.door_idle,
+    )
+    events = queue.Queue()
+    monitor.subscribe(events.put)
+    presence_monitor = monitor
+    threading.Thread(target=monitor.run, daemon=True).start()
+
+    leaving = False
+    awake_until = 0.0
     while True:
-        # Wait until the main thread signals to open
-        state.unlock_event.wait()
-        
-        # [NEW] Signal that door is moving (Pauses Ultrasonic)
-        with state.lock:
-            state.door_operation_active = True
-
-        print(f"[SERVO] Unlocking door for {config.DOOR_OPEN_SECONDS} seconds...")
-        
-        # 1. Unlock: Rotate to 90 degrees (Vertical)
-        servo_pwm.ChangeDutyCycle(9.3) 
-        time.sleep(0.5) # Wait just enough time for it to move
-        
-        # 2. STOP SIGNAL immediately to prevent vibration while waiting
-        servo_pwm.ChangeDutyCycle(0)
-        
-        # 3. Wait for the remaining door open duration
-        time.sleep(config.DOOR_OPEN_SECONDS - 0.5)
-        
-        # 4. Lock: Rotate back to 0 degrees (Horizontal)
-        print("[SERVO] Locking door.")
-        servo_pwm.ChangeDutyCycle(4.3)
-        time.sleep(0.5)
-        
-        # 5. Turn off signal again
-        servo_pwm.ChangeDutyCycle(0)
-        
-        # [NEW] Door done, Ultrasonic can resume
+        timeout = max(0.0, awake_until - time.time()) if leaving else None
+        try:
+            event = events.get(timeout=timeout)
+        except queue.Empty:
+            event = None
+
+        if event is not None and event.present:
+            leaving = False
+            awake_until = event.time + config.PRESENCE_STAY_AWAKE
+            with state.lock:
+                woke = not state.system_active
+                state.system_active = True
+            if woke:
+                print(f"[ULTRASONIC] Person detected ({event.distance} cm). System ACTIVE.")
+                _notify_activity(True)
+        elif event is not None:
+            leaving = True
+
+        # Deactivate once the person left, the minimum awake time passed and no interaction is running
+        if leaving and time.time() >= awake_until:
+            with state.lock:
+                busy = state.interaction_in_progress
+                if not busy:
+                    state.system_active = False
+            if busy:
+                awake_until = time.time() + 1.0
+            else:
+                leaving = False
+                print("[ULTRASONIC] System DEACTIVATED.")
+                _notify_activity(False)
+
+class Door:
+    """
+    Door servo lock driven by deadlines on state.timer_scheduler instead of a thread
+    sleeping through DOOR_OPEN_SECONDS.
+
+    unlock() turns the servo open and schedules the stop signal and the
+    lock-back, then returns. Unlocking again while the door is open pushes
+    the lock-back deadline out instead of queueing another cycle; unlocking
+    while it is locking back turns it open again. While the door moves or
+    stands open state.door_idle is cleared (pauses presence sampling).
+    """
+
+    LOCKED, OPEN, LOCKING = "locked", "open", "locking"
+    UNLOCK_DUTY = 9.3       # 90 degrees (vertical)
+    LOCK_DUTY = 4.3         # 0 degrees (horizontal)
+    MOVE_SECONDS = 0.5      # Time the servo needs to turn before its signal is cut
+
+    def __init__(self, servo, timers, open_seconds):
+        self.servo = servo
+        self.timers = timers
+        self.open_seconds = open_seconds
+        self.state = self.LOCKED
+        self.lock = threading.Lock()
+        self.cycles = 0
+        self.extended = 0
+        self.listeners = []             # callback(state, timestamp) on unlock ("open"/"extended") and lock
+        self._signal_off = None
+        self._lock_back = None
+
+    def start(self):
+        """Ensures the door is locked at start."""
+        with self.lock:
+            self._move(self.LOCK_DUTY, self._settled)
+            self.state = self.LOCKING
+
+    def unlock(self, seconds=None):
+        seconds = self.open_seconds if seconds is None else seconds
+        with self.lock:
+            if self.state == self.OPEN:
+                moved = self.timers.reschedule(self._lock_back, seconds)
+                if moved is not None:
+                    self._lock_back = moved
+                    self.extended += 1
+                    print(f"[SERVO] Door already open, locking in {seconds} seconds.")
+                    tracing.instant("door.extend", seconds=seconds)
+                    self._notify("extended")
+                    return
+            print(f"[SERVO] Unlocking door for {seconds} seconds...")
+            tracing.instant("door.unlock", seconds=seconds)
+            self.cycles += 1
+            self.state = self.OPEN
+            with state.lock:
+                state.door_operation_active = True
+            state.door_idle.clear()
+            self._move(self.UNLOCK_DUTY)
+            self.timers.cancel(self._lock_back)
+            self._lock_back = self.timers.call_later(seconds, self._lock_back_now)
+            self._notify("open")
+
+    def _move(self, duty, then=None):
+        # Caller holds self.lock. Stop signal after the move prevents vibration while waiting.
+        self.timers.cancel(self._signal_off)
+        self.servo.set_duty(duty)
+        self._signal_off = self.timers.call_later(self.MOVE_SECONDS, self._signal_off_now, then)
+
+    def _signal_off_now(self, then):
+        with self.lock:
+            self.servo.set_duty(0)
+            if then is not None:
+                then()
+
+    def _lock_back_now(self):
+        with self.lock:
+            if self.state != self.OPEN:
+                return
+            print("[SERVO] Locking door.")
+            self.state = self.LOCKING
+            self._move(self.LOCK_DUTY, self._settled)
+            self._notify("locked")
+
+    def _settled(self):
+        # Caller holds self.lock; the door is locked, presence sampling can resume
+        if self.state != self.LOCKING:
+            return
+        self.state = self.LOCKED
         with state.lock:
             state.door_operation_active = False
-        
-        # Reset the event flag
-        state.unlock_event.clear()
\ No newline at end of file
+        state.door_idle.set()
+
+    def _notify(self, what):
+        now = time.time()
+        for callback in self.listeners:
+            try:
+                callback(what, now)
+            except Exception as e:
+                print(f"[SERVO] Door listener failed: {e}")
+
+door = Door(servo, state.timer_scheduler, config.DOOR_OPEN_SECONDS)
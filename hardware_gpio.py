@@ -0,0 +1,83 @@
+import time
+import threading
+import RPi.GPIO as GPIO
+from mfrc522 import SimpleMFRC522
+
+import config
+
+class Ultrasonic:
+    """
+    HC-SR04 on config.TRIG / config.ECHO, timed with edge interrupts.
+
+    measure() sends the trigger pulse and then sleeps on an Event; the
+    GPIO edge callback stamps the rising and falling edge of the echo and
+    wakes it up. No busy-waiting on GPIO.input().
+    """
+
+    ECHO_TIMEOUT = 0.05     # ~8.5 m round trip, far beyond the sensor's range
+
+    def __init__(self):
+        self._rise = None
+        self._pulse = None
+        self._done = threading.Event()
+        GPIO.add_event_detect(config.ECHO, GPIO.BOTH, callback=self._edge)
+
+    def _edge(self, channel):
+        now = time.perf_counter()
+        if GPIO.input(config.ECHO):
+            self._rise = now
+        elif self._rise is not None:
+            self._pulse = now - self._rise
+            self._rise = None
+            self._done.set()
+
+    def measure(self):
+        """Distance in cm, or None when the echo never arrived."""
+        self._rise = self._pulse = None
+        self._done.clear()
+
+        GPIO.output(config.TRIG, True)
+        time.sleep(0.00001)
+        GPIO.output(config.TRIG, False)
+
+        if not self._done.wait(self.ECHO_TIMEOUT):
+            return None
+        return round(self._pulse * 17150, 1)
+
+class BreakSwitch:
+    def is_pressed(self):
+        return GPIO.input(config.BREAK_SWITCH_PIN) == GPIO.HIGH
+
+class Servo:
+    def __init__(self):
+        # Set PWM to 50Hz (Standard for Servos)
+        self.pwm = GPIO.PWM(config.SERVO_PIN, 50)
+        self.pwm.start(0) # Start with 0 duty cycle (motor off)
+
+    def set_duty(self, duty):
+        self.pwm.ChangeDutyCycle(duty)
+
+    def stop(self):
+        self.pwm.stop()
+
+def create():
+    """Configures the pins and returns (ultrasonic, reader, break_switch, servo)."""
+    GPIO.setwarnings(False)
+    GPIO.cleanup()
+    GPIO.setmode(GPIO.BCM)
+
+    # Ultrasonic pins
+    GPIO.setup(config.TRIG, GPIO.OUT)
+    GPIO.setup(config.ECHO, GPIO.IN)
+    GPIO.output(config.TRIG, False)
+
+    # Break switch
+    GPIO.setup(config.BREAK_SWITCH_PIN, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+
+    # Servo
+    GPIO.setup(config.SERVO_PIN, GPIO.OUT)
+
+    return Ultrasonic(), SimpleMFRC522(), BreakSwitch(), Servo()
+
+def cleanup():
+    GPIO.cleanup()
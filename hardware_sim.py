@@ -0,0 +1,73 @@
+import time
+import threading
+import collections
+
+class Ultrasonic:
+    """Distance is whatever the test sets (None = no echo); measure() takes as long as the real echo."""
+
+    def __init__(self, distance=200.0):
+        self.distance = distance
+        self.measurements = 0
+
+    def measure(self):
+        self.measurements += 1
+        distance = self.distance
+        time.sleep((distance if distance is not None else 850.0) / 17150)
+        return distance
+
+class RFIDReader:
+    """SimpleMFRC522 stand-in: tap() queues a card, read_no_block() hands it to the app."""
+
+    def __init__(self):
+        self._taps = collections.deque()
+        self._lock = threading.Lock()
+        self.reads = 0
+
+    def tap(self, card_id, text=""):
+        with self._lock:
+            self._taps.append((int(card_id), text))
+
+    def read_no_block(self):
+        with self._lock:
+            self.reads += 1
+            if not self._taps:
+                return None, None
+            return self._taps.popleft()
+
+    def read(self):
+        while True:
+            card_id, text = self.read_no_block()
+            if card_id:
+                return card_id, text
+            time.sleep(0.05)
+
+class BreakSwitch:
+    def __init__(self):
+        self.pressed = False
+
+    def is_pressed(self):
+        return self.pressed
+
+class Servo:
+    """Records duty-cycle changes; listeners(duty, timestamp) see every change."""
+
+    def __init__(self):
+        self.duty = 0
+        self.history = collections.deque(maxlen=1000)
+        self.listeners = []
+
+    def set_duty(self, duty):
+        now = time.time()
+        self.duty = duty
+        self.history.append((now, duty))
+        for listener in self.listeners:
+            listener(duty, now)
+
+    def stop(self):
+        self.set_duty(0)
+
+def create():
+    return Ultrasonic(), RFIDReader(), BreakSwitch(), Servo()
+
+def cleanup():
+    pass
@@ -0,0 +1,185 @@
+import os
+import sys
+import time
+import threading
+import traceback
+import collections
+
+import config
+
+# Opt-in lock contention profiling. lock(name) hands out a plain
+# threading lock unless config.LOCK_PROFILING is on; then it returns a
+# ProfiledLock that records, per acquiring call site, how long threads
+# waited for the lock and how long they held it.
+
+_SKIP_FILES = {os.path.abspath(__file__), os.path.abspath(threading.__file__)}
+
+_locks = []
+_long_holds = collections.deque(maxlen=config.LOCK_LONG_HOLD_KEEP)
+
+def _caller_frame():
+    """First frame outside this module and threading."""
+    frame = sys._getframe(1)
+    while frame is not None and os.path.abspath(frame.f_code.co_filename) in _SKIP_FILES:
+        frame = frame.f_back
+    return frame
+
+def _call_site():
+    """file:line function of the code that took the lock."""
+    frame = _caller_frame()
+    if frame is None:
+        return "?"
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+
+def _percentiles_ms(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    values = sorted(values)
+    pick = lambda q: round(values[int(q * (len(values) - 1))] * 1000, 3)
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": pick(1.0)}
+
+class SiteStats:
+    __slots__ = ("count", "contended", "wait_total", "hold_total", "waits", "holds")
+
+    def __init__(self, history):
+        self.count = 0
+        self.contended = 0
+        self.wait_total = 0.0
+        self.hold_total = 0.0
+        self.waits = collections.deque(maxlen=history)
+        self.holds = collections.deque(maxlen=history)
+
+    def as_dict(self):
+        return {"count": self.count, "contended": self.contended,
+                "wait_ms_total": round(self.wait_total * 1000, 3), "hold_ms_total": round(self.hold_total * 1000, 3),
+                "wait_ms": _percentiles_ms(self.waits), "hold_ms": _percentiles_ms(self.holds)}
+
+class ProfiledLock:
+    """
+    threading.Lock / RLock stand-in that times waits and holds.
+
+    The acquiring call site is the first caller frame outside this module
+    and threading, so `with lock:` and Condition(lock).wait() are both
+    attributed to the code that asked for the lock. A hold longer than
+    long_hold seconds is logged together with the holder's stack at release.
+    """
+
+    def __init__(self, name, inner, long_hold, history=512):
+        self.name = name
+        self._inner = inner
+        self.long_hold = long_hold
+        self.history = history
+        self._stats = {}                # call site -> SiteStats
+        self._stats_lock = threading.Lock()
+        self._owner = None
+        self._depth = 0
+        self._held_since = 0.0
+        self._held_site = None
+
+    def acquire(self, blocking=True, timeout=-1):
+        started = time.perf_counter()
+        acquired = self._inner.acquire(blocking, timeout)
+        if not acquired:
+            return False
+        now = time.perf_counter()
+        self._depth += 1
+        if self._depth == 1:        # Outermost acquire of an RLock, or a Lock
+            self._owner = threading.get_ident()
+            self._held_since = now
+            self._held_site = site = _call_site()
+            wait = now - started
+            with self._stats_lock:
+                stats = self._stats.get(site)
+                if stats is None:
+                    stats = self._stats[site] = SiteStats(self.history)
+                stats.count += 1
+                stats.wait_total += wait
+                stats.waits.append(wait)
+                if wait > 0.001:
+                    stats.contended += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            hold = time.perf_counter() - self._held_since
+            site = self._held_site
+            self._owner = None
+            long_hold = hold > self.long_hold
+            stack = traceback.format_stack(_caller_frame(), limit=12) if long_hold else None
+            self._inner.release()
+            with self._stats_lock:
+                stats = self._stats[site]
+                stats.hold_total += hold
+                stats.holds.append(hold)
+            if long_hold:
+                _long_holds.append({"lock": self.name, "site": site, "hold_ms": round(hold * 1000, 3),
+                                    "time": time.time(), "stack": "".join(stack)})
+                print(f"[LOCKS] {self.name} held {hold * 1000:.0f} ms by {site}")
+        else:
+            self._inner.release()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def locked(self):
+        return self._depth > 0
+
+    def _is_owned(self):
+        # Used by threading.Condition
+        return self._owner == threading.get_ident()
+
+    def summary(self):
+        with self._stats_lock:
+            sites = {site: stats.as_dict() for site, stats in self._stats.items()}
+        ordered = sorted(sites.items(), key=lambda kv: kv[1]["wait_ms_total"] + kv[1]["hold_ms_total"], reverse=True)
+        return {
+            "acquisitions": sum(s["count"] for s in sites.values()),
+            "contended": sum(s["contended"] for s in sites.values()),
+            "wait_ms_total": round(sum(s["wait_ms_total"] for s in sites.values()), 3),
+            "hold_ms_total": round(sum(s["hold_ms_total"] for s in sites.values()), 3),
+            "sites": dict(ordered),
+        }
+
+def lock(name, factory=threading.Lock):
+    """A new lock; a ProfiledLock around it when config.LOCK_PROFILING is on."""
+    if not config.LOCK_PROFILING:
+        return factory()
+    profiled = ProfiledLock(name, factory(), config.LOCK_LONG_HOLD_MS / 1000.0)
+    _locks.append(profiled)
+    return profiled
+
+def summary():
+    """Per-lock, per-call-site wait/hold summaries plus the recent long holds."""
+    return {
+        "enabled": config.LOCK_PROFILING,
+        "long_hold_ms": config.LOCK_LONG_HOLD_MS,
+        "locks": {profiled.name: profiled.summary() for profiled in _locks},
+        "long_holds": list(_long_holds),
+    }
+
+def format_summary(top=5):
+    lines = []
+    for profiled in _locks:
+        s = profiled.summary()
+        lines.append(f"[LOCKS] {profiled.name}: {s['acquisitions']} acquisitions, {s['contended']} contended, "
+                     f"waited {s['wait_ms_total']:.0f} ms, held {s['hold_ms_total']:.0f} ms")
+        for site, stats in list(s["sites"].items())[:top]:
+            lines.append(f"[LOCKS]   {site}: n={stats['count']} wait p95 {stats['wait_ms']['p95']} ms "
+                         f"max {stats['wait_ms']['max']} ms, hold p95 {stats['hold_ms']['p95']} ms "
+                         f"max {stats['hold_ms']['max']} ms")
+    return "\n".join(lines)
+
+def _dump_loop(interval):
+    while True:
+        time.sleep(interval)
+        if _locks:
+            print(format_summary(), flush=True)
+
+def start_dump(interval=None):
+    """Prints the summary every `interval` seconds (config.LOCK_DUMP_INTERVAL; 0 = never)."""
+    interval = config.LOCK_DUMP_INTERVAL if interval is None else interval
+    if config.LOCK_PROFILING and interval > 0:
+        threading.Thread(target=_dump_loop, args=(interval,), daemon=True).start()
@@ -0,0 +1,211 @@
+import math
+import time
+import bisect
+import threading
+
+import config
+
+# Instrumentation surface: counters, gauges and histograms rendered in the
+# Prometheus text format on app's /metrics route. Updates are a dict lookup,
+# a lock and an add, so they can sit on per-frame paths. With ENABLED off
+# every update returns immediately.
+ENABLED = config.METRICS_ENABLED
+
+# Seconds, from sub-millisecond storage writes to a full face verification
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = {}          # name -> metric, in registration order
+_registry_lock = threading.Lock()
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return repr(value)
+    return str(value)
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+class _Value:
+    __slots__ = ("lock", "value")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1.0):
+        if not ENABLED:
+            return
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+    def set(self, value):
+        if ENABLED:
+            self.value = value
+
+class _HistogramValue:
+    __slots__ = ("lock", "bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.lock = threading.Lock()
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)     # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        if not ENABLED:
+            return
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Context manager observing the seconds spent in its block."""
+        return _Timer(self)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.sum, self.count
+
+class _Timer:
+    __slots__ = ("target", "started")
+
+    def __init__(self, target):
+        self.target = target
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.target.observe(time.perf_counter() - self.started)
+        return False
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        self._default = None if self.labelnames else self.labels()
+
+    def labels(self, *values):
+        """Child for one combination of label values (created on first use)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        return _Value()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1.0):
+        self._default.inc(amount)
+
+class Gauge(_Metric):
+    """Set by the code, or read from fn() at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), fn=None):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def set(self, value):
+        self._default.set(value)
+
+    def inc(self, amount=1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount=1.0):
+        self._default.dec(amount)
+
+    def render(self):
+        if self.fn is not None:
+            try:
+                self._default.value = self.fn()
+            except Exception as e:
+                print(f"[METRICS] {self.name} failed: {e}")
+        return super().render()
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.bounds)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            counts, total, count = child.snapshot()
+            cumulative = 0
+            for bound, n in zip(self.bounds + (math.inf,), counts):
+                cumulative += n
+                le = _format_labels(self.labelnames, values, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+def _register(cls, name, *args, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} already registered as a {metric.kind}")
+        return metric
+
+def counter(name, help, labelnames=()):
+    return _register(Counter, name, help, labelnames)
+
+def gauge(name, help, labelnames=(), fn=None):
+    return _register(Gauge, name, help, labelnames, fn=fn)
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram, name, help, labelnames, buckets=buckets)
+
+def render():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import secrets
+import sqlite3
+import threading
+import urllib.request
+
+SQL_SCHEMA = "CREATE TABLE IF NOT EXISTS outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, payload TEXT NOT NULL)"
+SQL_INSERT = "INSERT INTO outbox (key, payload) VALUES (?, ?)"
+SQL_BATCH = "SELECT id, key, payload FROM outbox ORDER BY id LIMIT ?"
+SQL_DELETE_UPTO = "DELETE FROM outbox WHERE id <= ?"
+SQL_COUNT = "SELECT COUNT(*) FROM outbox"
+SQL_META_SCHEMA = "CREATE TABLE IF NOT EXISTS outbox_meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)"
+SQL_META_GET = "SELECT value FROM outbox_meta WHERE name = ?"
+SQL_META_SET = "INSERT OR REPLACE INTO outbox_meta (name, value) VALUES (?, ?)"
+
+# --- TRANSPORTS ---
+# A transport has send_batch([(key, record), ...]) which either delivers the
+# whole batch or raises. Keys are chronological, so the receiver can keep order.
+
+class FileTransport:
+    """Appends each delivered record as a JSON line (tests / benchmarks / offline)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send_batch(self, items):
+        with open(self.path, "a") as f:
+            for key, record in items:
+                f.write(json.dumps({"key": key, "record": record}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+class HTTPTransport:
+    """POSTs {key: record, ...} as one JSON body; any 2xx counts as delivered."""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def send_batch(self, items):
+        body = json.dumps({key: record for key, record in items}).encode()
+        req = urllib.request.Request(self.url, data=body, method="POST", headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            if not 200 <= resp.status < 300:
+                raise IOError(f"HTTP {resp.status}")
+
+# --- OUTBOX ---
+class Outbox:
+    """
+    Durable FIFO of records waiting to be sent to the cloud.
+
+    put() is a local SQLite insert, so callers (holding state.lock) never
+    wait on the network. A background sender ships records in id order,
+    batch_size at a time, and only deletes them once the transport accepted
+    the batch. Failures are retried with exponential backoff.
+
+    Keys work like Firebase push ids: a millisecond timestamp prefix keeps
+    them chronological, then this kiosk's terminal id (random, persisted in
+    the outbox database) and a random suffix keep two kiosks - or one whose
+    clock went back after a reboot - from writing over each other's records.
+    """
+
+    def __init__(self, path, transport, batch_size=25, base_backoff=1.0, max_backoff=300.0, terminal_id=None):
+        self.transport = transport
+        self.batch_size = batch_size
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(SQL_SCHEMA)
+        self.conn.execute(SQL_META_SCHEMA)
+        self.conn.commit()
+        self.terminal_id = terminal_id or self._load_terminal_id()
+        self._seq = 0
+        self._thread = None
+        self.sent = 0
+        self.failures = 0
+        self.last_error = None
+
+    def _load_terminal_id(self):
+        row = self.conn.execute(SQL_META_GET, ("terminal_id",)).fetchone()
+        if row:
+            return row[0]
+        terminal_id = secrets.token_hex(4)
+        with self.conn:
+            self.conn.execute(SQL_META_SET, ("terminal_id", terminal_id))
+        return terminal_id
+
+    def _make_key(self):
+        # <ms timestamp>-<terminal>-<seq><random>: chronological, and unique across kiosks and reboots
+        self._seq = (self._seq + 1) % 1000000
+        return f"{int(time.time() * 1000):013d}-{self.terminal_id}-{self._seq:06d}{secrets.token_hex(4)}"
+
+    def put(self, record):
+        with self.lock:
+            key = self._make_key()
+            with self.conn:
+                self.conn.execute(SQL_INSERT, (key, json.dumps(record)))
+            self.wakeup.notify()
+        return key
+
+    def pending(self):
+        with self.lock:
+            return self.conn.execute(SQL_COUNT).fetchone()[0]
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def flush(self, timeout=None):
+        """Blocks until the outbox is empty (or timeout). Returns True when drained."""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.pending():
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _next_batch(self):
+        with self.lock:
+            while True:
+                rows = self.conn.execute(SQL_BATCH, (self.batch_size,)).fetchall()
+                if rows:
+                    return rows
+                self.wakeup.wait()
+
+    def _run(self):
+        backoff = self.base_backoff
+        while True:
+            rows = self._next_batch()
+            items = [(key, json.loads(payload)) for _, key, payload in rows]
+            try:
+                self.transport.send_batch(items)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"⚠️ [OUTBOX] Send failed ({len(items)} pending in batch), retry in {backoff:.0f}s: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+
+            backoff = self.base_backoff
+            with self.lock:
+                with self.conn:
+                    self.conn.execute(SQL_DELETE_UPTO, (rows[-1][0],))
+            self.sent += len(items)
@@ -0,0 +1,92 @@
+import time
+import threading
+import statistics
+import collections
+
+class PresenceEvent:
+    __slots__ = ("present", "distance", "time")
+
+    def __init__(self, present, distance, when):
+        self.present = present
+        self.distance = distance
+        self.time = when
+
+    def __repr__(self):
+        return f"PresenceEvent(present={self.present}, distance={self.distance}, time={self.time:.3f})"
+
+class PresenceMonitor:
+    """
+    Samples a distance sensor at a fixed rate and turns it into presence events.
+
+    Each reading goes into a sliding window; the median of the window is
+    compared against two thresholds (hysteresis): someone arrives when it
+    drops below near_cm and leaves only when it rises above far_cm, so a
+    single bad echo or someone swaying at the boundary does not toggle the
+    kiosk. Subscribers get a PresenceEvent on every change.
+
+    While `gate` (a threading.Event) is cleared, e.g. while the door servo is
+    moving, sampling pauses without holding any lock or spinning.
+    """
+
+    def __init__(self, sensor, rate_hz=5.0, window=5, near_cm=30.0, far_cm=45.0, gate=None):
+        if far_cm < near_cm:
+            raise ValueError("far_cm must be >= near_cm")
+        self.sensor = sensor
+        self.period = 1.0 / rate_hz
+        self.near_cm = near_cm
+        self.far_cm = far_cm
+        self.gate = gate
+        self.readings = collections.deque(maxlen=window)
+        self.present = False
+        self.distance = None        # current median
+        self.samples = 0
+        self.timeouts = 0
+        self._subscribers = []
+        self._stop = threading.Event()
+
+    def subscribe(self, callback):
+        """callback(PresenceEvent) is called from the sampling thread on every change."""
+        self._subscribers.append(callback)
+
+    def stop(self):
+        self._stop.set()
+
+    def update(self, distance, now=None):
+        """Feeds one reading (None = no echo). Returns the PresenceEvent if presence changed."""
+        now = time.time() if now is None else now
+        self.samples += 1
+        if distance is None:
+            self.timeouts += 1
+            return None
+        self.readings.append(distance)
+        self.distance = statistics.median(self.readings)
+
+        if not self.present and self.distance < self.near_cm:
+            self.present = True
+        elif self.present and self.distance > self.far_cm:
+            self.present = False
+        else:
+            return None
+
+        event = PresenceEvent(self.present, self.distance, now)
+        for callback in self._subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"[PRESENCE] Subscriber failed: {e}")
+        return event
+
+    def run(self):
+        """Sampling loop (blocks; run it in its own thread)."""
+        next_due = time.monotonic()
+        while not self._stop.is_set():
+            if self.gate is not None and not self.gate.is_set():
+                self.gate.wait()
+                next_due = time.monotonic()
+            self.update(self.sensor.measure())
+            next_due += self.period
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                next_due = time.monotonic()     # fell behind: don't burst to catch up
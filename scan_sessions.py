@@ -0,0 +1,134 @@
+import time
+import itertools
+import threading
+import collections
+
+# Session states
+QUEUED = "queued"               # Waiting for the camera
+VERIFYING = "verifying"         # Face check running
+AWAITING_ACTION = "awaiting_action"   # Break/Leave prompt shown
+DONE = "done"
+
+# How a session was served
+CAMERA = "camera"
+FAST = "fast"
+
+class ScanSession:
+    __slots__ = ("id", "card_id", "path", "state", "tapped_at", "started_at", "finished_at", "outcome")
+
+    def __init__(self, sid, card_id, path, tapped_at):
+        self.id = sid
+        self.card_id = card_id
+        self.path = path
+        self.state = QUEUED
+        self.tapped_at = tapped_at
+        self.started_at = None
+        self.finished_at = None
+        self.outcome = None
+
+    @property
+    def queue_wait(self):
+        return None if self.started_at is None else self.started_at - self.tapped_at
+
+    def as_dict(self):
+        return {"id": self.id, "card_id": self.card_id, "path": self.path, "state": self.state,
+                "tapped_at": self.tapped_at, "queue_wait": self.queue_wait, "outcome": self.outcome}
+
+class ScanScheduler:
+    """
+    Open scan sessions, one per card.
+
+    There is one camera, so face verifications run one at a time in tap
+    order; later taps wait in a FIFO instead of being dropped. Taps that
+    need no camera (see fast_path) are served immediately, next to a
+    running verification. Queue wait (tap -> verification start) of the
+    last `history` camera sessions is kept for stats().
+    """
+
+    def __init__(self, fast_path=None, history=256):
+        self.fast_path = fast_path or (lambda card_id: False)
+        self.lock = threading.Lock()
+        self.sessions = {}          # card_id -> open ScanSession
+        self.queue = collections.deque()
+        self.current = None         # Session on the camera
+        self._ids = itertools.count(1)
+        self.waits = collections.deque(maxlen=history)
+        self.counts = collections.Counter()
+
+    def submit(self, card_id, tapped_at=None):
+        """New session for a tap, or None when that card already has one open."""
+        with self.lock:
+            if card_id in self.sessions:
+                self.counts["duplicate"] += 1
+                return None
+            path = FAST if self.fast_path(card_id) else CAMERA
+            session = ScanSession(next(self._ids), card_id, path, tapped_at or time.time())
+            self.sessions[card_id] = session
+            self.counts[path] += 1
+            if path == FAST:
+                self._start(session, AWAITING_ACTION)
+            else:
+                self.queue.append(session)
+            return session
+
+    def next_for_camera(self):
+        """Moves the oldest queued session onto the camera, if the camera is free."""
+        with self.lock:
+            if self.current is not None or not self.queue:
+                return None
+            session = self.queue.popleft()
+            self.current = session
+            self._start(session, VERIFYING)
+            return session
+
+    def _start(self, session, state):
+        session.state = state
+        session.started_at = time.time()
+        if session.path == CAMERA:
+            self.waits.append(session.queue_wait)
+
+    def awaiting_action(self, card_id):
+        """Verification done, the user now chooses Break/Leave; frees the camera."""
+        with self.lock:
+            session = self.sessions.get(card_id)
+            if session is None:
+                return None
+            if session is self.current:
+                self.current = None
+            session.state = AWAITING_ACTION
+            return session
+
+    def finish(self, card_id, outcome):
+        with self.lock:
+            session = self.sessions.pop(card_id, None)
+            if session is None:
+                return None
+            if session is self.current:
+                self.current = None
+            session.state = DONE
+            session.outcome = outcome
+            session.finished_at = time.time()
+            self.counts[outcome] += 1
+            return session
+
+    def get(self, card_id):
+        with self.lock:
+            return self.sessions.get(card_id)
+
+    @property
+    def waiting(self):
+        return len(self.queue)
+
+    @property
+    def idle(self):
+        with self.lock:
+            return not self.sessions
+
+    def stats(self):
+        with self.lock:
+            waits = sorted(self.waits)
+            open_sessions = [s.as_dict() for s in self.sessions.values()]
+            counts = dict(self.counts)
+        pick = lambda q: round(waits[int(q * (len(waits) - 1))], 3) if waits else None
+        return {"open": open_sessions, "queued": len(self.queue), "counts": counts,
+                "queue_wait_p50": pick(0.5), "queue_wait_p95": pick(0.95), "queue_wait_max": pick(1.0)}
@@ -1,5 +1,8 @@
 import threading
 
+import lockprof
+from timers import TimerScheduler
+
 # Active entries in RAM: card_text -> dict (entry, name, on_break, etc.)
 scan1 = {} 
 
@@ -14,7 +17,11 @@ interaction_in_progress = False
 door_operation_active = False
 
 # Threading lock
-lock = threading.Lock()
+lock = lockprof.lock("state.lock")
+
+# One thread for every deadline: UI resets, interaction timeouts, door lock-back
+timer_scheduler = TimerScheduler()
 
-# Event to signal the Servo Thread to unlock
-unlock_event = threading.Event()
\ No newline at end of file
+# Set while the door servo is idle; presence sampling waits on it instead of polling
+door_idle = threading.Event()
+door_idle.set()
@@ -1,8 +1,15 @@
 import os
 import json
+import zlib
+import time
+import atexit
+import threading
 from datetime import datetime
 import config
 import state
+import metrics
+import lockprof
+import tracing
 
 def _serialize_scan_entry(entry_dict):
     d = {
@@ -31,46 +38,165 @@ def _deserialize_scan_entry(s):
     }
     return entry
 
-def load_active_scans():
-    if not os.path.exists(config.ACTIVE_FILE):
-        return
+# --- ACTIVE SCANS: SNAPSHOT + APPEND-ONLY JOURNAL ---
+# ACTIVE_FILE is a periodic snapshot; every check-in/break/leave in between
+# is one appended journal line "<crc32> <json>". Recovery = snapshot + tail.
+_journal_lock = lockprof.lock("storage.journal")
+_journal_file = None
+_journal_records = 0          # records since the last snapshot
+_journal_unsynced = False
+_last_fsync = 0.0
+_flusher_started = False
 
-    print("[RECOVERY] Loading active scans...")
-    with open(config.ACTIVE_FILE, "r") as f:
-        for line in f:
-            try:
-                line = line.strip()
-                if not line: continue
-                
-                parts = line.split(" | ")
-                
-                # Format: Name | UID | JSON_Payload
-                if len(parts) == 3:
-                    name_display, card, payload = parts
-                    entry_dict = _deserialize_scan_entry(payload)
-                    entry_dict["name"] = name_display 
-                
-                # Legacy Format: UID | JSON_Payload
-                elif len(parts) == 2:
-                    card, payload = parts
-                    entry_dict = _deserialize_scan_entry(payload)
-                else:
+def _parse_snapshot_line(line):
+    parts = line.split(" | ")
+
+    # Format: Name | UID | JSON_Payload
+    if len(parts) == 3:
+        name_display, card, payload = parts
+        entry_dict = _deserialize_scan_entry(payload)
+        entry_dict["name"] = name_display
+
+    # Legacy Format: UID | JSON_Payload
+    elif len(parts) == 2:
+        card, payload = parts
+        entry_dict = _deserialize_scan_entry(payload)
+    else:
+        return None, None
+    return card, entry_dict
+
+def _encode_journal_record(record):
+    body = json.dumps(record, separators=(",", ":"))
+    return f"{zlib.crc32(body.encode()):08x} {body}\n"
+
+def _decode_journal_line(raw):
+    """Returns the record, or None for a torn/corrupt line."""
+    if not raw.endswith(b"\n"):
+        return None
+    try:
+        crc, body = raw[:-1].split(b" ", 1)
+        if int(crc, 16) != zlib.crc32(body):
+            return None
+        return json.loads(body)
+    except ValueError:
+        return None
+
+def _replay_journal(target, path):
+    """Applies journal records to target; truncates a torn tail."""
+    if not os.path.exists(path):
+        return 0
+
+    applied = 0
+    good_offset = 0
+    with open(path, "rb") as f:
+        for raw in f:
+            record = _decode_journal_line(raw)
+            if record is None:
+                print(f"[RECOVERY] Torn journal record at byte {good_offset}, discarding tail.")
+                break
+            card = record.get("card")
+            if record.get("op") == "put":
+                target[card] = _deserialize_scan_entry(record["payload"])
+            elif record.get("op") == "del":
+                target.pop(card, None)
+            good_offset += len(raw)
+            applied += 1
+
+    if good_offset != os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(good_offset)
+    return applied
+
+def load_text_active_scans(target, snapshot_file=None, journal_file=None):
+    """Snapshot + journal replay into target. Returns the number of journal records applied."""
+    snapshot_file = snapshot_file or config.ACTIVE_FILE
+    journal_file = journal_file or config.ACTIVE_JOURNAL_FILE
+    if os.path.exists(snapshot_file):
+        print("[RECOVERY] Loading active scans...")
+        with open(snapshot_file, "r") as f:
+            for line in f:
+                try:
+                    line = line.strip()
+                    if not line: continue
+
+                    card, entry_dict = _parse_snapshot_line(line)
+                    if card is None: continue
+                    target[card] = entry_dict
+                except Exception as e:
+                    print(f"[RECOVERY] Skipped invalid line: {line} ({e})")
                     continue
 
-                state.scan1[card] = entry_dict
-                print(f"  -> Restored: {entry_dict['name']} (ID: {card})")
-            except Exception as e:
-                print(f"[RECOVERY] Skipped invalid line: {line} ({e})")
-                continue
+    applied = _replay_journal(target, journal_file)
+    if applied:
+        print(f"[RECOVERY] Replayed {applied} journal record(s).")
+    return applied
 
 def save_active_scans_file():
-    with open(config.ACTIVE_FILE, "w") as f:
+    """Atomically writes the full snapshot of state.scan1 (caller holds state.lock)."""
+    tmp = config.ACTIVE_FILE + ".tmp"
+    with open(tmp, "w") as f:
         for card, entry in state.scan1.items():
             payload = _serialize_scan_entry(entry)
             name_display = entry.get("name", "Unknown")
             f.write(f"{name_display} | {card} | {payload}\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, config.ACTIVE_FILE)
 
-def save_to_log(card_text, name, entry, exit_time, total_seconds, breaks, total_break_seconds):
+def compact_active_scans():
+    """Snapshot + empty journal. Replaying an old journal over a newer snapshot is harmless."""
+    global _journal_file, _journal_records, _journal_unsynced
+    with _journal_lock:
+        save_active_scans_file()
+        if _journal_file is not None:
+            _journal_file.close()
+            _journal_file = None
+        open(config.ACTIVE_JOURNAL_FILE, "w").close()
+        _journal_records = 0
+        _journal_unsynced = False
+
+def _fsync_journal():
+    global _journal_unsynced, _last_fsync
+    if _journal_file is not None and _journal_unsynced:
+        os.fsync(_journal_file.fileno())
+        _journal_unsynced = False
+    _last_fsync = time.time()
+
+def flush_journal():
+    with _journal_lock:
+        _fsync_journal()
+
+def _journal_flusher():
+    # Group commit: one fsync per interval covers every record written in it
+    while True:
+        time.sleep(config.JOURNAL_FSYNC_INTERVAL)
+        try:
+            flush_journal()
+        except OSError as e:
+            print(f"[JOURNAL] fsync failed: {e}")
+
+def _append_journal(record):
+    global _journal_file, _journal_records, _journal_unsynced, _flusher_started
+    with _journal_lock:
+        if _journal_file is None:
+            _journal_file = open(config.ACTIVE_JOURNAL_FILE, "a")
+        _journal_file.write(_encode_journal_record(record))
+        _journal_file.flush()
+        _journal_records += 1
+        _journal_unsynced = True
+        if time.time() - _last_fsync >= config.JOURNAL_FSYNC_INTERVAL:
+            _fsync_journal()
+        if not _flusher_started:
+            _flusher_started = True
+            threading.Thread(target=_journal_flusher, daemon=True).start()
+        due = _journal_records >= config.JOURNAL_COMPACT_EVERY
+    if due:
+        compact_active_scans()
+
+atexit.register(flush_journal)
+
+# --- ATTENDANCE LOG (TEXT) ---
+def _append_log_block(card_text, name, entry, exit_time, total_seconds, breaks, total_break_seconds):
     with open(config.LOG_FILE, "a") as f:
         f.write("========================================\n")
         f.write(f"Name: {name}\n")
@@ -86,40 +212,123 @@ def save_to_log(card_text, name, entry, exit_time, total_seconds, breaks, total_
                 f.write(f"  - {s.isoformat()} to {e.isoformat()} -> {dur} sec\n")
         f.write("\n")
 
-# [NEW FUNCTION HERE]
+def parse_log_blocks(path):
+    """
+    Yields one dict per completed session in the text log:
+    name, card_id, entry, exit (datetime or None), total_seconds,
+    total_break_seconds and breaks [(start, end)].
+    """
+    block = None
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("====="):
+                if block and block.get("name"):
+                    yield block
+                block = {"name": None, "card_id": None, "entry": None, "exit": None,
+                         "total_seconds": 0.0, "total_break_seconds": 0.0, "breaks": []}
+                continue
+            if block is None:
+                continue
+            try:
+                if line.startswith("Name: "):
+                    block["name"] = line.split(": ", 1)[1]
+                elif line.startswith("Card ID: "):
+                    block["card_id"] = line.split(": ", 1)[1]
+                elif line.startswith("Entry: "):
+                    block["entry"] = datetime.fromisoformat(line.split(": ", 1)[1])
+                elif line.startswith("Exit: "):
+                    block["exit"] = datetime.fromisoformat(line.split(": ", 1)[1])
+                elif line.startswith("Total time (net): "):
+                    # Line format: "Total time (net): 123.45 seconds"
+                    block["total_seconds"] = float(line.split(": ")[1].split(" ")[0])
+                elif line.startswith("Total breaks (seconds): "):
+                    block["total_break_seconds"] = float(line.split(": ")[1])
+                elif line.startswith("- ") and " to " in line:
+                    # Line format: "- <start> to <end> -> 12.3 sec"
+                    start, rest = line[2:].split(" to ", 1)
+                    end = rest.split(" -> ")[0]
+                    block["breaks"].append((datetime.fromisoformat(start), datetime.fromisoformat(end)))
+            except Exception:
+                continue
+    if block and block.get("name"):
+        yield block
+
+# --- BACKENDS ---
+class TextFileBackend:
+    """Default backend: attendance_log.txt blocks + active_scans snapshot/journal."""
+
+    def load_active(self, target):
+        applied = load_text_active_scans(target)
+        # Start from a fresh snapshot so the next recovery only reads new events
+        if applied:
+            compact_active_scans()
+
+    def put_active(self, card, entry):
+        _append_journal({"op": "put", "card": card, "payload": _serialize_scan_entry(entry)})
+
+    def remove_active(self, card):
+        _append_journal({"op": "del", "card": card})
+
+    def save_session(self, card_text, name, entry, exit_time, total_seconds, breaks, total_break_seconds):
+        _append_log_block(card_text, name, entry, exit_time, total_seconds, breaks, total_break_seconds)
+
+    def user_totals(self):
+        """name -> net seconds, or None if there is no log yet."""
+        if not os.path.exists(config.LOG_FILE):
+            return None
+        totals = {}
+        for block in parse_log_blocks(config.LOG_FILE):
+            totals[block["name"]] = totals.get(block["name"], 0.0) + block["total_seconds"]
+        return totals
+
+_backend = None
+
+def get_backend():
+    """Backend chosen by config.STORAGE_BACKEND ('text' or 'sqlite')."""
+    global _backend
+    if _backend is None:
+        if config.STORAGE_BACKEND == "sqlite":
+            import storage_sqlite
+            _backend = storage_sqlite.SQLiteBackend(config.SQLITE_DB_FILE)
+        else:
+            _backend = TextFileBackend()
+    return _backend
+
+# --- PUBLIC API (used by app.py) ---
+WRITE_SECONDS = metrics.histogram("storage_write_seconds", "Attendance storage writes (backend call)", ["op"])
+_PUT_ACTIVE = WRITE_SECONDS.labels("put_active")
+_REMOVE_ACTIVE = WRITE_SECONDS.labels("remove_active")
+_SAVE_SESSION = WRITE_SECONDS.labels("save_session")
+
+def load_active_scans():
+    get_backend().load_active(state.scan1)
+    for card, entry_dict in state.scan1.items():
+        print(f"  -> Restored: {entry_dict['name']} (ID: {card})")
+
+def record_scan_update(card):
+    """Persists the current state.scan1[card] (caller holds state.lock)."""
+    with _PUT_ACTIVE.time(), tracing.span("storage.put_active"):
+        get_backend().put_active(card, state.scan1[card])
+
+def record_scan_removed(card):
+    """Persists that card left (caller holds state.lock)."""
+    with _REMOVE_ACTIVE.time(), tracing.span("storage.remove_active"):
+        get_backend().remove_active(card)
+
+def save_to_log(card_text, name, entry, exit_time, total_seconds, breaks, total_break_seconds):
+    with _SAVE_SESSION.time(), tracing.span("storage.save_session"):
+        get_backend().save_session(card_text, name, entry, exit_time, total_seconds, breaks, total_break_seconds)
+
 def check_attendance_threshold(threshold_hours):
-    """Scans log file and prints validity report based on total hours."""
-    if not os.path.exists(config.LOG_FILE):
+    """Prints validity report based on total hours per user."""
+    user_totals = get_backend().user_totals()
+    if user_totals is None:
         print("❌ No attendance log found yet.")
         return
 
     print(f"\n--- ATTENDANCE REPORT (Threshold: {threshold_hours} hours) ---")
     threshold_seconds = float(threshold_hours) * 3600
-    user_totals = {}
-
-    current_name = None
-    
-    # Parse the log file
-    with open(config.LOG_FILE, "r") as f:
-        for line in f:
-            line = line.strip()
-            # Extract Name
-            if line.startswith("Name: "):
-                current_name = line.split(": ", 1)[1]
-                if current_name not in user_totals:
-                    user_totals[current_name] = 0.0
-            
-            # Extract Total Seconds and add to that user
-            elif line.startswith("Total time (net): "):
-                try:
-                    # Line format: "Total time (net): 123.45 seconds"
-                    # Split by ": " then take first part of remainder "123.45"
-                    val_str = line.split(": ")[1].split(" ")[0]
-                    seconds = float(val_str)
-                    if current_name:
-                        user_totals[current_name] += seconds
-                except Exception:
-                    continue
 
     # Print Validation Results
     if not user_totals:
@@ -132,4 +341,4 @@ def check_attendance_threshold(threshold_hours):
             # Using colors if supported, or just text
             print(f"- {name:<15}: {total_hours:.2f} hrs  ->  {status}")
             
-    print("------------------------------------------------------\n")
\ No newline at end of file
+    print("------------------------------------------------------\n")
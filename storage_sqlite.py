@@ -0,0 +1,165 @@
+"""
+SQLite storage backend (config.STORAGE_BACKEND = "sqlite").
+
+Completed sessions, their breaks and the currently active sessions live in
+indexed tables of one WAL-mode database. Every SQL statement is a module
+constant, so sqlite3's per-connection statement cache compiles each one
+once and reuses it.
+
+One-shot migration of the text files:
+    python storage_sqlite.py --db attendance.db --log attendance_log.txt --active active_scans.txt
+"""
+import os
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+import config
+import storage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id                  INTEGER PRIMARY KEY,
+    card_id             TEXT NOT NULL,
+    name                TEXT NOT NULL,
+    entry               TEXT NOT NULL,
+    exit                TEXT NOT NULL,
+    net_seconds         REAL NOT NULL,
+    break_seconds       REAL NOT NULL DEFAULT 0,
+    UNIQUE (card_id, entry)
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_name ON sessions (name);
+CREATE INDEX IF NOT EXISTS idx_sessions_entry ON sessions (entry);
+
+CREATE TABLE IF NOT EXISTS breaks (
+    session_id          INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    start               TEXT NOT NULL,
+    end                 TEXT NOT NULL,
+    seconds             REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_breaks_session ON breaks (session_id);
+
+CREATE TABLE IF NOT EXISTS active_sessions (
+    card_id             TEXT PRIMARY KEY,
+    name                TEXT NOT NULL,
+    payload             TEXT NOT NULL,
+    updated             TEXT NOT NULL
+);
+"""
+
+SQL_INSERT_SESSION = (
+    "INSERT OR IGNORE INTO sessions (card_id, name, entry, exit, net_seconds, break_seconds) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+SQL_INSERT_BREAK = "INSERT INTO breaks (session_id, start, end, seconds) VALUES (?, ?, ?, ?)"
+SQL_UPSERT_ACTIVE = "INSERT OR REPLACE INTO active_sessions (card_id, name, payload, updated) VALUES (?, ?, ?, ?)"
+SQL_DELETE_ACTIVE = "DELETE FROM active_sessions WHERE card_id = ?"
+SQL_SELECT_ACTIVE = "SELECT card_id, name, payload FROM active_sessions"
+SQL_USER_TOTALS = "SELECT name, SUM(net_seconds) FROM sessions GROUP BY name"
+
+class SQLiteBackend:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        # One connection shared by the hardware loop and Socket.IO threads, serialized by self.lock
+        self.conn = sqlite3.connect(path, check_same_thread=False, cached_statements=64)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # --- active sessions ---
+    def load_active(self, target):
+        with self.lock:
+            rows = self.conn.execute(SQL_SELECT_ACTIVE).fetchall()
+        if rows:
+            print("[RECOVERY] Loading active scans...")
+        for card, name, payload in rows:
+            try:
+                entry = storage._deserialize_scan_entry(payload)
+                entry["name"] = name
+                target[card] = entry
+            except Exception as e:
+                print(f"[RECOVERY] Skipped invalid row for {card} ({e})")
+
+    def put_active(self, card, entry):
+        row = (card, entry.get("name", "Unknown"), storage._serialize_scan_entry(entry), datetime.now().isoformat())
+        with self.lock, self.conn:
+            self.conn.execute(SQL_UPSERT_ACTIVE, row)
+
+    def remove_active(self, card):
+        with self.lock, self.conn:
+            self.conn.execute(SQL_DELETE_ACTIVE, (card,))
+
+    def put_active_many(self, entries):
+        """entries: {card: entry_dict} written in one transaction."""
+        now = datetime.now().isoformat()
+        rows = [(card, e.get("name", "Unknown"), storage._serialize_scan_entry(e), now) for card, e in entries.items()]
+        with self.lock, self.conn:
+            self.conn.executemany(SQL_UPSERT_ACTIVE, rows)
+
+    # --- completed sessions ---
+    def _insert_session(self, card_text, name, entry, exit_time, total_seconds, breaks, total_break_seconds):
+        cur = self.conn.execute(SQL_INSERT_SESSION, (
+            card_text, name, entry.isoformat(), exit_time.isoformat(), float(total_seconds), float(total_break_seconds),
+        ))
+        if cur.rowcount != 1:
+            return False   # Already stored (same card + entry)
+        if breaks:
+            self.conn.executemany(SQL_INSERT_BREAK, [
+                (cur.lastrowid, s.isoformat(), e.isoformat(), (e - s).total_seconds()) for (s, e) in breaks
+            ])
+        return True
+
+    def save_session(self, card_text, name, entry, exit_time, total_seconds, breaks, total_break_seconds):
+        with self.lock, self.conn:
+            self._insert_session(card_text, name, entry, exit_time, total_seconds, breaks, total_break_seconds)
+
+    def save_sessions(self, sessions):
+        """Batch insert of dicts shaped like storage.parse_log_blocks output. Returns rows added."""
+        added = 0
+        with self.lock, self.conn:
+            for s in sessions:
+                added += self._insert_session(
+                    s["card_id"] or "", s["name"], s["entry"], s["exit"],
+                    s["total_seconds"], s["breaks"], s["total_break_seconds"],
+                )
+        return added
+
+    def user_totals(self):
+        with self.lock:
+            return {name: total or 0.0 for name, total in self.conn.execute(SQL_USER_TOTALS)}
+
+def import_legacy_files(db_path, log_file, active_file, journal_file):
+    """Migrates attendance_log.txt and active_scans.txt (+ journal) into the database."""
+    backend = SQLiteBackend(db_path)
+    try:
+        sessions, skipped = [], 0
+        if os.path.exists(log_file):
+            for block in storage.parse_log_blocks(log_file):
+                if block["entry"] is None or block["exit"] is None:
+                    skipped += 1
+                    continue
+                sessions.append(block)
+        added = backend.save_sessions(sessions)
+        print(f"[IMPORT] Sessions: {added} added, {len(sessions) - added} already present, {skipped} incomplete.")
+
+        active = {}
+        storage.load_text_active_scans(active, active_file, journal_file)
+        backend.put_active_many(active)
+        print(f"[IMPORT] Active sessions: {len(active)} imported.")
+    finally:
+        backend.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import the text attendance files into SQLite.")
+    parser.add_argument("--db", default=config.SQLITE_DB_FILE)
+    parser.add_argument("--log", default=config.LOG_FILE)
+    parser.add_argument("--active", default=config.ACTIVE_FILE)
+    parser.add_argument("--journal", default=config.ACTIVE_JOURNAL_FILE)
+    args = parser.parse_args()
+    import_legacy_files(args.db, args.log, args.active, args.journal)
@@ -0,0 +1,203 @@
+import time
+import threading
+import cv2
+import numpy as np
+import metrics
+
+class FrameSlot:
+    """
+    Latest frame plus a version number.
+    publish() hands the array over: the publisher must not modify it
+    afterwards, so readers can use it without copying.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self.seq = 0
+
+    def publish(self, frame):
+        with self._cond:
+            self._frame = frame
+            self.seq += 1
+            self._cond.notify_all()
+
+    def get(self):
+        """Returns (seq, frame); frame is None until something was published."""
+        with self._cond:
+            return self.seq, self._frame
+
+    def clear(self):
+        with self._cond:
+            self._frame = None
+            self.seq += 1
+
+class OverlayPool:
+    """
+    A few reusable buffers for annotated frames. Each published overlay is a
+    copy into the next buffer in rotation, so drawing never touches the
+    camera ring and no frame is allocated per iteration.
+    """
+
+    def __init__(self, count=3):
+        self._buffers = [None] * count
+        self._next = 0
+
+    def next_copy(self, frame):
+        buf = self._buffers[self._next]
+        if buf is None or buf.shape != frame.shape:
+            buf = self._buffers[self._next] = frame.copy()
+        else:
+            np.copyto(buf, frame)
+        self._next = (self._next + 1) % len(self._buffers)
+        return buf
+
+JPEG_ENCODE_SECONDS = metrics.histogram(
+    "stream_jpeg_encode_seconds", "Resize + JPEG encode of one live-stream frame", ["size"])
+
+def encode_jpeg(frame, size=(640, 480), quality=40):
+    started = time.perf_counter()
+    if (frame.shape[1], frame.shape[0]) != size:
+        frame = cv2.resize(frame, size)
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    JPEG_ENCODE_SECONDS.labels(f"{size[0]}x{size[1]}").observe(time.perf_counter() - started)
+    return buffer.tobytes() if ok else None
+
+class FrameBroadcaster:
+    """
+    Encode-once cache for the live stream: each (source, seq) version is
+    JPEG-encoded exactly once, however many viewers ask for it.
+    """
+
+    def __init__(self, size=(640, 480), quality=40):
+        self.size = size
+        self.quality = quality
+        self._key = None
+        self._jpeg = None
+        self.encoded = 0
+
+    def encode(self, key, frame):
+        """JPEG for this frame version, encoding only the first time it is asked for."""
+        if key != self._key:
+            jpeg = encode_jpeg(frame, self.size, self.quality)
+            if jpeg is None:
+                return None
+            self._key, self._jpeg = key, jpeg
+            self.encoded += 1
+        return self._jpeg
+
+# --- PER-CLIENT STREAM SESSIONS ---
+# Resolution/quality tiers a viewer can negotiate with 'stream_subscribe'
+STREAM_TIERS = {
+    'low':    {'size': (320, 240), 'quality': 30},
+    'medium': {'size': (480, 360), 'quality': 40},
+    'high':   {'size': (640, 480), 'quality': 50},
+}
+DEFAULT_TIER = 'medium'
+
+class StreamSession:
+    """
+    One viewer. At most one frame is in flight: until the client acks it,
+    newer frames are dropped for this viewer instead of queueing up. The
+    send interval follows the measured ack round-trip.
+    """
+
+    MIN_INTERVAL = 0.1      # 10 FPS ceiling
+    MAX_INTERVAL = 2.0
+    ACK_TIMEOUT = 3.0       # Give up on a lost ack and slow down
+
+    def __init__(self, sid, tier=DEFAULT_TIER):
+        self.sid = sid
+        self.tier = tier
+        self.interval = 0.5
+        self.delivery = None    # EWMA of send -> ack seconds
+        self.inflight = None    # ticket of the frame awaiting ack
+        self.sent_at = 0.0
+        self.last_key = None
+        self.dropped_key = None
+        self.sent = 0
+        self.dropped = 0
+
+    def wants(self, key, now):
+        if key == self.last_key:
+            return False
+        if self.inflight is not None:
+            if now - self.sent_at < self.ACK_TIMEOUT:
+                if key != self.dropped_key:
+                    self.dropped_key = key
+                    self.dropped += 1
+                return False
+            # Ack lost (or very slow link): release the slot and back off
+            self.inflight = None
+            self.interval = min(self.interval * 2, self.MAX_INTERVAL)
+        return now - self.sent_at >= self.interval
+
+    def on_sent(self, key, now):
+        """Returns the ticket the client must echo back in 'frame_ack'."""
+        self.sent += 1
+        self.last_key = key
+        self.inflight = self.sent
+        self.sent_at = now
+        return self.sent
+
+    def on_ack(self, ticket, now):
+        if self.inflight is None or ticket != self.inflight:
+            return
+        rtt = now - self.sent_at
+        self.delivery = rtt if self.delivery is None else 0.7 * self.delivery + 0.3 * rtt
+        self.interval = min(max(self.delivery * 1.5, self.MIN_INTERVAL), self.MAX_INTERVAL)
+        self.inflight = None
+
+    def stats(self):
+        return {'tier': self.tier, 'fps': round(1.0 / self.interval, 2), 'sent': self.sent,
+                'dropped': self.dropped, 'delivery_ms': None if self.delivery is None else round(self.delivery * 1000, 1)}
+
+class StreamHub:
+    """Viewer sessions plus one encode-once cache per tier."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.viewers = threading.Condition(self.lock)
+        self.sessions = {}
+        self.encoders = {name: FrameBroadcaster(t['size'], t['quality']) for name, t in STREAM_TIERS.items()}
+
+    def subscribe(self, sid, tier=None):
+        tier = tier if tier in STREAM_TIERS else DEFAULT_TIER
+        with self.lock:
+            self.sessions[sid] = StreamSession(sid, tier)
+            self.viewers.notify_all()
+        return tier
+
+    def unsubscribe(self, sid):
+        with self.lock:
+            self.sessions.pop(sid, None)
+
+    def ack(self, sid, ticket):
+        with self.lock:
+            session = self.sessions.get(sid)
+            if session:
+                session.on_ack(ticket, time.time())
+
+    def wait_for_viewers(self, timeout=None):
+        with self.lock:
+            return self.viewers.wait_for(lambda: bool(self.sessions), timeout)
+
+    def has_viewers(self):
+        return bool(self.sessions)
+
+    def collect(self, key, frame):
+        """[(sid, jpeg, ticket)] for every viewer due a frame; each tier is encoded at most once per version."""
+        now = time.time()
+        with self.lock:
+            due = [s for s in self.sessions.values() if s.wants(key, now)]
+            out = []
+            for session in due:
+                jpeg = self.encoders[session.tier].encode(key, frame)
+                if jpeg is None:
+                    continue
+                out.append((session.sid, jpeg, session.on_sent(key, now)))
+            return out
+
+    def stats(self):
+        with self.lock:
+            return {sid: s.stats() for sid, s in self.sessions.items()}
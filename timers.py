@@ -0,0 +1,132 @@
+import time
+import heapq
+import itertools
+import threading
+import collections
+
+class Timer:
+    """Handle of one scheduled call; cancel() before it fires and it never runs."""
+    __slots__ = ("deadline", "fn", "args", "cancelled", "fired")
+
+    def __init__(self, deadline, fn, args):
+        self.deadline = deadline
+        self.fn = fn
+        self.args = args
+        self.cancelled = False
+        self.fired = False
+
+    @property
+    def pending(self):
+        return not (self.cancelled or self.fired)
+
+    def cancel(self):
+        self.cancelled = True   # The scheduler drops it when it comes up
+
+    def remaining(self):
+        return max(0.0, self.deadline - time.monotonic())
+
+    def __repr__(self):
+        return f"Timer({getattr(self.fn, '__name__', self.fn)}, in {self.remaining():.3f}s, pending={self.pending})"
+
+class TimerScheduler:
+    """
+    All deadlines of the kiosk (UI resets, interaction timeouts, door
+    lock-back) on one thread, instead of one sleeping thread each.
+
+    Deadlines sit in a heap ordered by time.monotonic(); the thread sleeps
+    on a condition until the earliest one is due or an earlier one is
+    added. Cancelled timers stay in the heap and are skipped when they come
+    up (compacted when they are the majority). Callbacks run on the
+    scheduler thread and must return quickly: post an event, move a servo,
+    schedule the next step.
+    """
+
+    def __init__(self, history=256):
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self.fired = 0
+        self.errors = 0
+        self._lag = collections.deque(maxlen=history)   # fire time - deadline, seconds
+
+    def call_later(self, delay, fn, *args):
+        return self.call_at(time.monotonic() + max(0.0, delay), fn, *args)
+
+    def call_at(self, deadline, fn, *args):
+        """Runs fn(*args) at monotonic time `deadline`. Returns its Timer."""
+        timer = Timer(deadline, fn, args)
+        with self._cond:
+            self._push(timer)
+        return timer
+
+    def reschedule(self, timer, delay):
+        """
+        Moves a pending timer to now + delay (earlier or later) and returns
+        the Timer that now carries the call; a timer that already fired or
+        was cancelled is left alone and None is returned.
+        """
+        with self._cond:
+            if not timer.pending:
+                return None
+            timer.cancelled = True
+            moved = Timer(time.monotonic() + max(0.0, delay), timer.fn, timer.args)
+            self._push(moved)
+        return moved
+
+    def cancel(self, timer):
+        if timer is not None:
+            timer.cancel()
+
+    def _push(self, timer):
+        # Caller holds self._cond
+        heapq.heappush(self._heap, (timer.deadline, next(self._seq), timer))
+        if len(self._heap) > 64 and self._pending() < len(self._heap) // 2:
+            self._heap = [item for item in self._heap if not item[2].cancelled]
+            heapq.heapify(self._heap)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="timers", daemon=True)
+            self._thread.start()
+        elif self._heap[0][2] is timer:
+            self._cond.notify()     # New earliest deadline: wake up sooner
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    while self._heap and self._heap[0][2].cancelled:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    delay = self._heap[0][0] - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                _, _, timer = heapq.heappop(self._heap)
+                timer.fired = True
+                self.fired += 1
+                self._lag.append(time.monotonic() - timer.deadline)
+            try:
+                timer.fn(*timer.args)
+            except Exception as e:
+                self.errors += 1
+                print(f"[TIMERS] {timer!r} failed: {e}")
+
+    def _pending(self):
+        return sum(1 for _, _, timer in self._heap if not timer.cancelled)
+
+    def __len__(self):
+        with self._cond:
+            return self._pending()
+
+    def stats(self):
+        with self._cond:
+            lag = sorted(self._lag)
+            pending = self._pending()
+
+        def ms(q):
+            return round(lag[int(q * (len(lag) - 1))] * 1000, 2) if lag else None
+
+        return {"pending": pending, "fired": self.fired, "errors": self.errors,
+                "lag_ms_p50": ms(0.5), "lag_ms_p95": ms(0.95), "lag_ms_max": ms(1.0)}
@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import threading
+import itertools
+import collections
+
+import config
+
+# Flight recorder for scans: every card tap gets a Trace of timed spans
+# (RFID read, enrollment check, queue wait, verification frame stages,
+# state update, storage, cloud queue, door). Finished traces stay in a
+# ring buffer and export to the Chrome trace event format, which
+# chrome://tracing and ui.perfetto.dev open directly.
+
+_local = threading.local()
+_ids = itertools.count(1)
+
+class Trace:
+    """Spans of one scan session. Any thread may add spans; times are time.time() seconds."""
+
+    def __init__(self, card_id, started=None, max_spans=2000):
+        self.id = next(_ids)
+        self.card_id = card_id
+        self.started = time.time() if started is None else started
+        self.finished = None
+        self.outcome = None
+        self.max_spans = max_spans
+        self.dropped = 0
+        self.events = []            # (name, start, end or None for an instant, thread name, args)
+        self.lock = threading.Lock()
+
+    @property
+    def duration(self):
+        return (self.finished or time.time()) - self.started
+
+    def add(self, name, start, end=None, **args):
+        with self.lock:
+            if len(self.events) >= self.max_spans:
+                self.dropped += 1
+                return
+            self.events.append((name, start, end, threading.current_thread().name, args))
+
+    def instant(self, name, **args):
+        self.add(name, time.time(), None, **args)
+
+    def span(self, name, **args):
+        return _Span(self, name, args)
+
+    def chrome_events(self, pid):
+        """Chrome trace events of this scan; pid groups them as one 'process' per scan."""
+        label = f"scan {self.id} card {self.card_id} ({self.outcome or 'open'}, {self.duration:.2f}s)"
+        out = [{"ph": "M", "name": "process_name", "pid": pid, "tid": 0, "args": {"name": label}},
+               {"ph": "M", "name": "thread_name", "pid": pid, "tid": 0, "args": {"name": "scan"}},
+               {"ph": "X", "name": "scan", "cat": "scan", "pid": pid, "tid": 0,
+                "ts": self.started * 1e6, "dur": self.duration * 1e6,
+                "args": {"card_id": self.card_id, "outcome": self.outcome, "dropped_spans": self.dropped}}]
+        with self.lock:
+            events = list(self.events)
+        tids = {}
+        for name, start, end, thread, args in events:
+            if thread not in tids:
+                tids[thread] = len(tids) + 1
+                out.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": tids[thread], "args": {"name": thread}})
+            event = {"name": name, "cat": name.split(".")[0], "pid": pid, "tid": tids[thread],
+                     "ts": start * 1e6, "args": args}
+            if end is None:
+                event.update(ph="i", s="t")
+            else:
+                event.update(ph="X", dur=(end - start) * 1e6)
+            out.append(event)
+        return out
+
+class _Span:
+    __slots__ = ("trace", "name", "args", "start")
+
+    def __init__(self, trace, name, args):
+        self.trace = trace
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = repr(exc)
+        self.trace.add(self.name, self.start, time.time(), **self.args)
+        return False
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+class _Activation:
+    __slots__ = ("trace", "previous")
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    def __enter__(self):
+        self.previous = getattr(_local, "trace", None)
+        _local.trace = self.trace
+        return self.trace
+
+    def __exit__(self, *exc):
+        _local.trace = self.previous
+        return False
+
+def activate(trace):
+    """Makes trace the current one of this thread for the block (span()/instant() record into it)."""
+    return _Activation(trace)
+
+def current():
+    return getattr(_local, "trace", None)
+
+def span(name, **args):
+    """Span in this thread's current trace; does nothing outside a traced scan."""
+    trace = getattr(_local, "trace", None)
+    return _NO_SPAN if trace is None else trace.span(name, **args)
+
+def instant(name, **args):
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.instant(name, **args)
+
+class Recorder:
+    """
+    Open traces by card and a ring buffer of the last `keep` finished ones.
+    A trace slower than slow_seconds is also written to trace_dir as a
+    Chrome trace file when it finishes.
+    """
+
+    def __init__(self, keep=50, slow_seconds=10.0, trace_dir="traces", max_spans=2000):
+        self.keep = keep
+        self.slow_seconds = slow_seconds
+        self.trace_dir = trace_dir
+        self.max_spans = max_spans
+        self.lock = threading.Lock()
+        self.open = {}                              # card_id -> Trace
+        self.done = collections.deque(maxlen=keep)
+        self.persisted = 0
+
+    def begin(self, card_id, started=None):
+        trace = Trace(card_id, started, self.max_spans)
+        with self.lock:
+            self.open[card_id] = trace
+        return trace
+
+    def get(self, card_id):
+        with self.lock:
+            return self.open.get(card_id)
+
+    def finish(self, card_id, outcome):
+        with self.lock:
+            trace = self.open.pop(card_id, None)
+            if trace is None:
+                return None
+            trace.finished = time.time()
+            trace.outcome = outcome
+            self.done.append(trace)
+        if self.slow_seconds and trace.duration >= self.slow_seconds:
+            self._persist(trace)
+        return trace
+
+    def _persist(self, trace):
+        try:
+            os.makedirs(self.trace_dir, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(trace.started))
+            path = os.path.join(self.trace_dir, f"scan-{stamp}-{trace.card_id}-{trace.outcome}.json")
+            with open(path, "w") as f:
+                json.dump(chrome_trace([trace]), f)
+            self.persisted += 1
+            print(f"[TRACE] Slow scan ({trace.duration:.1f}s, {trace.outcome}) saved to {path}")
+        except OSError as e:
+            print(f"[TRACE] Could not save slow scan: {e}")
+
+    def last(self, n=None, include_open=True):
+        with self.lock:
+            traces = list(self.done)
+            if include_open:
+                traces += list(self.open.values())
+        traces.sort(key=lambda t: t.started)
+        return traces[-n:] if n else traces
+
+def chrome_trace(traces):
+    events = []
+    for pid, trace in enumerate(traces, start=1):
+        events.extend(trace.chrome_events(pid))
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+RECORDER = Recorder(config.TRACE_KEEP, config.TRACE_SLOW_SECONDS, config.TRACE_DIR, config.TRACE_MAX_SPANS)